@@ -18,8 +18,14 @@ See http://visbrain.org/ for a complete and step-by step documentation
 """
 import sys as _sys
 
+from ._lazy import lazy_package as _lazy_package
+
 __version__ = "0.4.6"
 
+# Submodules are imported on first access (e.g visbrain.objects) :
+__getattr__, __dir__, _ = _lazy_package(__name__, submodules=[
+    'config', 'gui', 'io', 'mne', 'objects', 'utils', 'visuals'])
+
 
 # PyQt5 crash if an error occured. This small function fix it for all modules
 # to retrieve the PyQt4 behavior :
@@ -0,0 +1,71 @@
+"""Lazy loading of the submodules of a package.
+
+Importing a package only defines the names it exports. Each submodule (and
+its dependencies, e.g PyQt5, VisPy or matplotlib) is imported the first time
+one of its names is accessed. This keeps headless workers, which only need a
+few signal processing functions, fast to start.
+
+Module level __getattr__ requires Python 3.7 (PEP 562). On older versions,
+the exported names are imported with the package, as before.
+"""
+import sys
+import importlib
+
+__all__ = ('lazy_package',)
+
+
+def lazy_package(name, submodules=(), attributes=None):
+    """Get the module functions of a lazily loaded package.
+
+    Use it at the top of the __init__.py file of a package::
+
+        __getattr__, __dir__, __all__ = lazy_package(
+            __name__, submodules=['sleep'], attributes={'color': ['color2vb']})
+
+    Parameters
+    ----------
+    name : string
+        Name of the package (i.e __name__).
+    submodules : list | ()
+        Submodules that can be accessed as attributes of the package.
+    attributes : dict | None
+        Dictionary of {submodule: [names]} of the names exported by the
+        package.
+
+    Returns
+    -------
+    __getattr__ : callable
+        Module-level __getattr__ importing submodules when needed (PEP 562,
+        Python >= 3.7).
+    __dir__ : callable
+        Module-level __dir__.
+    __all__ : list
+        List of the names exported by the package.
+    """
+    attributes = {} if attributes is None else attributes
+    submodules = set(submodules) | set(attributes.keys())
+    attr_to_mod = {attr: mod for mod, attrs in attributes.items() for attr in
+                   attrs}
+    if sys.version_info < (3, 7):  # no module level __getattr__
+        package = sys.modules[name]
+        for mod in sorted(attributes.keys()):
+            module = importlib.import_module('%s.%s' % (name, mod))
+            for attr in attributes[mod]:
+                setattr(package, attr, getattr(module, attr))
+
+    def __getattr__(attr):
+        if attr in attr_to_mod:
+            module = importlib.import_module('%s.%s' % (
+                name, attr_to_mod[attr]))
+            value = getattr(module, attr)
+            # Next accesses don't go through __getattr__ :
+            setattr(sys.modules[name], attr, value)
+            return value
+        elif attr in submodules:
+            return importlib.import_module('%s.%s' % (name, attr))
+        raise AttributeError("module %r has no attribute %r" % (name, attr))
+
+    def __dir__():
+        return sorted(set(attr_to_mod.keys()) | submodules)
+
+    return __getattr__, __dir__, list(attr_to_mod.keys())
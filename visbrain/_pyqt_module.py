@@ -30,6 +30,8 @@ class _PyQtModule(object):
     def __init__(self, verbose=None, to_describe=None, icon=None,
                  show_settings=True):
         """Init."""
+        # The PyQt application is created before any widget :
+        CONFIG['PYQT_APP']
         # Log level and profiler creation (if verbose='debug')
         set_log_level(verbose)
         path_to_visbrain_data()
@@ -1,11 +1,13 @@
-"""Visbrain configurations."""
+"""Visbrain configurations.
+
+The PyQt and VisPy applications are only created the first time they are
+needed (i.e when a graphical module is created), so that importing visbrain
+does not require a display.
+"""
 import sys
 import getopt
 import logging
 
-from PyQt5 import QtWidgets
-from vispy import app as visapp
-
 from visbrain.utils.others import Profiler
 from visbrain.utils.logging import set_log_level
 
@@ -14,37 +16,72 @@ from visbrain.utils.logging import set_log_level
 logger = logging.getLogger('visbrain')
 set_log_level('info')
 
+
+def _create_pyqt_app():
+    """Get the PyQt application (created if needed)."""
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([''])
+    logger.debug("PyQt application created")
+    return app
+
+
+def _create_vispy_app(backend_name=None):
+    """Create the VisPy application."""
+    import vispy
+    from vispy import app as visapp
+    if CONFIG['MPL_RENDER']:
+        vispy.use('PyQt5')
+    return visapp.application.Application(backend_name)
+
+
+class _LazyConfig(dict):
+    """Configuration dict creating applications on first access."""
+
+    _factories = {'PYQT_APP': _create_pyqt_app,
+                  'VISPY_APP': _create_vispy_app}
+
+    def __missing__(self, key):
+        if key not in self._factories:
+            raise KeyError(key)
+        if key == 'VISPY_APP':  # the vispy app relies on the PyQt one
+            self['PYQT_APP']
+        self[key] = self._factories[key]()
+        return self[key]
+
+    def get(self, key, default=None):
+        """Get a configuration value."""
+        return self[key] if (key in self) or (
+            key in self._factories) else default
+
+
 # Configuration dict
-CONFIG = {}
+CONFIG = _LazyConfig()
 
 # Visbrain profiler (derived from the VisPy profiler)
 PROFILER = Profiler()
 
 # PyQt application
-PYQT_APP = QtWidgets.QApplication.instance()
-if PYQT_APP is None:
-    PYQT_APP = QtWidgets.QApplication([''])
-CONFIG['PYQT_APP'] = PYQT_APP
 CONFIG['SHOW_PYQT_APP'] = True
 
-# VisPy application
-CONFIG['VISPY_APP'] = visapp.application.Application()
-
 
 def use_app(backend_name):
     """Use a specific backend."""
-    CONFIG['VISPY_APP'] = visapp.application.Application(backend_name)
+    CONFIG['VISPY_APP'] = _create_vispy_app(backend_name)
 
 
 # MPL render :
 CONFIG['MPL_RENDER'] = False
 
+# Save the smoothing matrices of brain templates (see BrainObj.add_activation)
+# in the visbrain_data folder :
+CONFIG['SMOOTHING_ON_DISK'] = False
+
 # Jupyter / iPython :
 try:
     ip = get_ipython()
     CONFIG['MPL_RENDER'] = True
-    import vispy
-    vispy.use('PyQt5')
 except NameError:
     pass
 
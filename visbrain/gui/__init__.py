@@ -1,4 +1,5 @@
-from .brain import Brain  # noqa
-from .figure import Figure  # noqa
-from .signal import Signal  # noqa
-from .sleep import Sleep  # noqa
+from .._lazy import lazy_package
+
+__getattr__, __dir__, __all__ = lazy_package(__name__, attributes={
+    'brain': ['Brain'], 'figure': ['Figure'], 'signal': ['Signal'],
+    'sleep': ['Sleep']})
@@ -362,8 +362,7 @@ class BrainUserMethods(object):
         if select in ['all', 'none', 'left', 'right', None]:
             obj.set_visible_sources(select=select)
         elif select in ['inside', 'outside']:
-            vert = self.atlas.vertices
-            obj.set_visible_sources(select=select, v=vert)
+            obj.set_visible_sources(select=select, v=self.atlas)
 
     def __projection(self, idx_proj, radius, project_on, contribute,
                      mask_color, **kwargs):
@@ -443,7 +442,7 @@ class BrainUserMethods(object):
         """
         obj = self.sources[name] if name is not None else self.sources
         v = self.atlas if fit_to == 'brain' else self.roi
-        obj.fit_to_vertices(v.vertices)
+        obj.fit_to_vertices(v)
 
     def sources_to_convex_hull(self, xyz):
         """Convert a set of sources into a convex hull.
@@ -394,6 +394,17 @@ class Signal(_PyQtModule, UiInit, UiElements, Visuals):
     def set_signal_index(self, index):
         """Set the index of the signal."""
         self._safely_set_index(index, True, True)
+        self._sig_render.flush()
+
+    @property
+    def render_stats(self):
+        """Get navigation redraw statistics.
+
+        Returns a dictionary with the number of redraws (frames), the number
+        of dropped (merged) redraws and the last and mean latencies between a
+        navigation request and the end of its redraw (in seconds).
+        """
+        return self._sig_render.stats
 
     def set_signal_form(self, form='line'):
         """Set plotting method.
@@ -1,7 +1,7 @@
 """Interactions between user and Signal tab of QuickSettings."""
 import numpy as np
 
-from visbrain.utils import textline2color, safely_set_spin
+from visbrain.utils import textline2color, safely_set_spin, RenderScheduler
 from visbrain.io import dialog_color, is_opengl_installed
 
 
@@ -20,8 +20,9 @@ class UiSignals(object):
         self._sig_ylab.textChanged.connect(self._fcn_axis_ylab)
         self._sig_lab_fz.valueChanged.connect(self._fcn_axis_lab_fz)
         self._sig_ticks_fz.valueChanged.connect(self._fcn_axis_ticks_fz)
-        # Signal :
-        self._sig_index.valueChanged.connect(self._fcn_set_signal)
+        # Signal (navigation redraws are merged and capped to 60 fps) :
+        self._sig_render = RenderScheduler(self._fcn_set_signal, fps=60.)
+        self._sig_index.valueChanged.connect(self._sig_render.trigger)
         self._sig_form.currentIndexChanged.connect(self._fcn_set_signal)
         self._sig_color.editingFinished.connect(self._fcn_set_signal)
         self._sig_sig_picker.clicked.connect(self._fcn_color_sig_picker)
@@ -104,6 +105,8 @@ class UiSignals(object):
     ###########################################################################
     def _fcn_set_signal(self, *args, force=False):
         """Set signal."""
+        # A pending redraw is superseded by this one :
+        self._sig_render.cancel()
         # =================== FORM AND COLOR ===================
         form_bck = self._signal.form
         form = str(self._sig_form.currentText())
@@ -207,9 +210,9 @@ class UiSignals(object):
 
     def _safely_set_index(self, value, update_signal=False, force=False):
         """Set without trigger."""
-        safely_set_spin(self._sig_index, value, [self._fcn_set_signal])
+        safely_set_spin(self._sig_index, value, [self._sig_render.trigger])
         if update_signal:
-            self._fcn_set_signal(force=force)
+            self._sig_render.request(force=force)
 
     def _fcn_prev_index(self):
         """Go to previous index."""
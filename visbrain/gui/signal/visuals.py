@@ -224,7 +224,7 @@ class SignalVisual(SignalAnnotations):
             idx = tuple(idx)
 
         # Convert data to be compatible with VisPy and prepare data :
-        data_c = vispy_array(data[idx]).copy()
+        data_c = vispy_array(data[idx])
         _data = self._prep._prepare_data(self._sf, data_c, self._time)
 
         # Set data :
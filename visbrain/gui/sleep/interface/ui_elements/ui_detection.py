@@ -1,11 +1,12 @@
 """Main class for sleep tools managment."""
+import time
+
 import numpy as np
 from PyQt5 import QtWidgets, QtCore
 import logging
 
-from visbrain.utils import (remdetect, spindlesdetect, slowwavedetect,
-                            kcdetect, peakdetect, mtdetect)
-from visbrain.utils.sleep.event import _events_to_index
+from visbrain.utils.sleep.detectpool import (format_detection, run_detection,
+                                             ParallelDetection)
 
 logger = logging.getLogger('visbrain')
 
@@ -14,6 +15,12 @@ USER_METHOD = {'Spindles': 'spindle', 'Slow waves': 'sw', 'K-complexes': 'kc',
                'REM': 'rem', 'Muscle twitches': 'mt', 'Peaks': 'peak'}
 
 
+class _DetectionNotifier(QtCore.QObject):
+    """Forward results of background detections to the GUI thread."""
+
+    result = QtCore.pyqtSignal(int, int, object, float)
+
+
 class UiDetection(object):
     """Main class for sleep tools managment."""
 
@@ -33,6 +40,18 @@ class UiDetection(object):
         self._ToolRdAll.clicked.connect(self._fcn_apply_method)
         self._ToolDetectProgress.hide()
         self._fcn_switch_detection()
+        # Detections on several channels run in a process pool :
+        self._detect_pool = ParallelDetection()
+        self._detect_notifier = _DetectionNotifier()
+        self._detect_notifier.result.connect(self._fcn_detection_result,
+                                             QtCore.Qt.QueuedConnection)
+        self._detect_run = None  # (run id, method, channels, channels done)
+        self._ToolDetectCancel = QtWidgets.QPushButton(self.q_DetectSettings)
+        self._ToolDetectCancel.setText("Cancel")
+        self._ToolDetectCancel.setToolTip("Cancel the running detection")
+        self.horizontalLayout_8.addWidget(self._ToolDetectCancel)
+        self._ToolDetectCancel.clicked.connect(self._fcn_cancel_detection)
+        self._ToolDetectCancel.hide()
 
         # -------------------------------------------------
         # Location table :
@@ -77,8 +96,7 @@ class UiDetection(object):
 
         # Visible channels :
         elif self._ToolRdViz.isChecked():
-            idx = [
-                k for k in range(len(self)) if self._chanWidget[k].isVisible()]
+            idx = [k for k in range(len(self)) if self._canvas_is_visible(k)]
 
         # All channels :
         elif self._ToolRdAll.isChecked():
@@ -87,6 +105,44 @@ class UiDetection(object):
         return idx
 
     # -------------- Get the function to run --------------
+    def _fcn_get_detection_kwargs(self, method):
+        """Get the arguments of a default detection method.
+
+        Parameters
+        ----------
+        method : string
+            Method to use.
+        """
+        # Switch between detection types :
+        if method == 'REM':
+            return dict(rem_only=self._ToolRemOnly.isChecked(),
+                        threshold=self._ToolRemTh.value())
+        elif method == 'Spindles':
+            return dict(threshold=self._ToolSpinTh.value(),
+                        nrem_only=self._ToolSpinRemOnly.isChecked(),
+                        fmin=self._ToolSpinFmin.value(),
+                        fmax=self._ToolSpinFmax.value(),
+                        tmin=self._ToolSpinTmin.value(),
+                        tmax=self._ToolSpinTmax.value())
+        elif method == 'Slow waves':
+            return dict(threshold=self._ToolWaveTh.value())
+        elif method == 'K-complexes':
+            return dict(proba_thr=self._ToolKCProbTh.value(),
+                        amp_thr=self._ToolKCAmpTh.value(),
+                        nrem_only=self._ToolKCNremOnly.isChecked(),
+                        tmin=self._ToolKCMinDur.value(),
+                        tmax=self._ToolKCMaxDur.value(),
+                        kc_min_amp=self._ToolKCMinAmp.value(),
+                        kc_max_amp=self._ToolKCMaxAmp.value())
+        elif method == 'Muscle twitches':
+            return dict(threshold=self._ToolMTTh.value(),
+                        rem_only=self._ToolMTOnly.isChecked())
+        elif method == 'Peaks':
+            _disp = self._ToolPeakMinMax.currentIndex()
+            return dict(lookahead=int(self._ToolPeakLook.value() * self._sf),
+                        delta=1., get=['max', 'min', 'minmax'][_disp],
+                        threshold='auto')
+
     def _fcn_get_detection_function(self, method):
         """Get the method to use for the detection (default or custom).
 
@@ -101,70 +157,14 @@ class UiDetection(object):
             fcn = self._custom_detections[user_method]
         else:
             logger.info("Default method used for %s detection" % method)
-            # Switch between detection types :
-            if method == 'REM':
-                th = self._ToolRemTh.value()
-                rem_only = self._ToolRemOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return remdetect(data, sf, hypno, rem_only, th)
-            elif method == 'Spindles':
-                thr = self._ToolSpinTh.value()
-                fmin = self._ToolSpinFmin.value()
-                fmax = self._ToolSpinFmax.value()
-                tmin = self._ToolSpinTmin.value()
-                tmax = self._ToolSpinTmax.value()
-                nrem_only = self._ToolSpinRemOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return spindlesdetect(data, sf, thr, hypno, nrem_only,
-                                          fmin, fmax, tmin, tmax)
-            elif method == 'Slow waves':
-                thr = self._ToolWaveTh.value()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return slowwavedetect(data, sf, thr)
-            elif method == 'K-complexes':
-                proba_thr = self._ToolKCProbTh.value()
-                amp_thr = self._ToolKCAmpTh.value()
-                tmin = self._ToolKCMinDur.value()
-                tmax = self._ToolKCMaxDur.value()
-                min_amp = self._ToolKCMinAmp.value()
-                max_amp = self._ToolKCMaxAmp.value()
-                nrem_only = self._ToolKCNremOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return kcdetect(data, sf, proba_thr, amp_thr, hypno,
-                                    nrem_only, tmin, tmax, min_amp, max_amp)
-            elif method == 'Muscle twitches':
-                th = self._ToolMTTh.value()
-                rem_only = self._ToolMTOnly.isChecked()
-                def fcn(data, sf, time, hypno):  # noqa
-                    return mtdetect(data, sf, th, hypno, rem_only)
-            elif method == 'Peaks':
-                look = int(self._ToolPeakLook.value() * self._sf)
-                _disp = self._ToolPeakMinMax.currentIndex()
-                disp = ['max', 'min', 'minmax'][_disp]
-                def fcn(data, sf, time, hypno):  # noqa
-                    return peakdetect(sf, data, self._time, look, 1., disp,
-                                      'auto')
+            kwargs = self._fcn_get_detection_kwargs(method)
+            def fcn(data, sf, time, hypno):  # noqa
+                return run_detection(method, data, sf, hypno, time, **kwargs)
 
         def fcn_check(data, sf, time, hypno):
             """Wrap fcn with type checking."""
             assert isinstance(data, np.ndarray)
-            idx = fcn(data, sf, time, hypno)
-            idx = np.asarray(idx)
-            if not idx.size:
-                return idx
-            # Check indices shape and format to (n_events, 2) :
-            if (idx.ndim == 2) and (idx.shape[1] == 2):  # (n_events, 2)
-                return idx.astype(int)
-            elif idx.ndim == 1:  # 1d vector
-                if idx.dtype == bool:  # boolean array
-                    assert len(idx) == len(data)
-                    idx = np.arange(len(data))[idx]
-                return _events_to_index(idx)
-            else:
-                raise ValueError("Return indices should either be an (n_events"
-                                 ", 2) array or a boolean array of shape "
-                                 "(n_time_points,) or an array with "
-                                 "consecutive detected events.")
+            return format_detection(fcn(data, sf, time, hypno), len(data))
 
         return fcn_check
 
@@ -172,48 +172,79 @@ class UiDetection(object):
     def _fcn_apply_detection(self):
         """Apply detection (either REM/Spindles/Peaks/SlowWave/KC/MT)."""
         # Get channels to apply detection and the detection method :
-        idx = self._fcn_get_chan_detection()
+        idx = list(self._fcn_get_chan_detection())
         method = str(self._ToolDetectType.currentText())
-
-        fcn = self._fcn_get_detection_function(method)
+        # Per-sample hypnogram (built once) :
+        hypno = np.asarray(self._hypno)
+        self._detect_pool.cancel()
+        self._detect_run = None
 
         ############################################################
         # RUN DETECTION
         ############################################################
-        for i, k in enumerate(idx):
+        custom = USER_METHOD[method] in self._custom_detections.keys()
+        if (len(idx) > 1) and not custom:
+            # Default detections on several channels run in processes.
+            # Results are reported as soon as each channel is over :
+            self._ToolDetectProgress.setValue(0)
+            self._ToolDetectProgress.show()
+            self._ToolDetectCancel.show()
+            kwargs = self._fcn_get_detection_kwargs(method)
+            run_id = self._detect_pool.run(
+                method, self._data, self._sf, idx, hypno=hypno,
+                time=self._time, callback=self._detect_notifier.result.emit,
+                **kwargs)
+            # Results are queued so the run is known before they arrive :
+            self._detect_run = (run_id, method, idx, [])
+            return
+
+        self._detect_run = (0, method, idx, [])
+        fcn = self._fcn_get_detection_function(method)
+        for k in idx:
             # Display progress bar (only if needed):
             if len(idx) > 1:
                 self._ToolDetectProgress.show()
-
             # Run detection :
-            index = fcn(self._data[k, :], self._sf, self._time, self._hypno)
-            nb = index.shape[0]
-            dty = nb / (len(self._time) / self._sf / 60.)
-            # dur = (index[:, 1] - index[:, 0]) * (1000. / self._sf)
-
-            logger.info(("Perform %s detection on channel %s. %i events "
-                         "detected.") % (method, self._channels[k], nb))
-
-            if index.size:
-                # Enable detection tab :
-                self._DetectionTab.setTabEnabled(1, True)
-                self._detect.dict[(self._channels[k], method)]['index'] = index
-                # Be sure panel is displayed :
-                if not self._canvas_is_visible(k):
-                    self._canvas_set_visible(k, True)
-                    self._chan.visible[k] = True
-                self._chan.loc[k].visible = True
-                # Update plot :
-                self._fcn_slider_move()
-
-            # Update progress bar :
-            self._ToolDetectProgress.setValue(int(100. * (i + 1) / len(self)))
+            t_start = time.perf_counter()
+            index = fcn(self._data[k, :], self._sf, self._time, hypno)
+            self._fcn_detection_result(0, k, index,
+                                       time.perf_counter() - t_start)
+
+    def _fcn_detection_result(self, run_id, k, index, elapsed):
+        """Report the detection of a channel."""
+        # Ignore results of cancelled runs :
+        if (self._detect_run is None) or (self._detect_run[0] != run_id):
+            return
+        _, method, idx, done = self._detect_run
+        done.append(k)
+        if index is None:  # the detection failed
+            index = np.array([])
+        nb = index.shape[0]
+        logger.info(("Perform %s detection on channel %s. %i events "
+                     "detected (%.2f sec).") % (method, self._channels[k], nb,
+                                                elapsed))
+
+        if index.size:
+            # Enable detection tab :
+            self._DetectionTab.setTabEnabled(1, True)
+            self._detect.dict[(self._channels[k], method)]['index'] = index
+            # Be sure panel is displayed :
+            if not self._canvas_is_visible(k):
+                self._canvas_set_visible(k, True)
+                self._chan.visible[k] = True
+            self._chan.loc[k].visible = True
+            # Update plot :
+            self._fcn_slider_move()
+
+        # Update progress bar :
+        self._ToolDetectProgress.setValue(int(100. * len(done) / len(idx)))
 
         ############################################################
         # NUMBER // DENSITY
         ############################################################
         if index.size:
             # Report results on table :
+            dty = nb / (len(self._time) / self._sf / 60.)
             self._ToolDetectTable.setRowCount(1)
             self._ToolDetectTable.setItem(0, 0, QtWidgets.QTableWidgetItem(
                 str(nb)))
@@ -226,13 +257,29 @@ class UiDetection(object):
         ############################################################
         # LINE REPORT :
         ############################################################
+        # Results are streamed into the location table :
         self._loc_line_report(select=True)
 
+        if len(done) == len(idx):
+            self._fcn_end_detection()
+
+    def _fcn_cancel_detection(self):
+        """Cancel the detection running in the background."""
+        if self._detect_run is not None:
+            _, method, idx, done = self._detect_run
+            logger.warning("%s detection cancelled (%i / %i channels done)" % (
+                method, len(done), len(idx)))
+        self._detect_pool.cancel()
+        self._fcn_end_detection()
+
+    def _fcn_end_detection(self):
+        """Finish the detection."""
+        self._detect_run = None
         # Activate the save detections menu and activate detection tab :
         self._check_detect_menu()
-
         # Finally, hide progress bar :
         self._ToolDetectProgress.hide()
+        self._ToolDetectCancel.hide()
 
     def _loc_line_report(self, *args, refresh=True, select=False):
         """Update line report."""
@@ -4,7 +4,7 @@ import os
 import numpy as np
 from PyQt5 import QtWidgets
 
-from visbrain.utils import HelpMenu
+from visbrain.utils import HelpMenu, RLEHypnogram
 from visbrain.io import (dialog_save, dialog_load, write_fig_hyp, write_csv,
                          write_txt, write_hypno, read_hypno,
                          annotations_to_array, oversample_hypno,
@@ -139,7 +139,7 @@ class UiMenu(HelpMenu):
             filename = dialog_save(self, 'Save Hypnogram figure', 'hypno',
                                    "PNG (*.png);;All files (*.*)")
         if filename:
-            hypno = self._hypno.copy()
+            hypno = np.asarray(self._hypno)
             grid = self._slGrid.isChecked()
             ascolor = self._PanHypnoColor.isChecked()
             write_fig_hyp(hypno, self._sf, file=filename,
@@ -339,7 +339,8 @@ class UiMenu(HelpMenu):
             self._hypno, _ = read_hypno(filename, time=self._time,
                                         hstates=self._hstates,
                                         hvalues=self._hvalues)
-            self._hypno = oversample_hypno(self._hypno, self._N)[::self._dsf]
+            self._hypno = oversample_hypno(RLEHypnogram.from_array(
+                self._hypno), self._N).downsample(self._dsf)
             self._hyp.set_data(self._sf, self._hypno, self._time)
             # Update info table :
             self._fcn_info_update()
@@ -4,7 +4,7 @@ import numpy as np
 from PyQt5 import QtCore, QtGui, QtWidgets
 from visbrain.config import PROFILER
 from visbrain.io.dependencies import is_lspopt_installed
-from visbrain.utils import color2vb, mpl_cmap
+from visbrain.utils import color2vb, mpl_cmap, RLEHypnogram
 from vispy import scene
 
 from ..ui_init import AxisCanvas, TimeAxis
@@ -287,6 +287,17 @@ class UiPanels(object):
             # Add the canvas to the layout :
             self._chanLayout[i].addWidget(self._chanCanvas[i].canvas.native)
 
+        # ============ STACKED MONTAGE ============
+        # One canvas for all of the channels :
+        self._stackCanvas = None
+        if self._stacked:
+            self._stackWidget, self._stackLayout = self._create_compatible_w(
+                "_widgetStack", "_LayoutStack")
+            self._chanGrid.addWidget(self._stackWidget, 0, 1, len(self), 1)
+            self._stackCanvas = AxisCanvas(axis=False, name='Canvas_stack',
+                                           fcn=[self.on_mouse_wheel])
+            self._stackLayout.addWidget(self._stackCanvas.canvas.native)
+
         self._PanChanLay.addItem(vspacer, i + 1, 0, 1, 1)
         self._chanGrid.addItem(hspacer, i + 4, 1, 1, 1)
 
@@ -344,6 +355,9 @@ class UiPanels(object):
                     self._chan.x[1] - self._chan.x[0],
                     self._ylims[k, 1] - self._ylims[k, 0])
             self._chanCam[k].rect = rect
+        # Amplitudes of the stacked montage are set with the data :
+        if self._stacked:
+            self._chan.update()
         # Redraw scoring window indicators
         self._update_scorwin_indicator()
 
@@ -373,6 +387,8 @@ class UiPanels(object):
         for k in range(len(self._channels)):
             self._chan.mesh[k].antialias = aa
             self._chan.mesh[k].update()
+        if self._stacked:
+            self._chan._stack.method = 'agg' if aa else 'gl'
         if aa:
             self._channels_lw.setMinimum(1.5)
         else:
@@ -386,11 +402,13 @@ class UiPanels(object):
         """Control visible panels of channels."""
         for i, k in enumerate(self._chanChecks):
             viz = k.isChecked()
-            self._chanWidget[i].setVisible(viz)
-            self._chanLabels[i].setVisible(viz)
+            self._chanWidget[i].setVisible(viz and not self._stacked)
+            self._chanLabels[i].setVisible(viz and not self._stacked)
             self._chan.visible[i] = viz
             if viz:
                 self._chanCanvas[i].set_camera(self._chanCam[i])
+        if self._stacked:
+            self._stackWidget.setVisible(self._chan.visible.any())
         self._chan.update()
         self._fcn_hypoverlay_update()
 
@@ -419,6 +437,8 @@ class UiPanels(object):
         visible : bool
             A boolean value indicating if the canvas is visible.
         """
+        if self._stacked:
+            return bool(self._chan.visible[k])
         return self._chanWidget[k].isVisible()
 
     def _canvas_set_visible(self, k, value):
@@ -432,9 +452,12 @@ class UiPanels(object):
             Boolean value if the canvas has to be visible.
         """
         self._chanChecks[k].setChecked(value)
-        self._chanWidget[k].setVisible(value)
-        self._chanLabels[k].setVisible(value)
+        self._chanWidget[k].setVisible(value and not self._stacked)
+        self._chanLabels[k].setVisible(value and not self._stacked)
         self._chanCanvas[k].set_camera(self._chanCam[k])
+        if self._stacked:
+            self._chan.visible[k] = value
+            self._stackWidget.setVisible(self._chan.visible.any())
 
     # =====================================================================
     # SPECTROGRAM
@@ -462,14 +485,25 @@ class UiPanels(object):
         if self._PanSpecCmapInv.isChecked():
             cmap += '_r'
         self._specLabel.setText(self._addspace + self._channels[chan])
-        # Set data :
+        # Set data (computed in the background if not cached) :
         self._spec.set_data(self._sf, self._data[chan, ...], self._time,
                             nfft=nfft, overlap=over, fstart=fstart, fend=fend,
                             cmap=cmap, contrast=contrast, interp=interp,
-                            norm=norm, method=method)
+                            norm=norm, method=method, channel=chan,
+                            block=False)
         # Set apply button disable :
         self._PanSpecApply.setEnabled(False)
 
+    def _fcn_spec_progress(self, key, fraction):
+        """Display the progress of the spectrogram computation."""
+        chan = key[0]
+        if chan != self._PanSpecChan.currentIndex():
+            return
+        txt = self._addspace + self._channels[chan]
+        if fraction < 1.:
+            txt += ' (%i%%)' % int(100 * fraction)
+        self._specLabel.setText(txt)
+
     def _fcn_spec_compat(self):
         """Check compatibility between spectro parameters."""
         # Get nfft and overlap :
@@ -526,7 +560,7 @@ class UiPanels(object):
                                                QtWidgets.QMessageBox.No)
 
         if reply == QtWidgets.QMessageBox.Yes:
-            self._hypno = np.zeros((len(self._hyp),), dtype=np.float32)
+            self._hypno = RLEHypnogram.full(len(self._hyp), 0)
             self._hyp.clean(self._sf, self._time)
             # Update info table :
             self._fcn_info_update()
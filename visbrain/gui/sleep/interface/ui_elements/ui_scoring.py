@@ -2,7 +2,7 @@
 import numpy as np
 from PyQt5 import QtWidgets
 
-from visbrain.utils import transient
+from visbrain.utils import transient, RLEHypnogram
 
 
 class UiScoring(object):
@@ -55,22 +55,21 @@ class UiScoring(object):
         """Update hypno data from hypno score."""
         if self._scoreSet:
             # Reset hypnogram (not directly to avoid losing data if failure)
-            hypno = np.zeros((len(self._time)), dtype=np.float32)
+            hypno = RLEHypnogram.full(len(self._time), 0)
             # Loop over table row :
             for k in range(self._scoreTable.rowCount()):
                 # Get tstart / tend / stage :
                 tstart, tend, value = self._get_score_marker(k)
-                # Update pos if not None :
+                # Update segments if not None :
                 if tstart is not None:
-                    hypno[tstart:tend] = value
-                    self._hyp.set_state(tstart, tend, value)
+                    hypno.set_state(tstart, tend, value)
             self._hyp.edit.update()
             self._hypno = hypno
+            self._hyp.set_data(self._sf, self._hypno, self._time)
             # Update sleep info :
             self._fcn_info_update()
             # Update hypno overlay
             self._fcn_hypoverlay_update()
-            self._hyp.set_data(self._sf, self._hypno, self._time)
 
     def _get_score_marker(self, idx):
         """Get a specific row dat.
@@ -5,6 +5,8 @@ from PyQt5.QtCore import QObjectCleanupHandler
 
 import vispy.visuals.transforms as vist
 
+from visbrain.utils import PrepareData, RenderScheduler
+
 
 class UiSettings(object):
     """Main class for settings managment."""
@@ -19,8 +21,10 @@ class UiSettings(object):
         self._SlStep = int(1)
         # Function applied when the slider move :
         self._slOnStart = False
+        # Navigation redraws are merged and capped to 60 frames per second :
+        self._slider_render = RenderScheduler(self._fcn_slider_move, fps=60.)
         self._fcn_slider_settings()
-        self._SlVal.valueChanged.connect(self._fcn_slider_move)
+        self._SlVal.valueChanged.connect(self._slider_render.trigger)
         # Function applied when the display window changed :
         self._SigWin.valueChanged.connect(self._fcn_sigwin_settings)
         self._SigWin.setKeyboardTracking(False)
@@ -34,7 +38,7 @@ class UiSettings(object):
         self._SlGoto.valueChanged.connect(self._fcn_slider_win_selection)
         self._SlGoto.setKeyboardTracking(False)
         # Unit conversion :
-        self._slRules.currentIndexChanged.connect(self._fcn_slider_move)
+        self._slRules.currentIndexChanged.connect(self._slider_render.trigger)
         # Grid toggle :
         self._slGrid.clicked.connect(self._fcn_grid_toggle)
         # Text format :
@@ -44,7 +48,7 @@ class UiSettings(object):
             "Vigilance state : {state}"
         )
         # Absolute time :
-        self._slAbsTime.clicked.connect(self._fcn_slider_move)
+        self._slAbsTime.clicked.connect(self._slider_render.trigger)
         # Magnify :
         self._slMagnify.clicked.connect(self._fcn_slider_magnify)
         # Visible scoring window indicator :
@@ -214,8 +218,16 @@ class UiSettings(object):
                                                ycam,
                                                barwidth=barwidth())
 
+    def _get_topo_window(self, start, stop, key):
+        """Get the mean of prepared data of a window (for the topoplot)."""
+        prep = PrepareData(**dict(key[1]))
+        return prep._prepare_data(self._sf, self._data[:, start:stop],
+                                  self._time[start:stop]).mean(1)
+
     def _fcn_slider_move(self):
         """Function applied when the slider move."""
+        # A pending redraw is superseded by this one :
+        self._slider_render.cancel()
         # ================= Scoring mode =================
         # If we stopped click-and-dragging, exit mousescoring mod
         # (ie revert to regular (centered) scoring window)
@@ -261,9 +273,9 @@ class UiSettings(object):
         # ---------------------------------------
         # Update topoplot if visible :
         if self._topoW.isVisible():
-            # Prepare data before plotting :
-            data = self._topo._prepare_data(self._sf, self._data[:, sl],
-                                            self._time[sl]).mean(1)
+            # Prepare data before plotting (prefetched in the background) :
+            key = (id(self._data), self._topo.get_settings())
+            data = self._topo_prefetch.get(sl.start, sl.stop, key)
             # Set preprocessed sleep data :
             self._topo.set_sleep_topo(data)
             # Update title :
@@ -330,7 +342,7 @@ class UiSettings(object):
         self._SlVal.setValue(int(sl * self._SlVal.maximum() / slmax))
 
         if self._slOnStart:
-            self._fcn_slider_move()
+            self._slider_render.request()
             # Update grid :
             if self.menuDispZoom.isChecked():
                 self._hyp.set_grid(self._time, self._SigStep.value())
@@ -353,7 +365,7 @@ class UiSettings(object):
             # Change the slider step size
             self._SigStep.setValue(win)
         # Redraw stuff as if we were moving the slider
-        self._fcn_slider_move()
+        self._slider_render.request()
 
     def _fcn_scorwin_settings(self):
         """Function applied when changing the scoring window size."""
@@ -482,13 +494,13 @@ class UiSettings(object):
         for i, _ in self._chan:
             hyp_overlay = self._chan.hyp_overlay[i]
             if viz:
-                # Build color array once (again)
+                # Build color array once (one color per segment)
                 if data_colors is None:
-                    hcolors = self._hyp.hcolors
-                    data_colors = np.array([hcolors[v] for v in self._hypno], dtype=np.float32).squeeze()
+                    data_colors = self._hyp.hyp_to_color(
+                        self._hypno.values).astype(np.float32)
                     data_colors[:, 3] = hyp_overlay.alpha
                 # Apply same color array to all
-                hyp_overlay.set_data(data_colors)
+                hyp_overlay.set_data(self._hypno, data_colors)
             hyp_overlay.region.visible = viz
 
     # =====================================================================
@@ -1,9 +1,13 @@
 """Main class for sleep tools managment."""
+import logging
 
 import numpy as np
 from PyQt5 import QtWidgets
 from visbrain.utils import (rereferencing, bipolarization, find_non_eeg,
                             commonaverage)
+from visbrain.io import RecordingSource
+
+logger = logging.getLogger('visbrain')
 
 
 class UiTools(object):
@@ -86,6 +90,12 @@ class UiTools(object):
                 # Set to ignore :
                 to_ignore[idinlst] = k.isChecked()
 
+        # Re-referencing needs the full recording in memory :
+        if isinstance(self._data, RecordingSource):
+            logger.warning("Re-referencing requires to load the full "
+                           "recording in memory")
+            self._data = np.asarray(self._data)
+
         # Get the current selected method :
         idx = int(self._ToolsRefMeth.currentIndex())
         # Single channel :
@@ -110,6 +120,10 @@ class UiTools(object):
 
         # ____________________ Update ____________________
         a_max = np.argmax(consider)
+        # Data have been modified inplace :
+        self._chan.clear_cache()
+        self._spec.clear_cache()
+        self._topo_prefetch.clear()
         # Update data info :
         self._get_data_info()
 
@@ -9,7 +9,7 @@ from .interface import UiInit, UiElements
 from .visuals import Visuals
 from visbrain._pyqt_module import _PyQtModule
 from visbrain.utils import (FixedCam, color2vb, MouseEventControl)
-from visbrain.io import ReadSleepData
+from visbrain.io import ReadSleepData, RecordingSource
 from visbrain.config import PROFILER
 
 logger = logging.getLogger('visbrain')
@@ -31,12 +31,14 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
 
     Parameters
     ----------
-    data : string, array_like | None
+    data : string, array_like, RecordingSource | None
         Polysomnographic data. Must either be a path to a supported file (see
-        notes) or an array of raw data of shape (n_channels, n_pts). If None,
-        a dialog window to load the file should appear.
-    hypno : array_like | None
-        Hypnogram data. Should be a raw vector of shape (n_pts,)
+        notes), an array of raw data of shape (n_channels, n_pts) or a
+        recording source (see visbrain.io.RecordingSource). If None, a dialog
+        window to load the file should appear.
+    hypno : array_like | RLEHypnogram | None
+        Hypnogram data. Should be a raw vector of shape (n_pts,) or a
+        run-length encoded hypnogram (see visbrain.utils.RLEHypnogram)
     config_file : string | None
         Path to the configuration file (.txt)
     annotations : string | None
@@ -66,11 +68,28 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         mean the video starts after the recording. (default 0)
     preload : bool | True
         Preload data into memory. For large datasets, turn this parameter to
-        True.
+        False : the file is then memory-mapped and only the displayed window
+        (and a small cache) is read and kept in memory.
     use_mne : bool | False
         Force to load the file using mne.io functions.
     kwargs_mne : dict | {}
         Dictionary to pass to the mne.io loading function.
+    cache : bool | string | SleepCache | False
+        Use a persistent on-disk cache of decoded recordings. The first
+        opening of a file is unchanged, next ones directly memory-map the
+        ready-to-display data. If True, the cache is located in
+        ~/visbrain_data/sleep_cache. Alternatively, use a path to a cache
+        directory or a visbrain.io.SleepCache instance.
+    stacked : bool | False
+        Display all of the channels in a single canvas (stacked montage).
+        Visible channels share a single vertex buffer and are drawn at once,
+        which keeps the navigation fast with a large number of channels.
+        Detections, peaks and hypnogram overlays are only displayed with one
+        canvas per channel (stacked=False).
+    precompute_spectro : bool | False
+        Precompute the spectrogram of every channel at load time, in a
+        process pool (default spectrogram settings). Spectrograms are then
+        immediately displayed when switching channels.
 
     Notes
     -----
@@ -91,6 +110,7 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
                  annotations=None, channels=None, sf=None, downsample=100.,
                  axis=True, states_config_file=None, video_file=None,
                  video_offset=None, preload=True, use_mne=False, kwargs_mne={},
+                 cache=False, stacked=False, precompute_spectro=False,
                  verbose=None):
         """Init."""
         _PyQtModule.__init__(self, verbose=verbose, icon='sleep_icon.svg')
@@ -109,13 +129,15 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
                                states_config_file, preload, use_mne,
                                downsample, kwargs_mne, annotations,
                                video_file=video_file,
-                               video_offset=video_offset)
+                               video_offset=video_offset, cache=cache)
 
         # ====================== VARIABLES ======================
         # Check all data :
         self._config_file = config_file
         self._annot_mark = np.array([])
         self._ax = axis
+        self._stacked = stacked
+        self._precompute_spectro = precompute_spectro
         # ---------- Default line width ----------
         self._lw = 1.
         self._lwhyp = 2
@@ -170,6 +192,22 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         """Return corresponding data info."""
         return self._datainfo[key]
 
+    def closeEvent(self, event):  # noqa
+        """Executed method when the GUI closed."""
+        # Stop the detection processes and remove the shared arrays :
+        self._detect_pool.close()
+        _PyQtModule.closeEvent(self, event)
+
+    @property
+    def render_stats(self):
+        """Get navigation redraw statistics.
+
+        Returns a dictionary with the number of redraws (frames), the number
+        of dropped (merged) redraws and the last and mean latencies between a
+        navigation request and the end of its redraw (in seconds).
+        """
+        return self._slider_render.stats
+
     def replace_detections(self, dtype, method):
         """Replace the default detection methods.
 
@@ -225,9 +263,12 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
     ###########################################################################
     def _get_data_info(self):
         """Get some info about data (min, max, std, mean, dist)."""
-        self._datainfo = {'min': self._data.min(1), 'max': self._data.max(1),
-                          'std': self._data.std(1), 'mean': self._data.mean(1),
-                          'dist': self._data.max(1) - self._data.min(1)}
+        data = self._data
+        if isinstance(data, RecordingSource):  # estimated on a few windows
+            data = data.subsample()
+        self._datainfo = {'min': data.min(1), 'max': data.max(1),
+                          'std': data.std(1), 'mean': data.mean(1),
+                          'dist': data.max(1) - data.min(1)}
 
     def _set_default_state(self):
         """Set the default window state."""
@@ -243,6 +284,10 @@ class Sleep(_PyQtModule, ReadSleepData, UiInit, Visuals, UiElements,
         self._chanCam = []
         for k in range(len(self)):
             self._chanCam.append(FixedCam())  # viscam.PanZoomCamera()
+        self._stackCam = None
+        if self._stacked:
+            self._stackCam = FixedCam()
+            self._stackCanvas.set_camera(self._stackCam)
         # ------------------- Spectrogram -------------------
         self._speccam = FixedCam()  # viscam.PanZoomCamera()
         self._specCanvas.set_camera(self._speccam)
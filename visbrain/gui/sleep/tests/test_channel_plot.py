@@ -0,0 +1,52 @@
+"""Test the ChannelPlot of the Sleep module."""
+import numpy as np
+
+from visbrain.gui.sleep.interface.ui_init import AxisCanvas
+from visbrain.gui.sleep.visuals.visuals import ChannelPlot
+from visbrain.utils import FixedCam, PrepareData
+
+
+n_channels, sf, n_pts = 3, 100., 3000
+channels = ['chan%i' % k for k in range(n_channels)]
+data = np.random.RandomState(0).rand(n_channels, n_pts).astype(np.float32)
+time = np.arange(n_pts) / sf
+
+
+class TestChannelPlot(object):
+    """Test ChannelPlot."""
+
+    def test_stacked_montage(self):
+        """Test ChannelPlot using a stacked montage."""
+        parent = [AxisCanvas(axis=False) for k in channels]
+        stack = AxisCanvas(axis=False)
+        camera = FixedCam()
+        stack.set_camera(camera)
+        chan = ChannelPlot(channels, time, color='blue', parent=parent,
+                           stack_parent=stack, stack_camera=camera)
+        assert chan._stack is not None
+        np.testing.assert_array_equal(chan.color.ravel(),
+                                      chan._stack.color.ravel())
+        chan.visible = np.ones((n_channels,), dtype=bool)
+        chan.set_data(sf, data, time, sl=slice(0, 1000))
+        assert camera.rect.width > 0.
+        assert camera.rect.height == n_channels
+
+    def test_prepared_cache(self):
+        """Test that wavelets with window operations bypass the cache."""
+        parent = [AxisCanvas(axis=False) for k in channels]
+        chan = ChannelPlot(channels, time, color='blue', parent=parent)
+        chan._get_prep_cache(sf, data)
+        visible = np.ones((n_channels,), dtype=bool)
+        sl = slice(0, 1000)
+        for dispas in ['filter', 'amplitude']:
+            kw = dict(axis=1, filt=True, fstart=1., fend=10., dispas=dispas)
+            assert chan._get_prepared(PrepareData(**kw), data, sl, visible,
+                                      -1) is None
+            chan._prep_cache.wait()
+            assert chan._get_prepared(PrepareData(**kw), data, sl, visible,
+                                      -1) is not None
+            # De-trending changes the wavelet of the window :
+            prep = PrepareData(detrend=True, **kw)
+            cached = chan._get_prepared(prep, data, sl, visible, -1)
+            assert (cached is None) == (dispas != 'filter')
+        chan._prep_cache.close()
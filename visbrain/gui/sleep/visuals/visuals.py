@@ -13,12 +13,18 @@ from scipy.stats import rankdata
 
 import vispy.visuals.transforms as vist
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import Qt, QUrl, QDir
+from PyQt5.QtCore import Qt, QUrl, QDir, QObject, pyqtSignal
 from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
 from visbrain.config import PROFILER
 from visbrain.utils import PrepareData, cmap_to_glsl, color2vb
 from visbrain.utils.sleep.event import _index_to_events
-from visbrain.visuals import TFmapsMesh, TopoMesh
+from visbrain.utils.sleep.hypnoprocessing import (hypno_lut, hypno_lookup,
+                                                  RLEHypnogram)
+from visbrain.utils.sleep.prefetch import WindowPrefetcher
+from visbrain.utils.sleep.prepcache import PreparedCache
+from visbrain.utils.sleep.pyramid import MinMaxPyramid, minmax_envelope
+from visbrain.utils.sleep.spectro import SpectrogramCache
+from visbrain.visuals import StackedSignal, TFmapsMesh, TopoMesh
 from vispy import scene
 
 from .marker import Markers
@@ -220,17 +226,33 @@ class Detection(object):
             self[k]['index'] = np.array([])
 
 
+class _CacheNotifier(QObject):
+    """Forward notifications of background threads to the GUI thread."""
+
+    ready = pyqtSignal()
+
+
 class ChannelPlot(PrepareData):
-    """Plot each channel."""
+    """Plot each channel.
+
+    By default, each channel is drawn in its own canvas. If stack_parent is
+    provided, visible channels are instead drawn at once in a single canvas
+    (stacked montage).
+    """
 
     def __init__(self, channels, time, color=(.2, .2, .2), width=1.5,
                  color_detection='red', method='gl', camera=None,
-                 parent=None, fcn=None):
+                 parent=None, fcn=None, stack_parent=None, stack_camera=None):
         # Initialize PrepareData :
         PrepareData.__init__(self, axis=1)
 
         # Variables :
         self._camera = camera
+        self._canvas = parent
+        self._pyramid = None
+        self._prep_cache = None
+        self._prefetch, self._win_state = None, None
+        self._lod_base = 16
         self._preproc_channel = -1
         self.rect = []
         self.width = width
@@ -238,11 +260,22 @@ class ChannelPlot(PrepareData):
         self._fcn = fcn
         self.visible = np.array([True] + [False] * (len(channels) - 1))
         self.consider = np.ones((len(channels),), dtype=bool)
+        # Redraw when the whole-recording filtering is done :
+        self._notifier = _CacheNotifier()
+        self._notifier.ready.connect(self._on_prepared)
 
         # Get color :
         self.color = color2vb(color)
         self.color_detection = color2vb(color_detection)
 
+        # Stacked montage :
+        self._stack, self._stack_camera = None, stack_camera
+        self._stack_canvas = stack_parent
+        if stack_parent is not None:
+            self._stack = StackedSignal(len(channels), color=self.color,
+                                        width=width, method=method,
+                                        parent=stack_parent.wc.scene)
+
         # Create one line per channel :
         pos = np.zeros((1, 3), dtype=np.float32)
         self.mesh, self.report, self.grid, self.peak, self.scorwin_ind, self.hyp_overlay = \
@@ -336,35 +369,35 @@ class ChannelPlot(PrepareData):
         # Slice selection (of time and data) :
         time_sl = time[sl]
         self.x = (time_sl.min(), time_sl.max())
-        data_sl = data[self.visible, sl]
-        z = np.full_like(time_sl, .5, dtype=np.float32)
-
-        # Prepare the data (only if needed) :
-        if self:
-            if self._preproc_channel == -1:  # prepare all channels
-                data_sl = self._prepare_data(sf, data_sl.copy(), time_sl)
-            else:  # filt only one channel
-                # Get on which visible channel to apply preprocessing :
-                chan_lst_viz = list(np.arange(len(self))[self.visible])
-                to_chan = chan_lst_viz.index(self._preproc_channel)
-                data_sl[[to_chan], :] = self._prepare_data(sf, data_sl[
-                    [to_chan], :].copy(), time_sl)
+        n_pixels = self._get_n_pixels()
+
+        # Get the prepared window (most of the time, prefetched in the
+        # background while the previous one was displayed) :
+        prefetcher = self._get_prefetcher(sf, data, time)
+        if self.filt:
+            self._get_prep_cache(sf, data)
+        elif (not self) and (sl.stop - sl.start >= self._lod_base * n_pixels):
+            self._get_pyramid(data)
+        key = (self.get_settings(), self.visible.tobytes(),
+               self._preproc_channel, n_pixels, self._stack is None)
+        time_sl, data_sl, vertices, yminmax = prefetcher.get(sl.start,
+                                                             sl.stop, key)
+
+        # Stacked montage (all of the channels drawn at once) :
+        if self._stack is not None:
+            ylim = yminmax if self.autoamp else np.asarray(ylim)[
+                self.visible, :]
+            self._set_stacked_data(data_sl, time_sl, ylim)
+            return
 
         # Set data to each plot :
         for l, (i, k) in enumerate(self):
-            # ________ MAIN DATA ________
-            # Select channel ;
-            datchan = data_sl[l, :]
-
-            # Concatenate time / data / z axis :
-            dat = np.vstack((time_sl, datchan, z)).T
-
             # Set main ligne :
-            k.set_data(dat, width=self.width)
+            k.set_data(vertices[l], width=self.width)
 
             # ________ CAMERA ________
             # Use either auto / fixed adaptative camera :
-            ycam = (datchan.min(), datchan.max()) if self.autoamp else ylim[i]
+            ycam = yminmax[l, :] if self.autoamp else ylim[i]
 
             # Get camera rectangle and set it:
             rect = (self.x[0], ycam[0], self.x[1] - self.x[0],
@@ -373,6 +406,169 @@ class ChannelPlot(PrepareData):
             k.update()
             self.rect.append(rect)
 
+    def _get_window(self, start, stop, key):
+        """Prepare the window [start, stop) of data.
+
+        This method is called from worker threads : settings are read from
+        the key and attributes of the object are never modified.
+
+        Returns
+        -------
+        time_sl, data_sl : array_like
+            The time vector and prepared data of visible channels.
+        vertices : list
+            Vertices of each visible channel (empty for stacked montages).
+        yminmax : array_like
+            Min and max of each visible channel, of shape (n_visible, 2).
+        """
+        sf, data, time = self._win_state
+        settings, visible, preproc, n_pixels, per_channel = key
+        visible = np.frombuffer(visible, dtype=bool)
+        prep = PrepareData(**dict(settings))
+        sl = slice(start, stop)
+        time_sl = time[sl]
+
+        if not prep:
+            # Use the min / max envelope of raw data for long windows (the
+            # pyramid is built in the main thread, when first needed) :
+            index, pyramid = None, self._pyramid
+            is_long = stop - start >= self._lod_base * n_pixels
+            if is_long and (pyramid is not None) and (pyramid[0] is data):
+                index, data_sl = pyramid[1].get(visible, start, stop,
+                                                n_pixels)
+            if index is None:
+                data_sl = data[visible, sl]
+            else:
+                time_sl = time[index]
+        else:
+            # Filtered data are sliced from the whole-recording cache. Until
+            # it is ready, only the window is prepared :
+            data_sl = self._get_prepared(prep, data, sl, visible, preproc)
+            if data_sl is None:
+                data_sl = data[visible, sl]
+                # Prepare the data :
+                if preproc == -1:  # prepare all channels
+                    data_sl = prep._prepare_data(sf, data_sl, time_sl)
+                else:  # filt only one channel
+                    # Get on which visible channel to apply preprocessing :
+                    chan_lst_viz = list(np.arange(len(self))[visible])
+                    to_chan = chan_lst_viz.index(preproc)
+                    data_sl[[to_chan], :] = prep._prepare_data(sf, data_sl[
+                        [to_chan], :], time_sl)
+            # Min / max envelope of prepared data for long windows :
+            bin_size = data_sl.shape[1] // n_pixels
+            if bin_size >= 2:
+                data_sl = minmax_envelope(data_sl, bin_size)
+                time_sl = np.repeat(time_sl[::bin_size], 2)
+
+        # Concatenate time / data / z axis :
+        vertices = []
+        if per_channel:
+            z = np.full_like(time_sl, .5, dtype=np.float32)
+            vertices = [np.vstack((time_sl, k, z)).T for k in data_sl]
+        yminmax = np.c_[data_sl.min(1), data_sl.max(1)] if data_sl.shape[
+            1] else np.zeros((data_sl.shape[0], 2))
+        return time_sl, data_sl, vertices, yminmax
+
+    def _get_prefetcher(self, sf, data, time):
+        """Get the prefetcher of windows (reset if data changed)."""
+        state = self._win_state
+        if (state is None) or (state[0] != sf) or (state[1] is not data) or (
+                state[2] is not time):
+            self._win_state = (sf, data, time)
+            if self._prefetch is not None:
+                self._prefetch.close()
+            self._prefetch = WindowPrefetcher(self._get_window, data.shape[1])
+        return self._prefetch
+
+    def _set_stacked_data(self, data_sl, time_sl, ylim):
+        """Set data to the stacked montage."""
+        n_visible = int(self.visible.sum())
+        if not n_visible:
+            return
+        self._stack.width = self.width
+        self._stack.set_data(data_sl, time_sl, ylim)
+        if self._stack_camera is not None:
+            self._stack_camera.rect = (self.x[0], 0., self.x[1] - self.x[0],
+                                       n_visible)
+
+    def _get_n_pixels(self):
+        """Get the width (in pixels) of the widest visible canvas."""
+        if self._stack_canvas is not None:
+            return max(self._stack_canvas.canvas.size[0], 1)
+        if self._canvas is None:
+            return 1000
+        return max([self._canvas[i].canvas.size[0] for i, _ in self] +
+                   [1])
+
+    def _get_pyramid(self, data):
+        """Get the min / max pyramid of data (built if needed)."""
+        if (self._pyramid is None) or (self._pyramid[0] is not data):
+            self._pyramid = (data, MinMaxPyramid(data, base=self._lod_base))
+        return self._pyramid[1]
+
+    def _get_prep_cache(self, sf, data):
+        """Get the whole-recording cache of prepared data."""
+        cache = self._prep_cache
+        if (cache is None) or (cache._data is not data) or (cache._sf != sf):
+            if cache is not None:
+                cache.close()
+            cache = self._prep_cache = PreparedCache(
+                data, sf, callback=self._notifier.ready.emit)
+        return cache
+
+    def _on_prepared(self):
+        """Redraw once the whole-recording filtering is done."""
+        # Windows prepared in the meantime were only filtered per window :
+        if self._prefetch is not None:
+            self._prefetch.clear()
+        self.update()
+
+    def _get_prepared(self, prep, data, sl, visible, preproc):
+        """Get prepared data from the whole-recording cache.
+
+        Only the filtering is applied to the whole recording. De-meaning and
+        de-trending are applied to the window. As they change the wavelet
+        decomposition of the window, the cache is not used for wavelets when
+        one of them is set. None is returned if the cache can't be used or is
+        not ready.
+        """
+        cache = self._prep_cache
+        if (not prep.filt) or (cache is None) or (cache._data is not data):
+            return None
+        if (prep.dispas != 'filter') and (prep.demean or prep.detrend):
+            return None
+        chan_lst_viz = list(np.arange(len(self))[visible])
+        to_prep = chan_lst_viz if preproc == -1 else [preproc]
+        data_prep = cache.get(prep, to_prep, sl)
+        if data_prep is None:
+            return None
+        # Window operations :
+        if prep.dispas == 'filter':
+            if prep.demean:
+                data_prep -= data_prep.mean(axis=1, keepdims=True)
+            if prep.detrend:
+                data_prep = scpsig.detrend(data_prep, axis=1,
+                                           overwrite_data=True)
+        if preproc == -1:
+            return data_prep
+        data_sl = data[visible, sl]
+        data_sl[[chan_lst_viz.index(preproc)], :] = data_prep
+        return data_sl
+
+    def clear_cache(self):
+        """Clear the min / max pyramid and prepared data caches.
+
+        This method should be called when data are modified inplace (e.g
+        re-referencing).
+        """
+        self._pyramid = None
+        if self._prep_cache is not None:
+            self._prep_cache.close()
+            self._prep_cache = None
+        if self._prefetch is not None:
+            self._prefetch.clear()
+
     def set_location(self, sf, data, channel, start, end, factor=100.):
         """Set vertical lines for detections."""
         # Get data limits :
@@ -432,14 +628,24 @@ class ChannelPlot(PrepareData):
         self._autoamp = value
 
 
+class _SpectroNotifier(QObject):
+    """Forward notifications of the spectrogram worker to the GUI thread."""
+
+    ready = pyqtSignal(object)
+    progress = pyqtSignal(object, float)
+
+
 class Spectrogram(PrepareData):
     """Create and manage a Spectrogram object.
 
     After object creation, use the set_data() method to pass new data, new
     color, new frequency / time range, new settings...
+
+    Spectrograms are computed in a background thread and cached (by channel,
+    method, nfft, overlap and preprocessing).
     """
 
-    def __init__(self, camera, parent=None, fcn=None):
+    def __init__(self, camera, parent=None, fcn=None, fcn_progress=None):
         # Initialize PrepareData :
         PrepareData.__init__(self, axis=0)
 
@@ -455,9 +661,19 @@ class Spectrogram(PrepareData):
                                         name='Fourier transform')
         self.mesh.transform = vist.STTransform()
 
+        # Background computations (results are displayed from the GUI
+        # thread) :
+        self._notifier = _SpectroNotifier()
+        self._notifier.ready.connect(self._on_computed)
+        if fcn_progress is not None:
+            self._notifier.progress.connect(fcn_progress)
+        self._cache = SpectrogramCache(callback=self._notifier.ready.emit,
+                                       progress=self._notifier.progress.emit)
+        self._requested = None  # (key, display settings)
+
     def set_data(self, sf, data, time, method='Fourier transform',
                  cmap='rainbow', nfft=30., overlap=0., fstart=.5, fend=20.,
-                 contrast=.5, interp='nearest', norm=0):
+                 contrast=.5, interp='nearest', norm=0, channel=0, block=True):
         """Set data to the spectrogram.
 
         Use this method to change data, colormap, spectrogram settings, the
@@ -489,39 +705,77 @@ class Spectrogram(PrepareData):
             Interpolation method.
         norm : int | 0
             Normalization method for TF.
+        channel : int | 0
+            Index of the channel (used to cache the spectrogram).
+        block : bool | True
+            If False and if the spectrogram is not cached, it is computed in
+            a background thread and displayed when ready. The computation
+            running for previous settings is cancelled.
+
+        Returns
+        -------
+        displayed : bool
+            Get if the spectrogram has been displayed.
+        """
+        key = self._cache.key(channel, prep=self, method=method, nfft=nfft,
+                              overlap=overlap, fstart=fstart, fend=fend,
+                              norm=norm)
+        disp = dict(sf=sf, time=time, method=method, cmap=cmap, fstart=fstart,
+                    fend=fend, contrast=contrast, interp=interp)
+        self._requested = (key, disp)
+        spectro = self._cache.get(key)
+        if spectro is None:
+            if not block:
+                self._cache.submit(key, data, sf)
+                return False
+            self._cache.cancel()
+            spectro = self._cache.compute(key, data, sf)
+        self._display(*spectro, **disp)
+        return True
+
+    def precompute(self, sf, data, n_jobs=-1, **kwargs):
+        """Precompute the spectrogram of all channels in a process pool.
+
+        Parameters
+        ----------
+        sf: float
+            The sampling frequency.
+        data: array_like
+            The data of shape (n_channels, n_pts).
+        n_jobs : int | -1
+            Number of processes. If -1, all of the cpus are used.
+        kwargs : dict | {}
+            Spectrogram settings (method, nfft, overlap, fstart, fend, norm).
         """
-        # =================== PREPARE DATA ===================
-        # Prepare data (only if needed)
-        if self:
-            data = self._prepare_data(sf, data.copy(), time)
+        self._cache.precompute(data, sf, prep=self, n_jobs=n_jobs, **kwargs)
 
-        nperseg = int(round(nfft * sf))
+    def cancel(self):
+        """Cancel the spectrogram computed in the background."""
+        self._cache.cancel()
 
+    def clear_cache(self):
+        """Remove cached spectrograms (e.g when data are modified)."""
+        self._cache.clear()
+
+    def _on_computed(self, key):
+        """Display a spectrogram computed in the background."""
+        if (self._requested is None) or (self._requested[0] != key):
+            return
+        spectro = self._cache.get(key)
+        if spectro is not None:
+            self._display(*spectro, **self._requested[1])
+
+    def _display(self, freq, mesh, sf, time, method, cmap, fstart, fend,
+                 contrast, interp):
+        """Display a computed spectrogram or time-frequency map."""
         # =================== TF // SPECTRO ===================
         if method == 'Wavelet':
-            self.tf.set_data(data, sf, f_min=fstart, f_max=fend, cmap=cmap,
-                             contrast=contrast, n_window=nperseg,
-                             overlap=overlap, window='hamming', norm=norm)
+            self.tf.set_tf(mesh, freq, len(time), sf, contrast=contrast,
+                           cmap=cmap)
             self.tf._image.interpolation = interp
             self.rect = self.tf.rect
             self.freq = self.tf.freqs
         else:
-            # =================== CONVERSION ===================
-            overlap = int(round(overlap * nperseg))
-
-            if method == 'Multitaper':
-                from lspopt import spectrogram_lspopt
-                freq, _, mesh = spectrogram_lspopt(data, fs=sf,
-                                                   nperseg=nperseg,
-                                                   c_parameter=20,
-                                                   noverlap=overlap)
-            elif method == 'Fourier transform':
-                freq, _, mesh = scpsig.spectrogram(data, fs=sf,
-                                                   nperseg=nperseg,
-                                                   noverlap=overlap,
-                                                   window='hamming')
-            mesh = 20 * np.log10(mesh)
-
             # =================== FREQUENCY SELECTION ===================
             # Find where freq is [fstart, fend] :
             f = [0., 0.]
@@ -533,8 +787,8 @@ class Spectrogram(PrepareData):
             self._fstart, self._fend = freq[0], freq[-1]
 
             # =================== COLOR ===================
-            # Get clim :
-            _mesh = mesh[sls, :]
+            # Get clim (the cached spectrogram is not modified) :
+            _mesh = mesh[sls, :].copy()
             is_finite = np.isfinite(_mesh)
             _mesh[~is_finite] = np.percentile(_mesh[is_finite], 5)
             contrast = 1. if contrast is None else contrast
@@ -570,6 +824,7 @@ class Spectrogram(PrepareData):
         self.mesh.set_data(pos)
         self.mesh.parent = None
         self.mesh = None
+        self._cache.close()
 
     # ----------- RECT -----------
     @property
@@ -615,6 +870,9 @@ class Hypnogram(object):
                 rankdata(hYranks) - 1  # rankdata is 1-indexed
             )
         }
+        # Dense lookup table (value -> Y position) :
+        self._ypos_lut, self._vmin = hypno_lut(list(self.hYpos.keys()),
+                                               list(self.hYpos.values()))
         # Camera rectangle. yPos are 0 to -(nstates - 1)
         self._rect = (0., 0., 0., 0.)
         self.rect = (time.min(), -len(hvalues),
@@ -622,7 +880,7 @@ class Hypnogram(object):
         self.width = width
         self.n = len(time)
         # Color for each of the vigilance state value
-        self._hcolors = {
+        self.hcolors = {
             value: color2vb(color=col)
             for value, col in zip(hvalues, hcolors)
         }  # Display color per vigilance state: {int: (1,4)-nparray}
@@ -657,24 +915,32 @@ class Hypnogram(object):
         ----------
         sf: float
             The sampling frequency.
-        data: array_like
+        data: array_like | RLEHypnogram
             Vigilance state values to sent. Must be a row vector.
         time: array_like
             The time vector
         """
-        data_pos = np.array([self.hYpos[v] for v in data])
-        # Build color array: (nsamples, 4)-nparray
-        data_colors = np.array([self.hcolors[v] for v in data]).squeeze()
+        self._rle = RLEHypnogram.from_array(data)
+        self._time = time
+        self._update()
+
+    def _update(self):
+        """Draw the hypnogram (two vertices per segment)."""
+        hyp, n = self._rle, len(self._time)
+        time = self._time[np.c_[hyp.onsets, np.minimum(hyp.ends, n - 1)]]
+        data_pos = np.repeat(self.hyp_to_gui(hyp.values), 2)
+        # Build color array: (2 * n_segments, 4)-nparray
+        data_colors = np.repeat(self.hyp_to_color(hyp.values), 2, axis=0)
         # Set data to the mesh :
-        self.mesh.set_data(pos=np.vstack((time, data_pos)).T,
+        self.mesh.set_data(pos=np.c_[time.ravel(), data_pos],
                            width=self.width, color=data_colors)
         self.mesh.update()
 
     def set_state(self, stfrom, stend, value):
         """Add a vigilance state in a specific interval.
 
-        This method only set the vigilance state without updating the entire
-        hypnogram.
+        This method only updates the segments of the hypnogram (the
+        per-sample hypnogram is never built).
 
         Parameters
         ----------
@@ -685,12 +951,8 @@ class Hypnogram(object):
         value : int
             State value.
         """
-        state_ypos = self.hYpos[value]
-        # Update color :
-        self.mesh.color[stfrom + 1:stend + 1, :] = self.hcolors[value]
-        # Only update the needed part :
-        self.mesh.pos[stfrom:stend, 1] = state_ypos
-        self.mesh.update()
+        self._rle.set_state(stfrom, stend, value)
+        self._update()
 
     def set_grid(self, time, length=30., y=1.):
         """Set grid lentgh."""
@@ -715,29 +977,37 @@ class Hypnogram(object):
         -------
         data_rank : array_like
         """
-        return np.array([self.hYpos[v] for v in data])
+        return hypno_lookup(self._ypos_lut, self._vmin, data)
+
+    def hyp_to_color(self, data):
+        """Convert hypnogram data to colors.
+
+        Parameters
+        ----------
+        data : array_like
+            The data to send. Must be a row vector.
+
+        Returns
+        -------
+        data_colors : array_like
+            Array of colors of shape (len(data), 4).
+        """
+        return hypno_lookup(self._color_lut, self._color_vmin, data)
 
     def gui_to_hyp(self):
         """Convert GUI hypnogram Y positions into hypnogram state values.
 
         Returns
         -------
-        data : array_like
+        data : RLEHypnogram
             The converted data.
         """
-        # Get latest data version :
-        data_ypos = self.mesh.pos[:, 1]
-        # Value from Y position
-        hYpos_inv = {
-            pos: value for value, pos in self.hYpos.items()
-        }
-        return np.array([hYpos_inv[r] for r in data_ypos])
+        return self._rle.copy()
 
     def clean(self, sf, time):
         """Clean indicators."""
         # Mesh :
-        posmesh = np.zeros((len(self),), dtype=np.float32)
-        self.set_data(sf, posmesh, time)
+        self.set_data(sf, RLEHypnogram.full(len(self), 0), time)
         # Edit :
         posedit = np.full((1, 3), -10., dtype=np.float32)
         self.edit.set_data(pos=posedit, face_color='gray')
@@ -763,11 +1033,11 @@ class Hypnogram(object):
     def hcolors(self, value):
         """Set new {value: (4,1)-array} hypnogram colors map and redraw hyp"""
         self._hcolors = value
+        self._color_lut, self._color_vmin = hypno_lut(
+            list(value.keys()), np.concatenate(list(value.values())), fill=0.)
         # Redraw hypnogram
-        hdata = self.gui_to_hyp()  # (nsamples,1) array
-        data_colors = np.array([self.hcolors[v] for v in hdata]).squeeze()
-        self.mesh.set_data(color=data_colors)
-        self.mesh.update()
+        if hasattr(self, '_rle'):
+            self._update()
 
 
 """
@@ -946,27 +1216,32 @@ class HypnoOverlay(object):
 
         # Create a vispy image object :
         assert time is not None
-        pos = np.zeros((len(time), 1), dtype=np.float32)
-        pos[:, 0] = time
-        color = np.zeros((len(time), 4), dtype=np.float32)
+        self._time = time
+        pos = np.array([time[0], time[-1]], dtype=np.float32)
+        color = np.zeros((2, 4), dtype=np.float32)
         self.region = scene.visuals.LinearRegion(
-            pos=time, color=color,
+            pos=pos, color=color,
             vertical=True,
             name=name, parent=parent,
         )
         self.region.visible = visible
         self.region.update()
 
-    def set_data(self, data_colors):
+    def set_data(self, hypno, data_colors):
         """Set data to the hypnogram indicator.
 
         Parameters
         ----------
-        data_colors (ndarray): (nsamples, 4) array of RGBA colors
+        hypno (RLEHypnogram): the hypnogram
+        data_colors (ndarray): (n_segments, 4) array of RGBA colors
         """
         assert data_colors.shape[1] == 4
+        # Each segment is a region of constant color :
+        n = len(self._time)
+        index = np.c_[hypno.onsets, np.minimum(hypno.ends, n - 1)]
         self.region.set_data(
-            color=data_colors
+            pos=self._time[index].ravel(),
+            color=np.repeat(data_colors, 2, axis=0)
         )
         self.region.update()
     
@@ -1463,15 +1738,21 @@ class Visuals(CanvasShortcuts):
                                  color=self._chancolor, width=self._lw,
                                  color_detection=self._indicol,
                                  parent=self._chanCanvas,
-                                 fcn=self._fcn_slider_move)
+                                 fcn=self._fcn_slider_move,
+                                 stack_parent=self._stackCanvas,
+                                 stack_camera=self._stackCam)
         PROFILER('Channels', level=1)
 
         # =================== SPECTROGRAM ===================
         # Create a spectrogram object :
         self._spec = Spectrogram(camera=cameras[1],
                                  fcn=self._fcn_spec_set_data,
+                                 fcn_progress=self._fcn_spec_progress,
                                  parent=self._specCanvas.wc.scene)
         self._spec.set_data(sf, data[0, ...], time, cmap=self._defcmap)
+        # The first channel is already cached so it's not precomputed :
+        if self._precompute_spectro:
+            self._spec.precompute(sf, data)
         PROFILER('Spectrogram', level=1)
         # Create a visual indicator for spectrogram :
         self._specInd = Indicator(name='spectro_indic', visible=True, alpha=.3,
@@ -1509,6 +1790,8 @@ class Visuals(CanvasShortcuts):
         cameras[3].rect = self._topo.rect
         cameras[3].aspect = 1.
         self._pan_pick.model().item(3).setEnabled(any(self._topo._keeponly))
+        self._topo_prefetch = WindowPrefetcher(self._get_topo_window,
+                                               self._data.shape[1])
         PROFILER('Topoplot', level=1)
 
         # =================== VIDEO ===================
@@ -1523,6 +1806,8 @@ class Visuals(CanvasShortcuts):
 
         # =================== SHORTCUTS ===================
         axiscanvas = self._chanCanvas + [self._specCanvas, self._hypCanvas]
+        if self._stackCanvas is not None:
+            axiscanvas.append(self._stackCanvas)
         for axiscan in axiscanvas:
             CanvasShortcuts.__init__(self, axiscan)
         self._shpopup.set_shortcuts(self.sh)
@@ -1,20 +1,39 @@
-"""Load read and write functions."""
-from .dependencies import (is_mne_installed, is_nibabel_installed,  # noqa
-                           is_opengl_installed, is_pandas_installed,
-                           is_lspopt_installed, is_xlrd_installed,
-                           is_tensorpac_installed, is_sc_image_installed)
-from .dialog import *  # noqa
-from .download import *  # noqa
-from .mneio import *  # noqa
-from .path import *  # noqa
-from .read_annotations import *  # noqa
-from .read_data import *  # noqa
-from .rw_nifti import (read_nifti, read_mist, niimg_to_transform)  # noqa
-from .read_sleep import (ReadSleepData, get_sleep_stats)  # noqa
-from .rw_config import *  # noqa
-from .rw_hypno import *  # noqa
-from .rw_utils import *  # noqa
-from .write_data import *  # noqa
-from .write_image import *  # noqa
-from .write_table import *  # noqa
-from .write_template import *  # noqa
+"""Load read and write functions.
+
+Submodules are only imported when one of their functions is used (see
+visbrain._lazy).
+"""
+from .._lazy import lazy_package
+
+__getattr__, __dir__, __all__ = lazy_package(__name__, attributes={
+    'dependencies': ['is_mne_installed', 'is_nibabel_installed',
+                     'is_opengl_installed', 'is_pandas_installed',
+                     'is_lspopt_installed', 'is_xlrd_installed',
+                     'is_tensorpac_installed', 'is_sc_image_installed'],
+    'dialog': ['dialog_save', 'dialog_load', 'dialog_color'],
+    'download': ['download_file'],
+    'mneio': ['mne_switch'],
+    'path': ['path_to_visbrain_data', 'get_files_in_folders', 'path_to_tmp',
+             'clean_tmp', 'get_data_url_path'],
+    'read_annotations': ['annotations_to_array', 'merge_annotations'],
+    'read_data': ['read_mat', 'read_pickle', 'read_npy', 'read_npz',
+                  'read_txt', 'read_csv', 'read_json', 'read_stc', 'read_x3d',
+                  'read_gii', 'read_obj', 'is_freesurfer_mesh_file',
+                  'read_freesurfer_mesh'],
+    'rw_nifti': ['read_nifti', 'read_mist', 'niimg_to_transform'],
+    'read_sleep': ['ReadSleepData', 'get_sleep_stats'],
+    'rw_config': ['save_config_json', 'load_config_json'],
+    'rw_hypno': ['oversample_hypno', 'write_hypno', 'read_hypno'],
+    'rw_utils': ['get_file_ext', 'safety_save'],
+    'sleep_source': ['RecordingSource', 'ArraySource', 'EdfSource',
+                     'MneSource'],
+    'sleep_cache': ['SleepCache'],
+    'sleep_batch': ['run_sleep_batch', 'benchmark_sleep_batch'],
+    'write_data': ['write_npy', 'write_npz', 'write_mat', 'write_txt',
+                   'write_csv', 'write_hyp'],
+    'write_image': ['write_fig_hyp', 'write_fig_spindles', 'write_fig_canvas',
+                    'write_fig_pyqt', 'mpl_preview'],
+    'write_table': ['write_table_txt', 'write_table_csv'],
+    'write_template': ['add_brain_template', 'remove_brain_template',
+                       'save_volume_template', 'remove_volume_template'],
+})
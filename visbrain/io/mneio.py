@@ -1,7 +1,7 @@
 """Utility functions for MNE."""
 import datetime
 import numpy as np
-from ..utils import get_dsf
+from ..utils import get_dsf, resample
 
 __all__ = ['mne_switch']
 
@@ -16,7 +16,8 @@ def mne_switch(file, ext, downsample, preload=True, **kwargs):
     ext : string
         File extension (e.g. '.edf'').
     preload : bool | True
-        Preload data in memory.
+        Preload data in memory. If False, data are lazily read through a
+        visbrain.io.MneSource.
     kwargs : dict | {}
         Further arguments to pass to the mne.io.read function.
 
@@ -28,7 +29,7 @@ def mne_switch(file, ext, downsample, preload=True, **kwargs):
         The down-sampling frequency used.
     dsf : int
         The down-sampling factor.
-    data : array_like
+    data : array_like | MneSource
         The raw data of shape (n_channels, n_points)
     channels : list
         List of channel names.
@@ -42,9 +43,6 @@ def mne_switch(file, ext, downsample, preload=True, **kwargs):
     # Get full path :
     path = file + ext
 
-    # Preload :
-    if preload is False:
-        preload = 'temp.dat'
     kwargs['preload'] = preload
 
     if ext.lower() == '.edf':
@@ -70,15 +68,22 @@ def mne_switch(file, ext, downsample, preload=True, **kwargs):
     sf = raw.info['sfreq']
     dsf, downsample = get_dsf(downsample, sf)
     channels = raw.info['ch_names']
-    data = raw._data
+    n_chan, n = len(channels), raw.n_times
 
     # Conversion Volt (MNE) to microVolt (Visbrain):
+    gain = np.ones((n_chan,))
     if raw._raw_extras[0] is not None and 'units' in raw._raw_extras[0]:
-        units = raw._raw_extras[0]['units'][0:data.shape[0]]
-        data /= np.array(units).reshape(-1, 1)
+        gain /= np.array(raw._raw_extras[0]['units'][0:n_chan])
+
+    if preload:
+        data = raw._data
+        data *= gain.reshape(-1, 1)
+        data = resample(data, 1, dsf, n_jobs=-1)
+    else:
+        from .sleep_source import MneSource
+        data = MneSource(raw, gain=gain, dsf=dsf)
 
-    n = data.shape[1]
     start_time = datetime.time(0, 0, 0)  # raw.info['meas_date']
     anot = raw.annotations
 
-    return sf, downsample, dsf, data[:, ::dsf], channels, n, start_time, anot
+    return sf, downsample, dsf, data, channels, n, start_time, anot
@@ -22,12 +22,16 @@ from visbrain.io.mneio import mne_switch
 from visbrain.io.rw_hypno import (read_hypno, oversample_hypno)
 from visbrain.io.rw_utils import get_file_ext
 from visbrain.io.read_states_cfg import load_states_cfg
+from visbrain.io.sleep_source import (RecordingSource, ArraySource,
+                                      EdfSource)
+from visbrain.io.sleep_cache import SleepCache
 from visbrain.io.write_data import write_csv
 from visbrain.io import merge_annotations
 
 from visbrain.utils.others import get_dsf
+from visbrain.utils.filtering import resample
 from visbrain.utils.mesh import vispy_array
-from visbrain.utils.sleep.hypnoprocessing import sleepstats
+from visbrain.utils.sleep.hypnoprocessing import sleepstats, RLEHypnogram
 
 from visbrain.config import PROFILER
 
@@ -41,7 +45,7 @@ class ReadSleepData(object):
 
     def __init__(self, data, channels, sf, hypno, states_config_file, preload,
                  use_mne, downsample, kwargs_mne, annotations, video_file=None,
-                 video_offset=None):
+                 video_offset=None, cache=False):
         """Init."""
         # ========================== LOAD DATA ==========================
         # Dialog window if data is None :
@@ -56,13 +60,12 @@ class ReadSleepData(object):
             upath = os.path.split(data)[0]
         else:
             upath = ''
+        cache, key, from_cache = _get_cache(cache), None, False
 
         if isinstance(data, str):  # file is defined
             # ---------- USE SLEEP or MNE ----------
             # Find file extension :
             file, ext = get_file_ext(data)
-            # Force to use MNE if preload is False :
-            use_mne = True if not preload else use_mne
             # Get if the file has to be loaded using Sleep or MNE python :
             sleep_ext = ['.eeg', '.vhdr', '.edf', '.trc', '.rec']
             use_mne = True if ext not in sleep_ext else use_mne
@@ -71,13 +74,20 @@ class ReadSleepData(object):
                 is_mne_installed(raise_error=True)
 
             # ---------- LOAD THE FILE ----------
-            if use_mne:  # Load using MNE functions
+            if cache is not None:  # already decoded and scaled data
+                key = cache.key(data, downsample=downsample, use_mne=use_mne,
+                                kwargs_mne=sorted(kwargs_mne.items()))
+                args = cache.load(key)
+                from_cache = args is not None
+            if from_cache:
+                logger.debug("Load file from the cache")
+            elif use_mne:  # Load using MNE functions
                 logger.debug("Load file using MNE-python")
                 kwargs_mne['preload'] = preload
                 args = mne_switch(file, ext, downsample, **kwargs_mne)
             else:  # Load using Sleep functions
                 logger.debug("Load file using Sleep")
-                args = sleep_switch(file, ext, downsample)
+                args = sleep_switch(file, ext, downsample, preload)
             # Get output arguments :
             (sf, downsample, dsf, data, channels, n, offset, annot) = args
             info = ("Data successfully loaded (%s):"
@@ -101,11 +111,19 @@ class ReadSleepData(object):
             offset = datetime.time(0, 0, 0)
             dsf, downsample = get_dsf(downsample, sf)
             n = data.shape[1]
-            data = data[:, ::dsf]
+            data = resample(data, 1, dsf, n_jobs=-1)
+        elif isinstance(data, RecordingSource):  # lazy recording
+            file = annot = None
+            offset = datetime.time(0, 0, 0)
+            sf, n = data._sfori, data._n_times
+            dsf, downsample = get_dsf(downsample, sf)
+            data.dsf = dsf
+            channels = data.channels if channels is None else channels
         else:
             raise IOError("The data should either be a string which refer to "
-                          "the path of a file or an array of raw data of shape"
-                          " (n_electrodes, n_time_points).")
+                          "the path of a file, a RecordingSource or an array "
+                          "of raw data of shape (n_electrodes, "
+                          "n_time_points).")
 
         # Keep variables :
         self._file = file
@@ -136,9 +154,10 @@ class ReadSleepData(object):
                                 "CSV file (*.csv);;EDF+ file(*.edf);"
                                 ";All files (*.*)")
             hypno = None if hypno == '' else hypno
-        if isinstance(hypno, np.ndarray):  # array_like
+        # Hypnograms are run-length encoded (see RLEHypnogram) :
+        if isinstance(hypno, (np.ndarray, RLEHypnogram)):  # array_like
             if len(hypno) == n:
-                hypno = hypno[::dsf]
+                hypno = RLEHypnogram.from_array(hypno).downsample(dsf)
             else:
                 raise ValueError("Then length of the hypnogram must be the "
                                  "same as raw data")
@@ -147,7 +166,8 @@ class ReadSleepData(object):
                                   hstates=np.array(hstates),
                                   hvalues=np.array(hvalues))
             # Oversample then downsample :
-            hypno = oversample_hypno(hypno, self._N)[::dsf]
+            hypno = RLEHypnogram.from_array(hypno)
+            hypno = oversample_hypno(hypno, self._N).downsample(dsf)
             PROFILER("Hypnogram file loaded", level=1)
 
         # ========================== VIDEO ==========================
@@ -177,20 +197,25 @@ class ReadSleepData(object):
         # Default state
         df_value = 0 if 0 in hvalues else min(hvalues)  # TODO user-defined?
         # Check all hypno values are recognized
-        if not all([v in hvalues for v in np.unique(hypno)]):
+        if (hypno is not None) and not all([
+                v in hvalues for v in np.unique(hypno.values)]):
             warn("\nSome hypnogram values are not recognized. Check your "
                  f"states config: {states_cfg}.\n\n"
                  "Empty hypnogram will be used instead (default value = "
                  f"`{df_value}`)")
             hypno = None
         if hypno is None:
-            hypno = np.ones((npts,), dtype=np.float32)
-            hypno = df_value * hypno
+            hypno = RLEHypnogram.full(npts, df_value)
         n = len(hypno)
 
         # ---------- SCALING ----------
         # Assume that the inter-quartile amplitude of EEG data is ~50 uV
-        iqr_chan = iqr(data[:, :int(data.shape[1] / 4)], axis=-1)
+        if from_cache:  # cached data are already scaled
+            iqr_chan = np.ones((nchan,))
+        elif isinstance(data, RecordingSource):  # only use a subset of windows
+            iqr_chan = iqr(data.subsample(), axis=-1)
+        else:
+            iqr_chan = iqr(data[:, :int(data.shape[1] / 4)], axis=-1)
         bad_iqr = iqr_chan < 1.
 
         if np.any(bad_iqr):
@@ -201,9 +226,16 @@ class ReadSleepData(object):
             warn("Wrong channel data amplitude. ")
 
         # ---------- CONVERSION ----------=
-        # Convert data and hypno to be contiguous and float 32 (for vispy):
-        self._data = vispy_array(data)
-        self._hypno = vispy_array(hypno)
+        # Convert data and hypno to be contiguous and float 32 (for vispy).
+        # Recording sources are already read as float 32 :
+        if not isinstance(data, RecordingSource):
+            data = vispy_array(data)
+        if (key is not None) and not from_cache:
+            cached = cache.save(key, data, sf, downsample, dsf, channels,
+                                self._N, offset, annot)
+            data = data if cached is None else cached
+        self._data = data
+        self._hypno = hypno
         self._time = vispy_array(time)
         print(self._time)
         self._channels = channels
@@ -220,7 +252,7 @@ class ReadSleepData(object):
         PROFILER("Check data", level=1)
 
 
-def sleep_switch(file, ext, downsample):
+def sleep_switch(file, ext, downsample, preload=True):
     """Switch between sleep data files.
 
     Parameters
@@ -231,6 +263,9 @@ def sleep_switch(file, ext, downsample):
         Extension name (e.g. '.eeg')
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, a RecordingSource is returned instead
+        of the data array.
 
     Returns
     -------
@@ -240,7 +275,7 @@ def sleep_switch(file, ext, downsample):
         The down-sampling frequency used.
     dsf : int
         The down-sampling factor.
-    data : array_like
+    data : array_like | RecordingSource
         The raw data of shape (n_channels, n_points)
     channels : list
         List of channel names.
@@ -255,28 +290,50 @@ def sleep_switch(file, ext, downsample):
     path = file + ext
 
     if ext == '.vhdr':  # BrainVision
-        return read_bva(path, downsample)
+        return read_bva(path, downsample, preload=preload)
 
     if ext == '.eeg':  # Elan
-        return read_elan(path, downsample)
+        return read_elan(path, downsample, preload=preload)
 
     elif ext in ['.edf', '.rec']:  # European Data Format
-        return read_edf(path, downsample)
+        return read_edf(path, downsample, preload=preload)
 
     elif ext == '.trc':  # Micromed
-        return read_trc(path, downsample)
+        return read_trc(path, downsample, preload=preload)
 
     else:  # None
         raise ValueError("*" + ext + " files are currently not supported.")
 
 
+def _get_cache(cache):
+    """Get the persistent cache of decoded recordings."""
+    if cache is None or cache is False:
+        return None
+    elif cache is True:
+        return SleepCache()
+    elif isinstance(cache, str):
+        return SleepCache(folder=cache)
+    elif isinstance(cache, SleepCache):
+        return cache
+    raise TypeError("cache should either be a boolean, a path to a folder or "
+                    "a SleepCache instance.")
+
+
 ###############################################################################
 ###############################################################################
 #                               LOAD FILES
 ###############################################################################
 ###############################################################################
 
-def read_edf(path, downsample):
+def _source_to_data(source, preload):
+    """Load data from a recording source, if needed."""
+    if preload:
+        return np.asarray(source)
+    logger.debug("Lazy loading of %r" % source)
+    return source
+
+
+def read_edf(path, downsample, preload=True):
     """Read data from a European Data Format (edf) file.
 
     Use phypno class for reading EDF files:
@@ -288,12 +345,15 @@ def read_edf(path, downsample):
         Filename(with full path) to EDF file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, data are read lazily from the
+        memory-mapped file.
 
     Returns
     -------
     sf : int
         The sampling frequency.
-    data : array_like
+    data : array_like | RecordingSource
         The data organised as well(n_channels, n_points)
     chan : list
         The list of channel's names.
@@ -314,31 +374,28 @@ def read_edf(path, downsample):
     _, start_time, sf, chan, n_samples, _ = edf.return_hdr()
     start_time = start_time.time()
 
-    # Keep only data channels (e.g excludes marker chan)
-    freqs = np.unique(edf.hdr['n_samples_per_record']) / edf.hdr[
-        'record_length']
-    sf = freqs.max()
-
-    if len(freqs) != 1:
-        bad_chans = np.where(edf.hdr['n_samples_per_record'] < sf)
-        chan = np.delete(chan, bad_chans)
-
-    # Load all samples of selected channels
-    np.seterr(divide='ignore', invalid='ignore')
-    data = edf.return_dat(chan, 0, n_samples)
+    # Keep only data channels (e.g excludes EDF+ annotations). Channels
+    # sampled at lower rates are resampled onto the fastest channel time-line
+    n_sam_rec = np.asarray(edf.hdr['n_samples_per_record'])
+    sf = n_sam_rec.max() / edf.hdr['record_length']
+    chan_idx = [k for k, c in enumerate(chan) if c != 'EDF Annotations']
+    chan = [chan[k] for k in chan_idx]
 
     # Get original signal length :
-    n = data.shape[1]
+    n = int(n_sam_rec.max() * edf.hdr['n_records'])
 
     # Get down-sample factor :
     sf = float(sf)
-    chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, None
+    # Load all samples of selected channels (memory-mapped, float32)
+    source = EdfSource(edf, chan_idx, dsf=dsf)
+    data = _source_to_data(source, preload)
+
+    return sf, downsample, dsf, data, chan, n, start_time, None
 
 
-def read_trc(path, downsample):
+def read_trc(path, downsample, preload=True):
     """Read data from a Micromed (trc) file (version 4).
 
     Poor man's version of micromedio.py from Neo package
@@ -350,6 +407,9 @@ def read_trc(path, downsample):
         Filename(with full path) to .trc file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, data are read lazily from the
+        memory-mapped file.
 
     Returns
     -------
@@ -357,7 +417,7 @@ def read_trc(path, downsample):
         The sampling frequency.
     downsample : float
         The downsampling frequency
-    data : array_like
+    data : array_like | RecordingSource
         The data organised as well(n_channels, n_points)
     chan : list
         The list of channel's names.
@@ -386,16 +446,17 @@ def read_trc(path, downsample):
         day, month, year, hour, minute, sec = read_f(f, 'bbbbbb')
         start_time = datetime.time(hour, minute, sec)
 
-        # Raw data
-        f.seek(data_start_offset, 0)
-        m_raw = np.fromstring(f.read(), dtype='u' + str(nbytes))
-        m_raw = m_raw.reshape((int(m_raw.size / n_chan), n_chan)).transpose()
+        # Raw data (memory-mapped)
+        n_times = (os.path.getsize(path) - data_start_offset) // (
+            nbytes * n_chan)
+        m_raw = np.memmap(path, dtype='u' + str(nbytes), mode='r',
+                          offset=data_start_offset,
+                          shape=(n_times, n_chan)).transpose()
 
         # Read label / gain
         gain = []
         chan = []
         logical_ground = []
-        data = np.empty(shape=m_raw.shape, dtype=np.float32)
 
         f.seek(176, 0)
         zone_names = ['ORDER', 'LABCOD']
@@ -421,22 +482,23 @@ def read_trc(path, downsample):
             gain = np.append(gain, float(physical_max - physical_min) /
                              float(logical_max - logical_min + 1))
 
-    # Multiply by gain
-    m_raw = m_raw - logical_ground[:, np.newaxis]
-    data = m_raw * gain[:, np.newaxis].astype(np.float32)
-
     # Get original signal length :
-    n = data.shape[1]
+    n = m_raw.shape[1]
 
     # Get down-sample factor :
     sf = float(sf)
     chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, None
+    # Multiply by gain : (raw - ground) * gain
+    source = ArraySource(m_raw, sf, chan, gain=gain,
+                         offset=-logical_ground * gain, dsf=dsf)
+    data = _source_to_data(source, preload)
+
+    return sf, downsample, dsf, data, chan, n, start_time, None
 
 
-def read_bva(path, downsample, read_markers=False):
+def read_bva(path, downsample, read_markers=False, preload=True):
     """Read data from a BrainVision (*.vhdr) file.
 
     Poor man's version of https: // gist.github.com / breuderink / 6266871
@@ -455,12 +517,15 @@ def read_bva(path, downsample, read_markers=False):
         Down-sampling frequency.
     read_markers : bool | False
         Import markers from the .vmrk files as annotations
+    preload : bool | True
+        Load data into memory. If False, data are read lazily from the
+        memory-mapped file.
 
     Returns
     -------
     sf : float
         The sampling frequency.
-    data : array_like
+    data : array_like | RecordingSource
         The data organised as well(n_channels, n_points)
     chan : list
         The list of channel's names.
@@ -547,27 +612,26 @@ def read_bva(path, downsample, read_markers=False):
         else:
             anot = None
 
-    with io.open(data_path, 'rb') as f:
-        raw = f.read()
-        size = int(len(raw) / 2)
-
-        ints = np.ndarray((n_chan, int(size / n_chan)),
-                          dtype='<i2', order='F', buffer=raw)
-
-        data = np.float32(np.diag(resolution)).dot(ints)
+    # Multiplexed int16 data (memory-mapped)
+    n_times = os.path.getsize(data_path) // (2 * n_chan)
+    ints = np.memmap(data_path, dtype='<i2', mode='r',
+                     shape=(n_times, n_chan)).transpose()
 
     # Get original signal length :
-    n = data.shape[1]
+    n = ints.shape[1]
 
     # Get down-sample factor :
     sf = float(sf)
     chan = list(chan)
     dsf, downsample = get_dsf(downsample, sf)
 
-    return sf, downsample, dsf, data[:, ::dsf], chan, n, start_time, anot
+    source = ArraySource(ints, sf, chan, gain=resolution, dsf=dsf)
+    data = _source_to_data(source, preload)
+
+    return sf, downsample, dsf, data, chan, n, start_time, anot
 
 
-def read_elan(path, downsample):
+def read_elan(path, downsample, preload=True):
     """Read data from a ELAN (eeg) file.
 
     Elan format specs: http: // elan.lyon.inserm.fr/
@@ -578,12 +642,15 @@ def read_elan(path, downsample):
         Filename(with full path) to Elan .eeg file
     downsample : int
         Down-sampling frequency.
+    preload : bool | True
+        Load data into memory. If False, data are read lazily from the
+        memory-mapped file.
 
     Returns
     -------
     sf : int
         The sampling frequency.
-    data : array_like
+    data : array_like | RecordingSource
         The data organised as well(n_channels, n_points)
     chan : list
         The list of channel's names.
@@ -625,7 +692,7 @@ def read_elan(path, downsample):
         start_time = datetime.time(0, 0, 0)
 
     # Channels
-    nb_chan = np.int(ent[9])
+    nb_chan = int(ent[9])
     nb_chan = nb_chan
 
     # Last 2 channels do not contain data
@@ -667,8 +734,9 @@ def read_elan(path, downsample):
     dsf, downsample = get_dsf(downsample, sf)
 
     # Multiply by gain :
-    data = m_raw[chan_list, ::dsf] * \
-        gain[chan_list][..., np.newaxis]
+    source = ArraySource(m_raw[chan_list, :], sf, chan, gain=gain[chan_list],
+                         dsf=dsf)
+    data = _source_to_data(source, preload)
 
     return sf, downsample, dsf, data, chan, n, start_time, None
 
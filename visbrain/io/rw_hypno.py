@@ -22,11 +22,10 @@ import os
 
 import numpy as np
 
-from PyQt5 import QtWidgets
 
 from ..io import is_pandas_installed, is_xlrd_installed
 from ..utils.mesh import vispy_array
-from ..utils.sleep.hypnoprocessing import transient
+from ..utils.sleep.hypnoprocessing import transient, RLEHypnogram
 
 __all__ = ('oversample_hypno', 'write_hypno', 'read_hypno')
 
@@ -98,7 +97,7 @@ def hypno_sample_to_time(hypno, time, hstates, hvalues):
 
     Parameters
     ----------
-    hypno : array_like
+    hypno : array_like | RLEHypnogram
         Hypnogram data.
     time : array_like
         The time vector.
@@ -131,16 +130,19 @@ def oversample_hypno(hypno, n):
 
     Parameters
     ----------
-    hypno : array_like
+    hypno : array_like | RLEHypnogram
         Hypnogram data of shape (N,) with N < n.
     n : int
         The destination length.
 
     Returns
     -------
-    hypno : array_like
-        The hypnogram of shape (n,)
+    hypno : array_like | RLEHypnogram
+        The hypnogram of shape (n,). If the input hypnogram is run-length
+        encoded, the output hypnogram is also run-length encoded.
     """
+    if isinstance(hypno, RLEHypnogram):
+        return hypno.oversample(n)
     # Get the repetition number :
     rep_nb = int(np.round(n / len(hypno)))
 
@@ -205,7 +207,7 @@ def write_hypno(filename, hypno, version='time', sf=100., npts=1, window=1.,
     ----------
     filename : str
         Filename (with full path) of the file to save
-    hypno : array_like
+    hypno : array_like | RLEHypnogram
         Hypnogram array, same length as data
     sf : float | 100.
         Original sampling rate of the raw data
@@ -230,7 +232,7 @@ def write_hypno(filename, hypno, version='time', sf=100., npts=1, window=1.,
     """
     # Checking :
     assert isinstance(filename, str)
-    assert isinstance(hypno, np.ndarray)
+    assert isinstance(hypno, (np.ndarray, RLEHypnogram))
     assert version in ['time', 'sample']
     if hstates is None and hvalues is None:
         hstates = ['Wake', 'N1', 'N2', 'N3', 'REM', 'Art']
@@ -264,6 +266,7 @@ def write_hypno(filename, hypno, version='time', sf=100., npts=1, window=1.,
                        f"(3), 'REM' (4)]). Please try again using a different"
                        f" format.")
                 if popup:
+                    from PyQt5 import QtWidgets
                     msgBox = QtWidgets.QMessageBox()
                     msgBox.setText(msg)
                     msgBox.exec
@@ -434,6 +437,7 @@ def read_hypno(filename, time=None, datafile=None, hstates=None, hvalues=None,
                    f"(`Sleep(.., states_config_file=None)`).\n\n"
                    f"Current config: {list(zip(hstates, hvalues))}.\n")
             if popup:
+                from PyQt5 import QtWidgets
                 msgBox = QtWidgets.QMessageBox()
                 msgBox.setText(msg)
                 msgBox.exec()
@@ -468,6 +472,7 @@ def read_hypno(filename, time=None, datafile=None, hstates=None, hvalues=None,
             ]
             if not all([state in hstates for state in loaded_hyp_states]):
                 if popup:
+                    from PyQt5 import QtWidgets
                     msgBox = QtWidgets.QMessageBox()
                     msgBox.setText(msg.format(
                         **{'loaded_states': loaded_hyp_states}
@@ -487,6 +492,7 @@ def read_hypno(filename, time=None, datafile=None, hstates=None, hvalues=None,
         ]
         if not all([state in hstates for state in loaded_hyp_states]):
             if popup:
+                from PyQt5 import QtWidgets
                 msgBox = QtWidgets.QMessageBox()
                 msgBox.setText(msg.format(
                     **{'loaded_states': loaded_hyp_states}
@@ -604,6 +610,7 @@ def _read_hypno_txt_sample(path, hstates=None, hvalues=None, popup=True):
                    f"(`Sleep(.., states_config_file=None)`).\n\n"
                    f"Current config: {values_map}.\n")
             if popup:
+                from PyQt5 import QtWidgets
                 msgBox = QtWidgets.QMessageBox()
                 msgBox.setText(msg)
                 msgBox.exec()
@@ -634,6 +641,7 @@ def _read_hypno_txt_sample(path, hstates=None, hvalues=None, popup=True):
                    f"Config in file: {desc}\n"
                    f"Sleep's states config: {values_map}")
             if popup:
+                from PyQt5 import QtWidgets
                 msgBox = QtWidgets.QMessageBox()
                 msgBox.setText(msg)
                 msgBox.exec()
@@ -0,0 +1,349 @@
+"""Headless batch detection and sleep statistics over a cohort of nights.
+
+Each night is processed in a worker process : the recording is loaded (lazily
+by default, so that only one channel is in memory at once), the configured
+detections are run on each channel and the sleep statistics are computed
+from the hypnogram. Results of all nights are appended to a single long
+(columnar) csv table, one row per detected event or per statistic :
+
+    file, kind, channel, name, start, end, value, stage
+
+* Events : kind='event', name is the detection method, start and end are in
+  seconds, value is the duration (ms) and stage the hypnogram value at the
+  beginning of the event.
+* Statistics : kind='stat', name is the statistic (see sleepstats) and value
+  its value.
+
+Processed nights and their timings are recorded in a journal (output file +
+'.progress', one json line per night). An interrupted batch is resumed from
+the journal.
+"""
+import os
+import csv
+import json
+import logging
+import tempfile
+import multiprocessing
+from time import perf_counter
+
+import numpy as np
+from scipy.stats import iqr
+
+from visbrain.io.rw_hypno import read_hypno, oversample_hypno
+from visbrain.io.rw_utils import get_file_ext
+from visbrain.io.read_states_cfg import load_states_cfg
+from visbrain.io.sleep_source import RecordingSource
+from visbrain.utils.others import get_dsf
+from visbrain.utils.filtering import resample
+from visbrain.utils.sleep.detectpool import run_detection
+from visbrain.utils.sleep.hypnoprocessing import sleepstats, RLEHypnogram
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('sleep_batch', 'run_sleep_batch', 'benchmark_sleep_batch')
+
+COLUMNS = ('file', 'kind', 'channel', 'name', 'start', 'end', 'value',
+           'stage')
+
+
+###############################################################################
+###############################################################################
+#                               WORKERS
+###############################################################################
+###############################################################################
+
+def _set_memory_limit(max_memory):
+    """Bound the memory of a worker process (in Gb, unix only)."""
+    try:
+        import resource
+    except ImportError:
+        logger.warning("Memory limit of workers is not supported on this "
+                       "platform")
+        return
+    n_bytes = int(max_memory * 1024 ** 3)
+    resource.setrlimit(resource.RLIMIT_AS, (n_bytes, n_bytes))
+
+
+def _load_night(recording, hypno, downsample, preload, hstates, hvalues):
+    """Load the data and the hypnogram of a night (no GUI)."""
+    if isinstance(recording, str):
+        from visbrain.io.read_sleep import sleep_switch
+        file, ext = get_file_ext(recording)
+        if ext in ['.eeg', '.vhdr', '.edf', '.trc', '.rec']:
+            args = sleep_switch(file, ext, downsample, preload)
+        else:
+            from visbrain.io.mneio import mne_switch
+            args = mne_switch(file, ext, downsample, preload=preload)
+        sf, downsample, dsf, data, channels, n = args[0:6]
+    else:  # (data, sf) arrays
+        file = None
+        data, sf = recording
+        dsf, downsample = get_dsf(downsample, sf)
+        n = data.shape[1]
+        data = resample(np.asarray(data, dtype=np.float32), 1, dsf)
+        channels = ['chan' + str(k) for k in range(data.shape[0])]
+    sf_data = float(downsample) if downsample is not None else float(sf)
+    # Scale channels as Sleep does (inter-quartile amplitude of ~50 uV) :
+    if isinstance(data, RecordingSource):
+        iqr_chan = iqr(data.subsample(), axis=-1)
+    else:
+        iqr_chan = iqr(data[:, :int(data.shape[1] / 4)], axis=-1)
+    iqr_chan[iqr_chan == 0.] = 1.
+    scale = np.where(iqr_chan < 1., 10. ** np.floor(np.log10(
+        50. / iqr_chan)), 1.)
+
+    # Per-sample hypnogram :
+    df_value = 0 if 0 in hvalues else min(hvalues)
+    if hypno is None:
+        hypno = RLEHypnogram.full(data.shape[1], df_value)
+    elif isinstance(hypno, str):
+        time = np.arange(n)[::dsf] / sf
+        hypno, _ = read_hypno(hypno, time=time, datafile=file,
+                              hstates=np.array(hstates),
+                              hvalues=np.array(hvalues), popup=False)
+        hypno = oversample_hypno(RLEHypnogram.from_array(hypno), n)
+        hypno = hypno.downsample(dsf)
+    else:
+        hypno = RLEHypnogram.from_array(hypno).downsample(dsf)
+    return data, sf_data, list(channels), scale, np.asarray(hypno)
+
+
+def _process_night(name, recording, hypno, detections, channels, downsample,
+                   preload, hstates, hvalues):
+    """Run the detections and the sleep statistics of a night."""
+    t_start = perf_counter()
+    data, sf, names, scale, hyp = _load_night(recording, hypno, downsample,
+                                              preload, hstates, hvalues)
+    t_load = perf_counter() - t_start
+    if channels is None:
+        channels = names
+    rows = []
+    # ---------- DETECTIONS ----------
+    time = np.arange(data.shape[1]) / sf
+    for chan in channels:
+        k = names.index(chan) if isinstance(chan, str) else int(chan)
+        x = np.asarray(data[k, :], dtype=np.float32) * scale[k]
+        for method, kwargs in detections.items():
+            index = run_detection(method, x, sf, hyp, time, **kwargs)
+            if not index.size:
+                continue
+            for start, end in index:
+                rows.append((name, 'event', names[k], method, start / sf,
+                             end / sf, (end - start) * 1000. / sf,
+                             int(hyp[start])))
+    # ---------- SLEEP STATISTICS ----------
+    stats = sleepstats(hyp, sf, hstates, hvalues)
+    for key, value in stats.items():
+        rows.append((name, 'stat', '', key, '', '', value, ''))
+    timings = dict(file=name, load=t_load, total=perf_counter() - t_start,
+                   n_events=len(rows) - len(stats),
+                   duration=data.shape[1] / sf)
+    return rows, timings
+
+
+def _process_night_safe(args):
+    """Process a night (errors are returned instead of being raised)."""
+    k, args = args
+    try:
+        return k, _process_night(*args), None
+    except Exception as e:
+        return k, None, str(e)
+
+
+###############################################################################
+###############################################################################
+#                               BATCH
+###############################################################################
+###############################################################################
+
+def _read_journal(journal):
+    """Get the timings of already processed nights."""
+    done = {}
+    if os.path.isfile(journal):
+        with open(journal, 'r') as f:
+            for line in f:
+                try:
+                    timings = json.loads(line)
+                except ValueError:  # line truncated by a crash
+                    continue
+                done[timings['file']] = timings
+    return done
+
+
+def _clean_table(output, done):
+    """Remove rows of nights that are not in the journal."""
+    if not os.path.isfile(output):
+        return
+    with open(output, 'r', newline='') as f:
+        rows = [r for r in csv.reader(f)]
+    keep = [r for r in rows[1:] if r and (r[0] in done)]
+    if len(keep) == len(rows) - 1:
+        return
+    logger.info("Remove %i rows of unfinished nights" % (
+        len(rows) - 1 - len(keep)))
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(keep)
+
+
+def sleep_batch(recordings, hypnos=None, output='sleep_batch.csv',
+                detections=None, channels=None, downsample=100., n_jobs=1,
+                max_memory=None, resume=True, preload=False,
+                states_config_file=None):
+    """Run detections and sleep statistics over a cohort of nights.
+
+    Parameters
+    ----------
+    recordings : list
+        List of recordings. Each recording is either a path to a file
+        supported by Sleep or a (data, sf) tuple where data is an array of
+        shape (n_channels, n_pts).
+    hypnos : list | None
+        List of hypnograms (paths to hypnogram files, per-sample arrays or
+        None), one per recording. If None, sleep statistics are computed from
+        empty hypnograms.
+    output : string | 'sleep_batch.csv'
+        Path to the csv table of results.
+    detections : list | dict | None
+        Detections to run (see visbrain.utils.sleep.detectpool.DETECTIONS).
+        Either a list of methods (default settings) or a dict of
+        {method: settings}. If None, only sleep statistics are computed.
+    channels : list | None
+        Names or indices of the channels to process. If None, all of the
+        channels are processed.
+    downsample : float | 100.
+        Down-sampling frequency.
+    n_jobs : int | 1
+        Number of worker processes. Each process handles a single night
+        before being replaced, so that memory is released between nights.
+    max_memory : float | None
+        Maximum memory of each worker process (in Gb, unix only).
+    resume : bool | True
+        Skip nights already processed (see the output + '.progress' journal).
+        If False, the output table is overwritten.
+    preload : bool | False
+        Load recordings into memory. If False, recordings are read channel by
+        channel.
+    states_config_file : string | None
+        Path to the vigilance states configuration (see Sleep).
+
+    Returns
+    -------
+    timings : list
+        List of dict with the timings (in seconds) of each night : loading
+        time, total time, duration of the recording and number of events.
+    """
+    if hypnos is None:
+        hypnos = [None] * len(recordings)
+    assert len(hypnos) == len(recordings), ("There should be one hypnogram "
+                                            "per recording")
+    if detections is None:
+        detections = {}
+    elif not isinstance(detections, dict):
+        detections = {k: {} for k in detections}
+    names = [r if isinstance(r, str) else 'recording%i' % k for k, r in
+             enumerate(recordings)]
+    assert len(set(names)) == len(names), "Recordings should be unique"
+    states_cfg = load_states_cfg(states_config_file)
+    hstates = list(states_cfg.keys())
+    hvalues = [states_cfg[k]['value'] for k in hstates]
+
+    # ---------- RESUME ----------
+    journal = output + '.progress'
+    if not resume:
+        for f in (output, journal):
+            if os.path.isfile(f):
+                os.remove(f)
+    done = _read_journal(journal)
+    _clean_table(output, done)
+    if not os.path.isfile(output):
+        with open(output, 'w', newline='') as f:
+            csv.writer(f).writerow(COLUMNS)
+    todo = [k for k, n in enumerate(names) if n not in done]
+    logger.info("Sleep batch : %i nights to process (%i already done)" % (
+        len(todo), len(names) - len(todo)))
+    if not todo:
+        return [done[n] for n in names]
+
+    # ---------- RUN ----------
+    # A fresh process per night bounds the memory used by each worker :
+    kw = dict(processes=max(int(n_jobs), 1), maxtasksperchild=1)
+    if max_memory is not None:
+        kw.update(initializer=_set_memory_limit, initargs=(max_memory,))
+    tasks = [(k, (names[k], recordings[k], hypnos[k], detections, channels,
+                  downsample, preload, hstates, hvalues)) for k in todo]
+    t_start = perf_counter()
+    pool = multiprocessing.get_context('spawn').Pool(**kw)
+    try:
+        for k, res, error in pool.imap_unordered(_process_night_safe, tasks):
+            name = names[k]
+            if error is not None:
+                logger.error("Sleep batch failed on %s (%s)" % (name, error))
+                continue
+            rows, timings = res
+            # Rows first : a night is only done once it is in the journal
+            with open(output, 'a', newline='') as f:
+                csv.writer(f).writerows(rows)
+            with open(journal, 'a') as f:
+                f.write(json.dumps(timings) + '\n')
+            done[name] = timings
+            logger.info("%s processed in %.2f sec (%i events)" % (
+                name, timings['total'], timings['n_events']))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    logger.info("Sleep batch : %i nights processed in %.2f sec" % (
+        len(todo), perf_counter() - t_start))
+    return [done[n] for n in names if n in done]
+
+
+# Name exported by visbrain.io, where sleep_batch is the submodule :
+run_sleep_batch = sleep_batch
+
+
+def benchmark_sleep_batch(n_nights=4, n_channels=2, duration=2., sf=100.,
+                          detections=('Spindles', 'Slow waves'), n_jobs=1):
+    """Measure the throughput of sleep_batch on synthetic nights.
+
+    Parameters
+    ----------
+    n_nights : int | 4
+        Number of synthetic nights.
+    n_channels : int | 2
+        Number of channels per night.
+    duration : float | 2.
+        Duration of each night (in hours).
+    sf : float | 100.
+        The sampling frequency.
+    detections : tuple | ('Spindles', 'Slow waves')
+        Detections to run.
+    n_jobs : int | 1
+        Number of worker processes.
+
+    Returns
+    -------
+    bench : dict
+        Dict with the total time (sec), the number of processed nights per
+        hour and the number of hours of recording processed per second.
+    """
+    from visbrain.utils import generate_eeg
+    n_pts = int(duration * 3600 * sf)
+    data = generate_eeg(sf=sf, n_pts=n_pts, n_channels=n_channels,
+                        random_state=0)[0]
+    stages = np.repeat([0, 1, 2, 3, 2, 4], int(np.ceil(n_pts / 6)))[:n_pts]
+    recordings = [(data, sf)] * n_nights
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'bench.csv')
+        t_start = perf_counter()
+        sleep_batch(recordings, [stages] * n_nights, output=output,
+                    detections=list(detections), downsample=sf,
+                    n_jobs=n_jobs)
+        elapsed = perf_counter() - t_start
+    bench = dict(time=elapsed, nights_per_hour=3600. * n_nights / elapsed,
+                 hours_per_sec=n_nights * duration / elapsed)
+    logger.info("Sleep batch benchmark : %.1f nights / hour (%.2f hours of "
+                "recording / sec)" % (bench['nights_per_hour'],
+                                      bench['hours_per_sec']))
+    return bench
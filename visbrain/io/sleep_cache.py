@@ -0,0 +1,245 @@
+"""Persistent on-disk cache of decoded sleep recordings.
+
+Decoding, down-sampling and scaling a recording is done once. The
+ready-to-display float32 array is then saved as a memory-mappable .npy file,
+next to a small .npz file containing the metadata (sampling frequency,
+channels, time offset and annotations). Entries are keyed by a fingerprint of
+the file (path, size and modification time) and of the loading parameters.
+The total size of the cache is bounded : least recently used entries are
+removed first.
+"""
+import os
+import json
+import hashlib
+import logging
+import datetime
+
+import numpy as np
+
+from visbrain.io.path import path_to_visbrain_data
+from visbrain.io.read_annotations import annotations_to_array
+
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('SleepCache',)
+
+# Increment this number each time the content of cached files changes :
+CACHE_VERSION = 1
+
+
+class SleepCache(object):
+    """Persistent cache of decoded sleep recordings.
+
+    Parameters
+    ----------
+    folder : string | None
+        Path to the cache directory. If None, the cache is located in
+        ~/visbrain_data/sleep_cache.
+    max_size : float | 20.
+        Maximum size of the cache (in Gb).
+    """
+
+    def __init__(self, folder=None, max_size=20.):
+        """Init."""
+        if folder is None:
+            folder = path_to_visbrain_data(folder='sleep_cache')
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        self.folder = folder
+        self.max_size = max_size
+
+    def __repr__(self):
+        """Representation."""
+        return "SleepCache(folder='%s', max_size=%.2fGb)" % (
+            self.folder, self.max_size)
+
+    def __len__(self):
+        """Get the number of entries in the cache."""
+        return len(self._entries())
+
+    def __contains__(self, key):
+        """Get if an entry exists."""
+        return os.path.isfile(self._path(key, '.npz'))
+
+    # ----------- PATHS -----------
+    def _path(self, key, ext):
+        """Get the path to a cached file."""
+        return os.path.join(self.folder, key + ext)
+
+    def _entries(self):
+        """Get the list of (key, size, last access) entries."""
+        entries = []
+        for k in os.listdir(self.folder):
+            if not k.endswith('.npz'):
+                continue
+            key = k[:-4]
+            files = [self._path(key, '.npy'), self._path(key, '.npz')]
+            if not all([os.path.isfile(f) for f in files]):
+                continue
+            size = sum([os.path.getsize(f) for f in files])
+            entries.append((key, size, os.path.getmtime(files[0])))
+        return entries
+
+    @property
+    def size(self):
+        """Get the total size of the cache (in bytes)."""
+        return sum([k[1] for k in self._entries()])
+
+    # ----------- KEY -----------
+    @staticmethod
+    def key(path, **kwargs):
+        """Get the key of a file.
+
+        Parameters
+        ----------
+        path : string
+            Path to the recording.
+        kwargs : dict | {}
+            Loading parameters (e.g down-sampling frequency).
+
+        Returns
+        -------
+        key : string
+            Hexadecimal fingerprint of the file and of the parameters.
+        """
+        stat = os.stat(path)
+        finger = dict(path=os.path.abspath(path), size=stat.st_size,
+                      mtime=stat.st_mtime_ns, version=CACHE_VERSION,
+                      params=sorted([(k, repr(v)) for k, v in kwargs.items()]))
+        finger = json.dumps(finger, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(finger).hexdigest()
+
+    # ----------- LOAD / SAVE -----------
+    def load(self, key):
+        """Load a cached recording.
+
+        Parameters
+        ----------
+        key : string
+            Key of the recording (see the `key` method).
+
+        Returns
+        -------
+        args : tuple | None
+            The tuple (sf, downsample, dsf, data, channels, n, start_time,
+            annotations) where data is a memory-mapped (copy-on-write)
+            array. None if the recording is not in the cache.
+        """
+        if key not in self:
+            return None
+        try:
+            data = np.load(self._path(key, '.npy'), mmap_mode='c')
+            with np.load(self._path(key, '.npz')) as meta:
+                sf, downsample, dsf = meta['sf'], meta['downsample'], int(
+                    meta['dsf'])
+                channels = [str(k) for k in meta['channels']]
+                n, offset = int(meta['n']), float(meta['offset'])
+                annot = meta['annotations']
+        except Exception as e:
+            logger.warning("Corrupted cache entry %s removed (%s)" % (key, e))
+            self.remove(key)
+            return None
+        # Update last access time (used for eviction) :
+        os.utime(self._path(key, '.npy'))
+        downsample = None if np.isnan(downsample) else float(downsample)
+        start_time = (datetime.datetime.min + datetime.timedelta(
+            seconds=offset)).time()
+        annot = annot if annot.size else None
+        logger.info("Recording loaded from the cache (%s)" % key)
+        return (float(sf), downsample, dsf, data, channels, n, start_time,
+                annot)
+
+    def save(self, key, data, sf, downsample, dsf, channels, n, start_time,
+             annotations=None, chunk_size=2 ** 20):
+        """Save a recording in the cache.
+
+        Parameters
+        ----------
+        key : string
+            Key of the recording (see the `key` method).
+        data : array_like
+            The ready-to-display data of shape (n_channels, n_pts). Any object
+            supporting (channels, time) slicing is accepted (e.g a
+            RecordingSource).
+        sf : float
+            The original sampling frequency.
+        downsample : float | None
+            The down-sampling frequency.
+        dsf : int
+            The down-sampling factor.
+        channels : list
+            List of channel names.
+        n : int
+            Number of time points before down-sampling.
+        start_time : datetime.time
+            The time offset.
+        annotations : array_like | None
+            Annotations (see visbrain.io.annotations_to_array).
+        chunk_size : int | 2 ** 20
+            Number of time points written at once.
+
+        Returns
+        -------
+        data : array_like
+            The memory-mapped array of cached data.
+        """
+        shape = tuple(data.shape)
+        if np.prod(shape) * 4 > self.max_size * 1024 ** 3:
+            logger.warning("Recording too large to be cached")
+            return None
+        # Data (written by chunks, then renamed to be atomic) :
+        tmp = self._path(key, '.tmp.npy')
+        mm = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.float32,
+                                       shape=shape)
+        for k in range(0, shape[1], chunk_size):
+            mm[:, k:k + chunk_size] = data[:, k:k + chunk_size]
+        mm.flush()
+        del mm
+        os.replace(tmp, self._path(key, '.npy'))
+        # Metadata :
+        start, end, text = annotations_to_array(annotations)
+        annot = np.c_[start, end, text] if len(start) else np.array([])
+        offset = start_time.hour * 3600. + start_time.minute * 60. + \
+            start_time.second
+        downsample = np.nan if downsample is None else downsample
+        tmp = self._path(key, '.tmp.npz')
+        np.savez(tmp, sf=sf, downsample=downsample, dsf=dsf,
+                 channels=np.array(channels, dtype=str), n=n, offset=offset,
+                 annotations=annot.astype(str))
+        os.replace(tmp, self._path(key, '.npz'))
+        logger.info("Recording saved in the cache (%s)" % key)
+        self.evict(keep=key)
+        return np.load(self._path(key, '.npy'), mmap_mode='c')
+
+    # ----------- EVICTION -----------
+    def remove(self, key):
+        """Remove an entry from the cache."""
+        for ext in ['.npz', '.npy']:
+            if os.path.isfile(self._path(key, ext)):
+                os.remove(self._path(key, ext))
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the size is bounded.
+
+        Parameters
+        ----------
+        keep : string | None
+            Key of an entry that should not be removed.
+        """
+        entries = sorted(self._entries(), key=lambda k: k[2])
+        total = sum([k[1] for k in entries])
+        max_size = self.max_size * 1024 ** 3
+        for key, size, _ in entries:
+            if total <= max_size:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            total -= size
+            logger.debug("Cache entry %s removed" % key)
+
+    def clear(self):
+        """Remove all entries."""
+        for key, _, _ in self._entries():
+            self.remove(key)
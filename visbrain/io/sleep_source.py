@@ -0,0 +1,443 @@
+"""Lazy, windowed access to sleep recordings.
+
+A recording source exposes the shape, the sampling frequency and the channel
+names of a recording, without loading it into memory. Data are then read
+window by window, either with the `read` method or using numpy-like indexing
+(e.g. `source[:, sl]`). Only the last windows read are kept in a bounded
+cache.
+
+This file contain the following sources :
+- ArraySource : any (n_channels, n_times) array-like (e.g. numpy.memmap) with
+  an optional per-channel calibration. Used for BrainVision, Micromed and
+  ELAN files.
+- EdfSource : European Data Format (*.edf)
+- MneSource : any mne.io.Raw instance loaded with preload=False
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+
+from visbrain.utils.filtering import resample_window, _n_jobs
+
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('RecordingSource', 'ArraySource', 'EdfSource', 'MneSource')
+
+
+class RecordingSource(object):
+    """Base class for a lazy access to a recording.
+
+    Sub-classes only have to implement the `_read_raw` method which returns
+    calibrated data at the original sampling rate.
+
+    Parameters
+    ----------
+    sf : float
+        The original sampling frequency.
+    n_times : int
+        Number of time points of the recording (before down-sampling).
+    channels : list
+        List of channel names.
+    dsf : int | 1
+        Down-sampling factor. Data are decimated using an anti-aliased
+        polyphase filter. All indices used in `read` and `__getitem__` refer
+        to the down-sampled time-line.
+    block_size : int | 4096
+        Number of (down-sampled) time points per cached block.
+    cache_size : float | 256.
+        Maximum size of the cache (in Mb).
+    n_jobs : int | -1
+        Number of threads used to load blocks of channels when the full
+        recording is loaded. Use -1 to use all the cpus.
+    """
+
+    def __init__(self, sf, n_times, channels, dsf=1, block_size=4096,
+                 cache_size=256., n_jobs=-1):
+        """Init."""
+        self._sfori = float(sf)
+        self._n_times = int(n_times)
+        self._channels = list(channels)
+        self._dsf = int(dsf)
+        self._n_jobs = n_jobs
+        self._block_size = int(block_size)
+        self._scale = np.ones((len(self._channels), 1), dtype=np.float32)
+        # Bounded LRU cache of (channel, block) -> data :
+        self._cache = OrderedDict()
+        self._cache_nbytes = 0
+        self._cache_max = int(cache_size * 1024 ** 2)
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        """Representation."""
+        return "%s(n_channels=%i, n_times=%i, sf=%.2f)" % (
+            type(self).__name__, self.shape[0], self.shape[1], self.sf)
+
+    def __len__(self):
+        """Return the number of channels."""
+        return len(self._channels)
+
+    def _read_raw(self, chan, start, stop):
+        """Read calibrated data at the original sampling rate.
+
+        Parameters
+        ----------
+        chan : array_like
+            Array of channel indices.
+        start, stop : int
+            Index of the first and last (excluded) time points.
+
+        Returns
+        -------
+        data : array_like
+            Array of shape (len(chan), stop - start).
+        """
+        raise NotImplementedError
+
+    # ----------- SHAPE / SF / CHANNELS -----------
+    @property
+    def shape(self):
+        """Get the shape of the (down-sampled) recording."""
+        return (len(self._channels), -(-self._n_times // self._dsf))
+
+    @property
+    def ndim(self):
+        """Get the number of dimensions."""
+        return 2
+
+    @property
+    def dtype(self):
+        """Get the data type."""
+        return np.dtype(np.float32)
+
+    @property
+    def sf(self):
+        """Get the (down-sampled) sampling frequency."""
+        return self._sfori / self._dsf
+
+    @property
+    def channels(self):
+        """Get the list of channel names."""
+        return self._channels
+
+    @property
+    def nbytes(self):
+        """Get the size of the (down-sampled) recording once loaded."""
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    @property
+    def dsf(self):
+        """Get the down-sampling factor."""
+        return self._dsf
+
+    @dsf.setter
+    def dsf(self, value):
+        """Set dsf value."""
+        self._dsf = int(value)
+        self.clear_cache()
+
+    # ----------- SCALING -----------
+    def __imul__(self, value):
+        """Multiply (lazily) the data by a per-channel factor."""
+        value = np.asarray(value, dtype=np.float32)
+        self._scale = self._scale * value.reshape(-1, 1)
+        self.clear_cache()
+        return self
+
+    # ----------- READING -----------
+    def _read_resampled(self, chan, start, stop):
+        """Read anti-aliased data in the down-sampled time-line."""
+        read = lambda i_s, i_e: self._read_raw(chan, i_s, i_e)  # noqa
+        return resample_window(read, self._n_times, 1, self._dsf, start,
+                               stop)
+
+    def _read_display(self, chan, start, stop):
+        """Read data in the down-sampled time-line (no cache)."""
+        data = self._read_resampled(chan, start, stop)
+        data = np.asarray(data, dtype=np.float32)
+        if np.any(self._scale[chan] != 1.):
+            data = data * self._scale[chan]
+        return data
+
+    def _get_block(self, chan, block):
+        """Get blocks of several channels from the cache (read if needed)."""
+        b_start = block * self._block_size
+        b_stop = min(b_start + self._block_size, self.shape[1])
+        missing = [c for c in chan if (c, block) not in self._cache]
+        if len(missing):
+            data = self._read_display(np.array(missing), b_start, b_stop)
+            for c, d in zip(missing, data):
+                d = np.ascontiguousarray(d)
+                self._cache[(c, block)] = d
+                self._cache_nbytes += d.nbytes
+        blocks = []
+        for c in chan:
+            self._cache.move_to_end((c, block))
+            blocks.append(self._cache[(c, block)])
+        # Free least recently used blocks :
+        while self._cache_nbytes > self._cache_max and len(self._cache) > 1:
+            _, d = self._cache.popitem(last=False)
+            self._cache_nbytes -= d.nbytes
+        return blocks
+
+    def _read_direct(self, chan, start, stop, out):
+        """Read a window by chunks, without using the cache.
+
+        Blocks of channels are read in parallel threads.
+        """
+        blocks = np.array_split(np.arange(len(chan)),
+                                min(_n_jobs(self._n_jobs), len(chan)))
+        blocks = [slice(b[0], b[-1] + 1) for b in blocks if len(b)]
+        # Chunks of ~16Mb of raw data (float32) per block :
+        n_chan_blk = blocks[0].stop - blocks[0].start
+        step = max(self._block_size, 2 ** 22 // (n_chan_blk * self._dsf))
+
+        def _read_block(blk):
+            for k in range(start, stop, step):
+                k_end = min(k + step, stop)
+                out[blk, k - start:k_end - start] = self._read_display(
+                    chan[blk], k, k_end)
+
+        if len(blocks) == 1:
+            _read_block(blocks[0])
+        else:
+            with ThreadPoolExecutor(len(blocks)) as executor:
+                list(executor.map(_read_block, blocks))
+        return out
+
+    def read(self, channels=None, start=0, stop=None, out=None):
+        """Read a window of data.
+
+        Parameters
+        ----------
+        channels : array_like | None
+            List of channel indices or names. If None, all channels are read.
+        start : int | 0
+            Index of the first (down-sampled) time point.
+        stop : int | None
+            Index of the last (down-sampled) time point (excluded). If None,
+            data are read until the end of the recording.
+        out : array_like | None
+            Pre-allocated float32 array of shape (n_channels, stop - start).
+
+        Returns
+        -------
+        data : array_like
+            The float32 data of shape (n_channels, stop - start).
+        """
+        n_pts = self.shape[1]
+        if channels is None:
+            channels = np.arange(len(self))
+        chan = np.array([self._channels.index(k) if isinstance(k, str) else
+                         int(k) for k in np.atleast_1d(channels)], dtype=int)
+        stop = n_pts if stop is None else min(int(stop), n_pts)
+        start = max(int(start), 0)
+        stop = max(start, stop)
+        if out is None:
+            out = np.empty((len(chan), stop - start), dtype=np.float32)
+        if (stop == start) or not len(chan):
+            return out
+        bs = self._block_size
+        b_start, b_stop = start // bs, (stop - 1) // bs + 1
+        n_bytes = len(chan) * (b_stop - b_start) * bs * 4
+        if n_bytes > self._cache_max // 2:
+            # Large reads (e.g full channel) bypass the cache :
+            return self._read_direct(chan, start, stop, out)
+        with self._lock:
+            for b in range(b_start, b_stop):
+                blocks = self._get_block(chan, b)
+                # Intersection between block and window :
+                o_start = max(start, b * bs)
+                o_stop = min(stop, (b + 1) * bs)
+                for c, d in enumerate(blocks):
+                    out[c, o_start - start:o_stop - start] = d[
+                        o_start - b * bs:o_stop - b * bs]
+        return out
+
+    def __getitem__(self, key):
+        """Numpy-like indexing (channels, time points)."""
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if (len(key) == 2) and (key[1] is Ellipsis):
+            key = (key[0], slice(None))
+        if key[0] is Ellipsis:
+            key = (slice(None),) + key[1:]
+        if len(key) != 2:
+            raise IndexError("Recording sources only support (channels, "
+                             "time) indexing")
+        c_key, t_key = key
+        squeeze_chan = isinstance(c_key, (int, np.integer))
+        chan = np.arange(len(self))[c_key]
+        # Time indexing :
+        if isinstance(t_key, slice):
+            start, stop, step = t_key.indices(self.shape[1])
+            data = self.read(chan, start, stop)[:, ::step]
+        elif isinstance(t_key, (int, np.integer)):
+            t_key = t_key + self.shape[1] if t_key < 0 else t_key
+            data = self.read(chan, t_key, t_key + 1)[:, 0]
+        else:
+            t_key = np.asarray(t_key)
+            if t_key.dtype == bool:
+                t_key = np.where(t_key)[0]
+            t_key = t_key.astype(int)
+            if not t_key.size:
+                data = np.empty((np.atleast_1d(chan).size, 0),
+                                dtype=np.float32)
+            else:
+                t_min, t_max = t_key.min(), t_key.max() + 1
+                data = self.read(chan, t_min, t_max)[:, t_key - t_min]
+        return data[0, ...] if squeeze_chan else data
+
+    def __array__(self, dtype=None, copy=None):
+        """Load the full (down-sampled) recording."""
+        n_chan, n_pts = self.shape
+        data = np.empty((n_chan, n_pts), dtype=np.float32)
+        self._read_direct(np.arange(n_chan), 0, n_pts, data)
+        return data if dtype is None else data.astype(dtype, copy=False)
+
+    def subsample(self, n_windows=20, window=4096):
+        """Get evenly spaced windows of data (e.g for quick statistics).
+
+        Parameters
+        ----------
+        n_windows : int | 20
+            Number of windows.
+        window : int | 4096
+            Number of (down-sampled) time points per window.
+
+        Returns
+        -------
+        data : array_like
+            Concatenated windows of shape (n_channels, n_windows * window).
+        """
+        n_pts = self.shape[1]
+        if n_windows * window >= n_pts:
+            return self.read()
+        starts = np.linspace(0, n_pts - window, n_windows).astype(int)
+        return np.concatenate([self.read(None, k, k + window)
+                               for k in starts], axis=1)
+
+    def clear_cache(self):
+        """Clear the cache."""
+        with self._lock:
+            self._cache.clear()
+            self._cache_nbytes = 0
+
+
+class ArraySource(RecordingSource):
+    """Recording source for any (n_channels, n_times) array-like.
+
+    Parameters
+    ----------
+    data : array_like
+        Array-like (e.g numpy.memmap) of shape (n_channels, n_times).
+    sf : float
+        The sampling frequency.
+    channels : list
+        List of channel names.
+    gain, offset : array_like | None
+        Per-channel calibration, such as data = raw * gain + offset.
+    kwargs : dict | {}
+        Additional inputs are sent to the RecordingSource class.
+    """
+
+    def __init__(self, data, sf, channels, gain=None, offset=None, **kwargs):
+        """Init."""
+        RecordingSource.__init__(self, sf, data.shape[1], channels, **kwargs)
+        self._raw = data
+        n_chan = data.shape[0]
+        gain = np.ones((n_chan,)) if gain is None else gain
+        offset = np.zeros((n_chan,)) if offset is None else offset
+        self._gain = np.asarray(gain, dtype=np.float32).reshape(-1, 1)
+        self._offset = np.asarray(offset, dtype=np.float32).reshape(-1, 1)
+
+    def _read_raw(self, chan, start, stop):
+        """Read calibrated data."""
+        data = self._raw[:, start:stop][chan, :].astype(np.float32)
+        data *= self._gain[chan]
+        data += self._offset[chan]
+        return data
+
+
+class EdfSource(RecordingSource):
+    """Recording source for European Data Format (*.edf) files.
+
+    Channels sampled at different rates are resampled onto the time-line of
+    the fastest channel (down-sampled by dsf).
+
+    Parameters
+    ----------
+    edf : visbrain.utils.sleep.edf.Edf
+        The Edf instance.
+    chan : array_like
+        Indices of the channels in the file to read.
+    kwargs : dict | {}
+        Additional inputs are sent to the RecordingSource class.
+    """
+
+    def __init__(self, edf, chan, **kwargs):
+        """Init."""
+        hdr = edf.hdr
+        chan = np.asarray(chan, dtype=int)
+        n_sam_rec = np.asarray(hdr['n_samples_per_record'])[chan]
+        sf = n_sam_rec.max() / hdr['record_length']
+        n_times = n_sam_rec.max() * hdr['n_records']
+        channels = [hdr['label'][k] for k in chan]
+        RecordingSource.__init__(self, sf, n_times, channels, **kwargs)
+        self._edf = edf
+        self._file_chan = chan
+        self._n_sam_rec = n_sam_rec
+
+    def _read_raw(self, chan, start, stop):
+        """Read calibrated data (channels sampled at the same rate)."""
+        return self._edf.return_dat(self._file_chan[chan], start, stop)
+
+    def _read_resampled(self, chan, start, stop):
+        """Read anti-aliased data, channel group by channel group."""
+        n_sam_rec, n_rec = self._n_sam_rec[chan], self._edf.hdr['n_records']
+        data = np.empty((len(chan), stop - start), dtype=np.float32)
+        for n_sam in np.unique(n_sam_rec):
+            is_grp = n_sam_rec == n_sam
+            grp = chan[is_grp]
+            # Rational ratio between the group and the down-sampled rate :
+            ratio = Fraction(int(self._n_sam_rec.max()),
+                             int(n_sam) * self._dsf)
+            read = lambda i_s, i_e: self._read_raw(grp, i_s, i_e)  # noqa
+            data[is_grp, :] = resample_window(read, n_sam * n_rec,
+                                              ratio.numerator,
+                                              ratio.denominator, start, stop)
+        return data
+
+
+class MneSource(RecordingSource):
+    """Recording source for mne.io.Raw instances.
+
+    Parameters
+    ----------
+    raw : mne.io.Raw
+        The MNE raw instance (preferably loaded with preload=False).
+    gain : array_like | None
+        Per-channel gain (e.g for unit conversion).
+    kwargs : dict | {}
+        Additional inputs are sent to the RecordingSource class.
+    """
+
+    def __init__(self, raw, gain=None, **kwargs):
+        """Init."""
+        RecordingSource.__init__(self, raw.info['sfreq'], raw.n_times,
+                                 raw.info['ch_names'], **kwargs)
+        self._raw = raw
+        n_chan = len(self._channels)
+        gain = np.ones((n_chan,)) if gain is None else gain
+        self._gain = np.asarray(gain, dtype=np.float32).reshape(-1, 1)
+
+    def _read_raw(self, chan, start, stop):
+        """Read calibrated data."""
+        data = self._raw.get_data(picks=chan, start=start, stop=stop)
+        data = data.astype(np.float32)
+        data *= self._gain[chan]
+        return data
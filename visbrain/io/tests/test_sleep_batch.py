@@ -0,0 +1,59 @@
+"""Test functions in sleep_batch.py."""
+import os
+import csv
+import json
+
+import numpy as np
+
+from visbrain.io.sleep_batch import sleep_batch, benchmark_sleep_batch
+from visbrain.utils import generate_eeg
+
+
+sf, n_pts = 100., 60000
+data = generate_eeg(sf=sf, n_pts=n_pts, n_channels=2, random_state=0)[0]
+hypno = np.repeat([0, 1, 2, 3, 2, 4], n_pts // 6)
+
+
+def _read_table(output):
+    with open(output, 'r', newline='') as f:
+        return [r for r in csv.DictReader(f)]
+
+
+class TestSleepBatch(object):
+    """Test functions in sleep_batch.py."""
+
+    def test_sleep_batch(self, tmpdir):
+        """Test function sleep_batch."""
+        output = str(tmpdir.join('results.csv'))
+        recordings = [(data, sf), (data[::-1, :], sf)]
+        timings = sleep_batch(recordings, [hypno, None], output=output,
+                              detections=['Spindles'], n_jobs=2)
+        assert [k['file'] for k in timings] == ['recording0', 'recording1']
+        rows = _read_table(output)
+        stats = [r for r in rows if r['kind'] == 'stat']
+        assert {r['file'] for r in stats} == {'recording0', 'recording1'}
+        tib = [float(r['value']) for r in stats if r['name'] == 'TIB']
+        assert tib == [n_pts / sf / 60.] * 2  # minutes
+        events = [r for r in rows if r['kind'] == 'event']
+        assert events
+        assert {r['channel'] for r in events} <= {'chan0', 'chan1'}
+        # Resume : nothing left to do, unfinished nights are removed :
+        with open(output, 'a', newline='') as f:
+            csv.writer(f).writerow(['recording2', 'stat', '', 'TIB', '', '',
+                                    1., ''])
+        sleep_batch(recordings + [(data, sf)], output=output,
+                    detections=['Spindles'], channels=['chan0'])
+        rows_resumed = _read_table(output)
+        assert rows_resumed[:len(rows)] == rows
+        assert {r['channel'] for r in rows_resumed[len(rows):] if r[
+            'kind'] == 'event'} <= {'chan0'}
+        with open(output + '.progress', 'r') as f:
+            journal = [json.loads(k) for k in f]
+        assert [k['file'] for k in journal][-1] == 'recording2'
+        assert len(journal) == 3
+
+    def test_benchmark_sleep_batch(self):
+        """Test function benchmark_sleep_batch."""
+        bench = benchmark_sleep_batch(n_nights=1, duration=.1)
+        assert bench['nights_per_hour'] > 0.
+        assert not os.path.isfile('bench.csv')
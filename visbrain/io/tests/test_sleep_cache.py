@@ -0,0 +1,81 @@
+"""Test functions in sleep_cache.py."""
+import os
+import datetime
+
+import numpy as np
+
+from visbrain.io.sleep_cache import SleepCache
+from visbrain.io.sleep_source import ArraySource
+
+
+class TestSleepCache(object):
+    """Test functions in sleep_cache.py."""
+
+    @staticmethod
+    def _get_file(tmpdir, name='rec.edf', size=100):
+        path = str(tmpdir.join(name))
+        with open(path, 'wb') as f:
+            f.write(b'0' * size)
+        return path
+
+    def test_key(self, tmpdir):
+        """Test function key."""
+        path = self._get_file(tmpdir)
+        key = SleepCache.key(path, downsample=100.)
+        assert key == SleepCache.key(path, downsample=100.)
+        assert key != SleepCache.key(path, downsample=200.)
+        # The file is modified :
+        self._get_file(tmpdir, size=101)
+        assert key != SleepCache.key(path, downsample=100.)
+
+    def test_save_load(self, tmpdir):
+        """Test functions save and load."""
+        cache = SleepCache(folder=str(tmpdir.join('cache')))
+        key = SleepCache.key(self._get_file(tmpdir))
+        assert cache.load(key) is None
+        data = np.random.RandomState(0).rand(3, 1000).astype(np.float32)
+        start_time = datetime.time(22, 13, 5)
+        annot = np.array([[10., 12., 'arousal'], [50., 51., 'spindle']])
+        cached = cache.save(key, data, 256., 100., 2, ['a', 'b', 'c'], 2000,
+                            start_time, annot, chunk_size=300)
+        np.testing.assert_array_equal(cached, data)
+        assert key in cache and len(cache) == 1
+        sf, ds, dsf, dat, chan, n, st, an = cache.load(key)
+        assert (sf, ds, dsf, chan, n, st) == (256., 100., 2, ['a', 'b', 'c'],
+                                              2000, start_time)
+        assert isinstance(dat, np.memmap) and dat.dtype == np.float32
+        np.testing.assert_array_equal(dat, data)
+        np.testing.assert_array_equal(an, annot)
+        # Copy-on-write (e.g re-referencing) :
+        dat *= 2.
+        np.testing.assert_array_equal(cache.load(key)[3], data)
+        # Recording sources and no annotations :
+        src = ArraySource(data, 100., ['a', 'b', 'c'])
+        cache.save(key, src, 100., None, 1, ['a', 'b', 'c'], 1000, start_time)
+        sf, ds, _, dat, _, _, _, an = cache.load(key)
+        assert ds is None and an is None
+        np.testing.assert_allclose(dat, data)
+
+    def test_evict(self, tmpdir):
+        """Test the size-bounded eviction."""
+        cache = SleepCache(folder=str(tmpdir.join('cache')))
+        data = np.zeros((3, 1000), dtype=np.float32)
+        keys = []
+        for k in range(3):
+            keys.append(SleepCache.key(self._get_file(tmpdir, '%i.edf' % k)))
+            cache.save(keys[-1], data, 100., None, 1, ['a', 'b', 'c'], 1000,
+                       datetime.time(0, 0, 0))
+            # Make sure that access times are different :
+            os.utime(cache._path(keys[-1], '.npy'), (k, k))
+        cache.max_size = 3.5 * cache.size / 3 / 1024 ** 3
+        # Last access for the first entry :
+        cache.load(keys[0])
+        key = SleepCache.key(self._get_file(tmpdir, '3.edf'))
+        cache.save(key, data, 100., None, 1, ['a', 'b', 'c'], 1000,
+                   datetime.time(0, 0, 0))
+        assert len(cache) == 3
+        assert keys[1] not in cache
+        assert all([k in cache for k in [keys[0], keys[2], key]])
+        assert cache.size <= cache.max_size * 1024 ** 3
+        cache.clear()
+        assert len(cache) == 0
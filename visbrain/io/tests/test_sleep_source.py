@@ -0,0 +1,76 @@
+"""Test functions in sleep_source.py."""
+import numpy as np
+from scipy.signal import resample_poly
+import pytest
+
+from visbrain.io.sleep_source import ArraySource
+
+
+def _assert(actual, desired):
+    np.testing.assert_allclose(actual, desired, rtol=1e-4, atol=1e-3)
+
+
+class TestSleepSource(object):
+    """Test functions in sleep_source.py."""
+
+    @staticmethod
+    def _get_source(dsf=1, **kwargs):
+        rnd = np.random.RandomState(0)
+        raw = rnd.randint(-1000, 1000, (4, 10001)).astype(np.int16)
+        gain, offset = np.array([1., 2., .5, .1]), np.array([0., 1., -1., 3.])
+        src = ArraySource(raw, 100., ['a', 'b', 'c', 'd'], gain=gain,
+                          offset=offset, dsf=dsf, **kwargs)
+        data = raw * gain.reshape(-1, 1) + offset.reshape(-1, 1)
+        data = resample_poly(data, 1, dsf, axis=-1)
+        return src, data.astype(np.float32)
+
+    def test_shape(self):
+        """Test shape, sf and channels."""
+        src, data = self._get_source(dsf=3)
+        assert src.shape == data.shape
+        assert src.sf == 100. / 3
+        assert src.channels == ['a', 'b', 'c', 'd']
+        assert len(src) == 4
+
+    def test_read(self):
+        """Test function read."""
+        for dsf in [1, 3]:
+            src, data = self._get_source(dsf=dsf, block_size=128, n_jobs=2)
+            _assert(src.read(), data)
+            _assert(src.read([2, 0], 50, 1000), data[[2, 0], 50:1000])
+            _assert(src.read(['d'], 1000), data[[3], 1000:])
+            out = np.zeros((1, 100), dtype=np.float32)
+            assert src.read([1], 0, 100, out=out) is out
+            _assert(out, data[[1], 0:100])
+
+    def test_getitem(self):
+        """Test numpy-like indexing."""
+        src, data = self._get_source(dsf=2, block_size=100)
+        visible = np.array([True, False, True, True])
+        idx = np.array([3, 20, 1000, 40])
+        t_mask = np.zeros((data.shape[1],), dtype=bool)
+        t_mask[[5, 50, 3000]] = True
+        for key in [(slice(None), slice(10, 500)), (visible, slice(0, 200)),
+                    (1, slice(None)), (0, Ellipsis), (2, idx), (0, t_mask),
+                    (slice(1, 3), slice(None, None, 4)), (3, 7)]:
+            _assert(src[key], data[key])
+        _assert(np.asarray(src), data)
+
+    def test_cache(self):
+        """Test the bounded cache."""
+        src, data = self._get_source(block_size=100, cache_size=.01)
+        for k in range(0, 10000, 250):
+            _assert(src[:, k:k + 300], data[:, k:k + 300])
+            assert src._cache_nbytes <= src._cache_max
+        src.clear_cache()
+        assert src._cache_nbytes == 0
+
+    def test_scaling(self):
+        """Test lazy scaling."""
+        src, data = self._get_source()
+        src *= np.array([1., 10., 1., 100.])[:, np.newaxis]
+        data[1, :] *= 10.
+        data[3, :] *= 100.
+        _assert(src[:, 100:200], data[:, 100:200])
+        with pytest.raises(IndexError):
+            src[0, 0, 0]
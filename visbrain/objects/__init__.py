@@ -1,20 +1,27 @@
-"""Import visbrain objects."""
-from .brain_obj import BrainObj  # noqa
-from .cbar_obj import ColorbarObj  # noqa
-from .connect_obj import ConnectObj, CombineConnect  # noqa
-from .crossec_obj import CrossSecObj  # noqa
-from .gridsig_obj import GridSignalsObj  # noqa
-from .hypno_obj import HypnogramObj  # noqa
-from .image_obj import ImageObj  # noqa
-from .pacmap_obj import PacmapObj  # noqa
-from .picture3d_obj import Picture3DObj, CombinePictures  # noqa
-from .roi_obj import RoiObj, CombineRoi  # noqa
-from .scene_obj import SceneObj, VisbrainCanvas  # noqa
-from .source_obj import SourceObj, CombineSources  # noqa
-from .tf_obj import TimeFrequencyObj  # noqa
-from .topo_obj import TopoObj  # noqa
-from .ts3d_obj import TimeSeries3DObj, CombineTimeSeries  # noqa
-from .vector_obj import VectorObj, CombineVectors  # noqa
-from .visbrain_obj import VisbrainObject, CombineObjects  # noqa
-from .vispy_obj import VispyObj  # noqa
-from .volume_obj import VolumeObj  # noqa
+"""Import visbrain objects.
+
+Objects are only imported when first used (see visbrain._lazy).
+"""
+from .._lazy import lazy_package
+
+__getattr__, __dir__, __all__ = lazy_package(__name__, attributes={
+    'brain_obj': ['BrainObj'],
+    'cbar_obj': ['ColorbarObj'],
+    'connect_obj': ['ConnectObj', 'CombineConnect'],
+    'crossec_obj': ['CrossSecObj'],
+    'gridsig_obj': ['GridSignalsObj'],
+    'hypno_obj': ['HypnogramObj'],
+    'image_obj': ['ImageObj'],
+    'pacmap_obj': ['PacmapObj'],
+    'picture3d_obj': ['Picture3DObj', 'CombinePictures'],
+    'roi_obj': ['RoiObj', 'CombineRoi'],
+    'scene_obj': ['SceneObj', 'VisbrainCanvas'],
+    'source_obj': ['SourceObj', 'CombineSources'],
+    'tf_obj': ['TimeFrequencyObj'],
+    'topo_obj': ['TopoObj'],
+    'ts3d_obj': ['TimeSeries3DObj', 'CombineTimeSeries'],
+    'vector_obj': ['VectorObj', 'CombineVectors'],
+    'visbrain_obj': ['VisbrainObject', 'CombineObjects'],
+    'vispy_obj': ['VispyObj'],
+    'volume_obj': ['VolumeObj'],
+})
@@ -1,27 +1,150 @@
-"""Projection of a source object onto a brain object."""
+"""Projection of a source object onto a brain object.
+
+Sources are only compared with vertices under the projection radius : pairs
+are found using KD-trees and the projection is a sparse (n_vertices,
+n_sources) weight matrix, so that the memory scales with the number of
+(vertex, source) pairs under radius.
+"""
 import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree, ConvexHull, QhullError
 from scipy.spatial.distance import cdist
 
-from ..utils import (normalize, color2vb)
+from ..utils import color2vb
 
 import logging
 logger = logging.getLogger('visbrain')
 PROJ_STR = "    %i sources visibles and not masked used for the %s"
 
 
-def _get_eucl_mask(v, xyz, radius, contribute, xsign):
-    # Compute euclidian distance and get sources under radius :
-    eucl = cdist(v, xyz)
-    eucl = eucl.astype(np.float32, copy=False)
-    mask = eucl <= radius
+def _get_radius_pairs(v, xyz, radius, contribute, xsign):
+    """Get the (vertex, source) pairs under radius.
+
+    Parameters
+    ----------
+    v : array_like
+        The vertices of shape (nv, 3).
+    xyz : array_like
+        The sources of shape (n_sources, 3).
+    radius : float
+        The radius under which activity is projected on vertices.
+    contribute: bool
+        Specify if sources contribute on both hemisphere.
+    xsign : array_like
+        Sign of the x coordinate of sources of shape (1, n_sources).
+
+    Returns
+    -------
+    i_v, i_s : array_like
+        Index of the vertex and of the source of each pair.
+    eucl : array_like
+        Euclidian distance of each pair.
+    """
+    tree_v, tree_s = cKDTree(v), cKDTree(xyz)
+    pairs = tree_v.sparse_distance_matrix(tree_s, radius,
+                                          output_type='ndarray')
+    i_v, i_s, eucl = pairs['i'], pairs['j'], pairs['v']
     # Contribute :
     if not contribute:
-        # Get vertices sign :
-        vsign = np.sign(v[:, 0]).reshape(-1, 1)
-        # Find where vsign and xsign are equals :
-        isign = np.logical_and(vsign != xsign, xsign != 0)
-        mask[isign] = False
-    return eucl, mask
+        # Find where vertices sign and sources sign are different :
+        vsign, xs = np.sign(v[i_v, 0]), xsign.ravel()[i_s]
+        keep = np.logical_or(vsign == xs, xs == 0)
+        i_v, i_s, eucl = i_v[keep], i_s[keep], eucl[keep]
+    return i_v, i_s, eucl
+
+
+def _hull_points(x):
+    """Get the points of the convex hull of x (or x if degenerated)."""
+    if len(x) < 64:
+        return x
+    try:
+        return x[ConvexHull(x).vertices, :]
+    except (QhullError, ValueError):
+        return x
+
+
+def _max_distance(v, xyz, chunk=1000000):
+    """Get the maximum euclidian distance between vertices and sources.
+
+    For a given vertex, the farthest source is a point of the convex hull of
+    sources, so that only the (few) points of this hull are compared.
+    """
+    xyz = _hull_points(xyz)
+    n_v = max(chunk // len(xyz), 1)
+    return max([cdist(v[k:k + n_v, :], xyz).max() for k in range(
+        0, len(v), n_v)])
+
+
+def _get_vertices_tree(v):
+    """Get vertices and their KD-tree.
+
+    Parameters
+    ----------
+    v : array_like | BrainObj | RoiObj
+        The vertices of shape (nv, 3) or (nv, 3, 3) if index faced, or an
+        object with a mesh. The KD-tree of objects is built once and then
+        cached until the vertices or the displayed hemisphere change.
+
+    Returns
+    -------
+    v : array_like
+        The vertices of shape (n, 3).
+    tree : cKDTree
+        The KD-tree of vertices.
+    """
+    if hasattr(v, 'mesh'):
+        mesh = v.mesh
+        key = (mesh._vertices, getattr(mesh, 'hemisphere', None))
+        cached = getattr(v, '_vertices_tree', None)
+        if (cached is not None) and (cached[0] is key[0]) and (
+                cached[1] == key[1]):
+            return cached[2], cached[3]
+        vertices, tree = _get_vertices_tree(v.vertices)
+        v._vertices_tree = key + (vertices, tree)
+        return vertices, tree
+    v = np.asarray(v).reshape(-1, 3)
+    return v, cKDTree(v)
+
+
+def _nearest_vertices(v, xyz, tree=None, k=8):
+    """Get the index of the closest vertex of each source.
+
+    This is equivalent to cdist(v, xyz).argmin(0) (including ties, where the
+    first vertex is returned) without computing the full distance matrix.
+
+    Parameters
+    ----------
+    v : array_like
+        The vertices of shape (nv, 3).
+    xyz : array_like
+        The sources of shape (n_sources, 3).
+    tree : cKDTree | None
+        The KD-tree of vertices.
+    k : int | 8
+        Number of neighbours from which the closest vertex is selected.
+
+    Returns
+    -------
+    idx : array_like
+        Index of the closest vertex of shape (n_sources,).
+    """
+    xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+    if not len(xyz):
+        return np.zeros((0,), dtype=int)
+    tree = cKDTree(v) if tree is None else tree
+    k = min(k, len(v))
+    _, cand = tree.query(xyz, k=k)
+    cand = cand.reshape(len(xyz), k)
+    # Distances are recomputed in double precision as cdist does :
+    diff = v[cand, :].astype(float) - xyz[:, np.newaxis, :]
+    eucl = np.sqrt((diff ** 2).sum(2))
+    # Among equidistant neighbours, the first vertex is used :
+    d_min = eucl.min(1, keepdims=True)
+    idx = np.where(eucl == d_min, cand, len(v)).min(1)
+    # Sources with more than k equidistant vertices :
+    for i in np.flatnonzero((eucl == d_min).all(1) & (k < len(v))):
+        idx[i] = cdist(v, xyz[[i], :]).argmin()
+    return idx
 
 
 def _check_projection(s_obj, v, radius, contribute, not_masked=True):
@@ -44,7 +167,195 @@ def _check_projection(s_obj, v, radius, contribute, not_masked=True):
     return xyz, data, v, xsign
 
 
-def _project_modulation(s_obj, v, radius, contribute=False):
+###############################################################################
+#                           PROJECTION OPERATOR
+###############################################################################
+
+class ProjectionOperator(object):
+    """Sparse operator projecting source's data onto vertices.
+
+    The operator only depends on the geometry (sources, vertices, radius and
+    contribute) so that it can be computed once and then applied to several
+    data vectors (e.g each time point of a time-resolved activity).
+
+    Parameters
+    ----------
+    xyz : array_like
+        The sources of shape (n_sources, 3).
+    v : array_like
+        The vertices of shape (nv, 3) or (nv, 3, 3) if index faced.
+    radius : float | 10.
+        The radius under which activity is projected on vertices.
+    contribute: bool | False
+        Specify if sources contribute on both hemisphere.
+    select : array_like | None
+        Boolean array of shape (n_sources,) of the sources to project (e.g
+        visible and not masked sources). If None, all of the sources are
+        used.
+    """
+
+    def __init__(self, xyz, v, radius=10., contribute=False, select=None):
+        """Init."""
+        xyz = np.asarray(xyz)
+        if select is None:
+            select = np.ones((len(xyz),), dtype=bool)
+        self._select = np.asarray(select, dtype=bool)
+        self._xyz = xyz[self._select, :]
+        self._v = v
+        self.radius, self.contribute = radius, contribute
+        v_faced = v[:, np.newaxis, :] if v.ndim == 2 else v
+        nv, index_faced = v_faced.shape[0], v_faced.shape[1]
+        self._shape = v.shape[:-1]
+        n_rows, n_sel = nv * index_faced, len(self._xyz)
+        xsign = np.sign(self._xyz[:, 0]).reshape(1, -1)
+        rows, cols, weights = [], [], []
+        # Rows of the operator are the (vertex, triangle) pairs :
+        for k in range(index_faced if n_sel else 0):
+            i_v, i_s, eucl = _get_radius_pairs(v_faced[:, k, :], self._xyz,
+                                               radius, contribute, xsign)
+            # Invert euclidian distance for modulation :
+            eucl = 1. - eucl / _max_distance(v_faced[:, k, :], self._xyz)
+            rows.append(i_v * index_faced + k)
+            cols.append(i_s)
+            weights.append(eucl)
+        rows = np.concatenate(rows) if rows else np.zeros((0,), dtype=int)
+        cols = np.concatenate(cols) if cols else np.zeros((0,), dtype=int)
+        weights = np.concatenate(weights) if weights else np.zeros((0,))
+        # Number of sources under radius of each vertex :
+        self.count = np.bincount(rows, minlength=n_rows)
+        is_projected = self.count > 0
+        self.vertices = np.flatnonzero(is_projected)
+        # Modulations are divided by the number of contributing sources :
+        weights /= self.count[rows]
+        row_index = np.cumsum(is_projected) - 1
+        self.weights = sparse.csr_matrix(
+            (weights.astype(np.float32), (row_index[rows], cols)),
+            shape=(len(self.vertices), n_sel))
+        # Sources contributing to at least one vertex :
+        self._contributing = np.unique(cols)
+
+    def __len__(self):
+        """Get the number of projected vertices."""
+        return len(self.vertices)
+
+    @property
+    def mask(self):
+        """Get the vertices without any source under radius."""
+        return (self.count == 0).reshape(self._shape)
+
+    @property
+    def n_sources(self):
+        """Get the number of sources used for the projection."""
+        return len(self._xyz)
+
+    def is_valid(self, xyz, v, radius, contribute, select):
+        """Get if the operator can be used for a new projection.
+
+        Parameters
+        ----------
+        xyz : array_like
+            The sources of shape (n_sources, 3).
+        v : array_like
+            The vertices.
+        radius : float
+            The radius under which activity is projected on vertices.
+        contribute: bool
+            Specify if sources contribute on both hemisphere.
+        select : array_like
+            Boolean array of shape (n_sources,) of the sources to project.
+
+        Returns
+        -------
+        is_valid : bool
+            True if the geometry is the same as the one of the operator.
+        """
+        return (v is self._v) and (radius == self.radius) and (
+            contribute == self.contribute) and np.array_equal(
+            select, self._select) and np.array_equal(
+            xyz[self._select, :], self._xyz)
+
+    def apply(self, data, norm=True):
+        """Project data onto vertices.
+
+        Parameters
+        ----------
+        data : array_like
+            The data of shape (n_sources,) or (n_sources, n_times).
+            Unselected sources are ignored.
+        norm : bool | True
+            Normalize the modulations of each frame between the minimum and
+            maximum of the data of sources under radius.
+
+        Returns
+        -------
+        modulation : array_like
+            Array of modulations of shape (n_projected_vertices,) or
+            (n_projected_vertices, n_times). The vertex of each row is in the
+            `vertices` attribute.
+        """
+        data = np.asarray(data)
+        assert data.shape[0] == len(self._select)
+        data = data[self._select, ...]
+        mod = np.asarray(self.weights.dot(data.astype(np.float32,
+                                                      copy=False)))
+        if not (norm and mod.size):
+            return mod
+        # Normalize each frame between under radius data (inplace, in
+        # float32). Constant frames are only scaled :
+        d_con = data[self._contributing, ...]
+        tomin, tomax = d_con.min(0), d_con.max(0)
+        xm, xh = mod.min(0), mod.max(0)
+        is_cst = xm == xh
+        coef = np.where(is_cst, tomax / np.where(xh == 0, 1., xh),
+                        (tomax - tomin) / np.where(is_cst, 1., xh - xm))
+        mod -= np.where(is_cst, 0., xh).astype(np.float32)
+        mod *= coef.astype(np.float32)
+        mod += np.where(is_cst, 0., tomax).astype(np.float32)
+        return mod
+
+    def apply_masked(self, data):
+        """Project data onto all of the vertices.
+
+        Parameters
+        ----------
+        data : array_like
+            The data of shape (n_sources,) or (n_sources, n_times).
+
+        Returns
+        -------
+        modulation : array_like
+            Masked array of shape (nv, ...) or (nv, 3, ...) if index faced,
+            where the mask refer to vertices without any source under radius.
+        """
+        mod = self.apply(data)
+        full = np.zeros((len(self.count),) + mod.shape[1:], dtype=np.float32)
+        full[self.vertices, ...] = mod
+        mask = np.broadcast_to((self.count == 0).reshape(
+            (-1,) + (1,) * (mod.ndim - 1)), full.shape)
+        shape = self._shape + mod.shape[1:]
+        return np.ma.masked_array(full.reshape(shape), mask.reshape(shape))
+
+
+def _get_projection_operator(s_obj, b_obj, v, radius, contribute,
+                             not_masked=True):
+    """Get the projection operator cached by b_obj (or create it)."""
+    if not_masked:  # get visible and not masked sources
+        select = s_obj.visible_and_not_masked
+    else:           # get visible and masked sources
+        select = np.logical_and(s_obj.mask, s_obj.visible)
+    xyz = s_obj._xyz
+    cache = getattr(b_obj, '_proj_operators', {})
+    key = (not_masked, float(radius), contribute)
+    op = cache.get(key, None)
+    if (op is None) or not op.is_valid(xyz, v, radius, contribute, select):
+        op = ProjectionOperator(xyz, v, radius, contribute, select)
+        cache[key] = op
+    else:
+        logger.debug("    Use the cached projection operator")
+    return op
+
+
+def _project_modulation(s_obj, v, radius, contribute=False, op=None):
     """Project source's data onto vertices.
 
     Parameters
@@ -57,6 +368,9 @@ def _project_modulation(s_obj, v, radius, contribute=False):
         The radius under which activity is projected on vertices.
     contribute: bool | False
         Specify if sources contribute on both hemisphere.
+    op : ProjectionOperator | None
+        A projection operator of visible and not masked sources. If None, a
+        new one is computed.
 
     Returns
     -------
@@ -68,46 +382,21 @@ def _project_modulation(s_obj, v, radius, contribute=False):
     # Check inputs :
     xyz, data, v, xsign = _check_projection(s_obj, v, radius, contribute)
     logger.info(PROJ_STR % (len(data), 'projection'))
-    index_faced = v.shape[1]
-    # Modulation / proportion / (Min, Max) :
-    modulation = np.ma.zeros((v.shape[0], index_faced), dtype=np.float32)
-    prop = np.zeros_like(modulation.data)
-    minmax = np.zeros((index_faced, 2), dtype=np.float32)
     if len(data) == 0:
         logger.warn("Projection ignored because no sources visibles and "
                     "not masked")
+        modulation = np.ma.zeros(v.shape[:-1], dtype=np.float32)
         return np.squeeze(np.ma.masked_array(modulation, True))
-
-    # For each triangle :
-    for k in range(index_faced):
-        # =============== EUCLIDIAN DISTANCE ===============
-        eucl, mask = _get_eucl_mask(v[:, k, :], xyz, radius, contribute, xsign)
-        # Invert euclidian distance for modulation and mask it :
-        np.multiply(eucl, -1. / eucl.max(), out=eucl)
-        np.add(eucl, 1., out=eucl)
-        eucl = np.ma.masked_array(eucl, mask=np.invert(mask),
-                                  dtype=np.float32)
-
-        # =============== MODULATION ===============
-        # Modulate data by distance (only for sources under radius) :
-        modulation[:, k] = np.ma.dot(eucl, data, strict=False)
-
-        # =============== PROPORTIONS ===============
-        np.sum(mask, axis=1, dtype=np.float32, out=prop[:, k])
-        nnz = np.nonzero(mask.sum(0))
-        minmax[k, :] = np.array([data[nnz].min(), data[nnz].max()])
-
-    # Divide modulations by the number of contributing sources :
-    prop[prop == 0.] = 1.
-    np.divide(modulation, prop, out=modulation)
-    # Normalize inplace modulations between under radius data :
-    normalize(modulation, minmax.min(), minmax.max())
+    if op is None:
+        op = ProjectionOperator(s_obj._xyz, np.squeeze(v), radius, contribute,
+                                s_obj.visible_and_not_masked)
+    modulation = op.apply_masked(s_obj._data)
     s_obj._minmax = (modulation.min(), modulation.max())
 
-    return np.squeeze(modulation)
+    return modulation
 
 
-def _project_repartition(s_obj, v, radius, contribute=False):
+def _project_repartition(s_obj, v, radius, contribute=False, op=None):
     """Project source's repartition onto vertices.
 
     Parameters
@@ -120,6 +409,9 @@ def _project_repartition(s_obj, v, radius, contribute=False):
         The radius under which activity is projected on vertices.
     contribute: bool | False
         Specify if sources contribute on both hemisphere.
+    op : ProjectionOperator | None
+        A projection operator of visible and not masked sources. If None, a
+        new one is computed.
 
     Returns
     -------
@@ -131,30 +423,22 @@ def _project_repartition(s_obj, v, radius, contribute=False):
     # Check inputs :
     xyz, _, v, xsign = _check_projection(s_obj, v, radius, contribute)
     logger.info(PROJ_STR % (xyz.shape[0], 'repartition'))
-    index_faced = v.shape[1]
-    # Corticale repartition :
-    repartition = np.ma.zeros((v.shape[0], index_faced), dtype=np.int)
     if not xyz.size:
         logger.warn("Repartition ignored because no sources visibles and "
                     "not masked")
+        repartition = np.ma.zeros(v.shape[:-1], dtype=int)
         return np.squeeze(np.ma.masked_array(repartition, True))
-
-    # For each triangle :
-    for k in range(index_faced):
-        # =============== EUCLIDIAN DISTANCE ===============
-        eucl, mask = _get_eucl_mask(v[:, k, :], xyz, radius, contribute, xsign)
-
-        # =============== REPARTITION ===============
-        # Sum over sources dimension :
-        sm = np.sum(mask, 1, dtype=np.int)
-        smmask = np.invert(sm.astype(bool))
-        repartition[:, k] = np.ma.masked_array(sm, mask=smmask)
+    if op is None:
+        op = ProjectionOperator(s_obj._xyz, np.squeeze(v), radius, contribute,
+                                s_obj.visible_and_not_masked)
+    # Number of sources under radius :
+    repartition = np.ma.masked_array(op.count.reshape(op._shape), op.mask)
     s_obj._minmax = (repartition.min(), repartition.max())
 
-    return np.squeeze(repartition)
+    return repartition
 
 
-def _get_masked_index(s_obj, v, radius, contribute=False):
+def _get_masked_index(s_obj, v, radius, contribute=False, op=None):
     """Get the index of masked source's under radius.
 
     Parameters
@@ -167,6 +451,9 @@ def _get_masked_index(s_obj, v, radius, contribute=False):
         The radius under which activity is projected on vertices.
     contribute: bool | False
         Specify if sources contribute on both hemisphere.
+    op : ProjectionOperator | None
+        A projection operator of visible and masked sources. If None, a new
+        one is computed.
 
     Returns
     -------
@@ -177,20 +464,13 @@ def _get_masked_index(s_obj, v, radius, contribute=False):
     xyz, data, v, xsign = _check_projection(s_obj, v, radius, contribute,
                                             False)
     logger.info("    %i sources visibles and masked found" % len(data))
-    # Predefined masked euclidian distance :
-    nv, index_faced = v.shape[0], v.shape[1]
-    fmask = np.ones((v.shape[0], index_faced, len(data)), dtype=bool)
-
-    # For each triangle :
-    for k in range(index_faced):
-        # =============== EUCLIDIAN DISTANCE ===============
-        _, fmask[:, k, :] = _get_eucl_mask(v[:, k, :], xyz, radius, contribute,
-                                           xsign)
+    if not len(data):
+        return np.squeeze(np.zeros(v.shape[:-1], dtype=bool))
+    if op is None:
+        op = ProjectionOperator(s_obj._xyz, np.squeeze(v), radius, contribute,
+                                np.logical_and(s_obj.mask, s_obj.visible))
     # Find where there's sources under radius and need to be masked :
-    m = fmask.reshape(fmask.shape[0] * index_faced, fmask.shape[2])
-    idx = np.dot(m, np.ones((len(data),), dtype=bool))
-
-    return np.squeeze(idx.reshape(nv, index_faced))
+    return ~op.mask
 
 
 def _project_sources_data(s_obj, b_obj, project='modulation', radius=10.,
@@ -220,21 +500,89 @@ def _project_sources_data(s_obj, b_obj, project='modulation', radius=10.,
     vertices = mesh._vertices
 
     # _____________________ GET MODULATION _____________________
-    mod = project_fcn(s_obj, vertices, radius, contribute)
+    op = _get_projection_operator(s_obj, b_obj, vertices, radius, contribute)
+    mod = project_fcn(s_obj, vertices, radius, contribute, op=op)
     # Update mesh color informations :
     b_obj._minmax = (float(mod.min()), float(mod.max()))
     if clim is None:
         clim = b_obj._minmax
         b_obj._clim = b_obj._minmax
     # Get where there's masked sources :
-    mask_idx = np.zeros((len(mod),), dtype=bool)
-    if s_obj.is_masked:
-        mask_idx = _get_masked_index(s_obj, vertices, radius, contribute)
-        mesh.mask_color = mask_color
-        logger.info("    Set masked sources cortical activity to the "
-                    "color %s" % str(list(mesh.mask_color.ravel())[0:-1]))
+    mask_idx = _set_masked_sources(s_obj, b_obj, vertices, radius, contribute,
+                                   mask_color)
 
     # _____________________ MODULATION TO COLOR _____________________
     mesh.add_overlay(mod[~mod.mask], np.where(~mod.mask)[0], cmap=cmap,
                      to_overlay=to_overlay, mask_data=mask_idx, clim=clim,
                      vmin=vmin, vmax=vmax, under=under, over=over)
+
+
+def _set_masked_sources(s_obj, b_obj, vertices, radius, contribute,
+                        mask_color):
+    """Get the vertices of masked sources and set the mesh mask color."""
+    mask_idx = np.zeros((len(vertices),), dtype=bool)
+    if s_obj.is_masked:
+        op = _get_projection_operator(s_obj, b_obj, vertices, radius,
+                                      contribute, False)
+        mask_idx = _get_masked_index(s_obj, vertices, radius, contribute, op)
+        b_obj.mesh.mask_color = mask_color
+        logger.info("    Set masked sources cortical activity to the "
+                    "color %s" % str(list(b_obj.mesh.mask_color.ravel())[
+                        0:-1]))
+    return mask_idx
+
+
+def _project_sources_frames(s_obj, b_obj, data, radius=10., contribute=False,
+                            cmap='viridis', clim=None, vmin=None,
+                            under='black', vmax=None, over='red',
+                            mask_color=None, to_overlay=0):
+    """Project time-resolved source's data frame by frame.
+
+    All of the frames are projected at once. The returned generator only
+    sends the next frame to the mesh overlay at each iteration.
+    """
+    # _____________________ CHECKING _____________________
+    assert type(s_obj).__name__ in ['SourceObj', 'CombineSources']
+    assert type(b_obj).__name__ in ['BrainObj', 'RoiObj']
+    assert isinstance(radius, (int, float))
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+    if (data.ndim != 2) or (data.shape[0] != len(s_obj)):
+        raise ValueError("`data` should be an array of shape (n_sources=%i, "
+                         "n_times)" % len(s_obj))
+    if mask_color is None:
+        mask_color = s_obj.mask_color
+    mask_color = color2vb(mask_color)
+    logger.info("    Project %i frames of source's data (radius=%r, "
+                "contribute=%r)" % (data.shape[1], radius, contribute))
+    mesh = b_obj.mesh
+    vertices = mesh._vertices
+
+    # _____________________ GET MODULATIONS _____________________
+    op = _get_projection_operator(s_obj, b_obj, vertices, radius, contribute)
+    logger.info(PROJ_STR % (op.n_sources, 'projection'))
+    if not len(op):
+        logger.warn("Projection ignored because no vertices are under "
+                    "radius of visible and not masked sources")
+        return iter(())
+    frames = op.apply(data)
+    # Update mesh color informations :
+    b_obj._minmax = (float(frames.min()), float(frames.max()))
+    if clim is None:
+        clim = b_obj._minmax
+        b_obj._clim = b_obj._minmax
+    mask_idx = _set_masked_sources(s_obj, b_obj, vertices, radius, contribute,
+                                   mask_color)
+    # The colormap is defined once, using the same limits for every frame :
+    mesh.add_overlay(frames[:, 0], op.vertices, cmap=cmap,
+                     to_overlay=to_overlay, mask_data=mask_idx, clim=clim,
+                     vmin=vmin, vmax=vmax, under=under, over=over,
+                     data_lim=clim)
+
+    def _stream():
+        yield 0
+        for k in range(1, frames.shape[1]):
+            mesh.set_overlay_data(frames[:, k], op.vertices, to_overlay)
+            yield k
+    return _stream()
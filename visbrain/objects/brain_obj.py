@@ -6,13 +6,15 @@ import logging
 from vispy import scene
 
 from .visbrain_obj import VisbrainObject
-from ._projection import _project_sources_data
+from ._projection import (_project_sources_data, _project_sources_frames,
+                          _get_projection_operator)
 from ..visuals import BrainMesh
-from ..utils import (mesh_edges, smoothing_matrix, rotate_turntable)
+from ..config import CONFIG
+from ..utils import (SmoothingCache, rotate_turntable)
 from ..io import (is_nibabel_installed, is_pandas_installed,
                   add_brain_template, remove_brain_template, read_x3d,
                   read_gii, read_obj, is_freesurfer_mesh_file,
-                  read_freesurfer_mesh)
+                  read_freesurfer_mesh, path_to_visbrain_data)
 
 logger = logging.getLogger('visbrain')
 
@@ -105,6 +107,8 @@ class BrainObj(VisbrainObject):
         VisbrainObject.__init__(self, name, parent, transform, verbose, **kw)
         # Load brain template :
         self._scale = _scale
+        self._proj_operators = {}
+        self._smoothing = SmoothingCache()
         self.data_folder = 'templates'
         if any(k in name for k in ['.x3d', '.gii', '.obj']):
             filename = os.path.split(name)[1]
@@ -129,6 +133,7 @@ class BrainObj(VisbrainObject):
                  sulcus=False):
         """Load a brain template."""
         # _______________________ TEMPLATE _______________________
+        self._is_template = False
         if not all([isinstance(k, np.ndarray) for k in [vertices, faces]]):
             to_load = None
             name_npz = name + '.npz'
@@ -143,6 +148,7 @@ class BrainObj(VisbrainObject):
             vertices, faces = arch['vertices'], arch['faces']
             normals = arch['normals']
             lr_index = arch['lr_index'] if 'lr_index' in arch.keys() else None
+            self._is_template = True
 
         # Sulcus :
         if sulcus is True:
@@ -321,6 +327,86 @@ class BrainObj(VisbrainObject):
                               mask_color=mask_color, to_overlay=to_overlay,
                               **kw)
 
+    def projection_operator(self, s_obj, radius=10., contribute=False):
+        """Get the operator projecting source's data onto the brain object.
+
+        The operator is computed once for a set of (sources, vertices, radius,
+        contribute) and then cached by the brain object, until the position,
+        visibility or mask of sources change.
+
+        Parameters
+        ----------
+        s_obj : SourceObj
+            The source object to project.
+        radius : float | 10.
+            The radius under which activity is projected on vertices.
+        contribute: bool | False
+            Specify if sources contribute on both hemisphere.
+
+        Returns
+        -------
+        op : ProjectionOperator
+            The projection operator. Use `op.apply(data)` to get the
+            modulations of the `op.vertices` vertices, where data is an
+            array of shape (n_sources,) or (n_sources, n_times).
+        """
+        return _get_projection_operator(s_obj, self, self.mesh._vertices,
+                                        radius, contribute)
+
+    def project_sources_frames(self, s_obj, data, radius=10.,
+                               contribute=False, cmap='viridis', clim=None,
+                               vmin=None, under='black', vmax=None,
+                               over='red', mask_color=None, to_overlay=0):
+        """Project time-resolved source's activity onto the brain object.
+
+        The projection of every frame is computed at once. Each iteration of
+        the returned generator then displays the next frame. For example,
+        using a vispy timer ::
+
+            frames = b_obj.project_sources_frames(s_obj, data)
+            timer = vispy.app.Timer(.04, connect=lambda ev: next(frames,
+                                                                 None))
+
+        Parameters
+        ----------
+        s_obj : SourceObj
+            The source object to project.
+        data : array_like
+            The time-resolved activity of shape (n_sources, n_times).
+        radius : float
+            The radius under which activity is projected on vertices.
+        contribute: bool | False
+            Specify if sources contribute on both hemisphere.
+        cmap : string | 'viridis'
+            The colormap to use.
+        clim : tuple | None
+            The colorbar limits, shared by every frame. If None, the (min,
+            max) of the projected data over all frames will be used instead.
+        vmin : float | None
+            Minimum threshold.
+        vmax : float | None
+            Maximum threshold.
+        under : string/tuple/array_like | 'gray'
+            The color to use for values under vmin.
+        over : string/tuple/array_like | 'red'
+            The color to use for values over vmax.
+        mask_color : string/tuple/array_like | 'gray'
+            The color to use for the projection of masked sources. If None,
+            the color of the masked sources is going to be used.
+        to_overlay : int | 0
+            The overlay number used for the projection.
+
+        Returns
+        -------
+        frames : generator
+            Generator displaying the next frame and returning its index.
+        """
+        kw = self._update_cbar_args(cmap, clim, vmin, vmax, under, over)
+        self._default_cblabel = "Source modulation"
+        return _project_sources_frames(s_obj, self, data, radius, contribute,
+                                       mask_color=mask_color,
+                                       to_overlay=to_overlay, **kw)
+
     def add_activation(self, data=None, vertices=None, smoothing_steps=5,
                        file=None, hemisphere=None, hide_under=None,
                        n_contours=None, cmap='viridis', clim=None, vmin=None,
@@ -404,9 +490,13 @@ class BrainObj(VisbrainObject):
                 vert_whole = vertices
 
             if smoothing_steps and is_do_smoothing:
-                edges = mesh_edges(self.mesh._faces)
-                sm_mat = smoothing_matrix(vert_whole, edges, smoothing_steps)
-                sc = sm_mat * data  # actual data smoothing
+                # Smoothing matrices of templates can be saved :
+                save = CONFIG['SMOOTHING_ON_DISK'] and self._is_template
+                self._smoothing.folder = path_to_visbrain_data(
+                    folder='smoothing') if save else None
+                sm_mat = self._smoothing.get(self.mesh._faces, vert_whole,
+                                             smoothing_steps)
+                sc = sm_mat.dot(data)  # actual data smoothing
                 if hemisphere != 'both':
                     sc = sc[activ_vert]
             else:
@@ -121,6 +121,7 @@ class RoiObj(_Volume):
         """Init."""
         _Volume.__init__(self, name, parent, transform, verbose, **kw)
         self._scale = _scale
+        self._proj_operators = {}
         if preload:
             self(name, vol, labels, index, hdr, system)
 
@@ -3,14 +3,14 @@ from warnings import warn
 import logging
 import numpy as np
 from itertools import product
-from scipy.spatial.distance import cdist
 
 from vispy import scene
 from vispy.scene import visuals
 import vispy.visuals.transforms as vist
 
 from .visbrain_obj import VisbrainObject, CombineObjects
-from ._projection import _project_sources_data
+from ._projection import (_project_sources_data, _get_vertices_tree,
+                          _nearest_vertices)
 from .roi_obj import RoiObj
 from ..utils import (tal2mni, color2vb, normalize, vispy_array,
                      wrap_properties, array2colormap)
@@ -497,8 +497,10 @@ class SourceObj(VisbrainObject):
             select sources that are closed to the surface (see the distance
             parameter below). Finally, use 'all' (or True), 'none' (or None,
             False) to show or hide all of the sources.
-        v : array_like | None
-            The vertices of shape (nv, 3) or (nv, 3, 3) if index faced.
+        v : array_like | BrainObj | RoiObj | None
+            The vertices of shape (nv, 3) or (nv, 3, 3) if index faced. If a
+            brain or roi object is used, the nearest neighbour search uses
+            the spatial index cached by the object.
         distance : float | 5.
             Distance between the source and the surface.
         """
@@ -509,26 +511,16 @@ class SourceObj(VisbrainObject):
         xyz = self._xyz
         if select in ['inside', 'outside', 'close']:
             logger.info("    Select sources %s vertices" % select)
-            if v.ndim == 2:  # index faced vertices
-                v = v[:, np.newaxis, :]
-            # Predifined inside :
-            nv, index_faced = v.shape[0], v.shape[1]
-            v = v.reshape(nv * index_faced, 3)
-            inside = np.ones((xyz.shape[0],), dtype=bool)
-
-            # Loop over ALL oh the sources :
-            for i in range(len(self)):
-                # Get the euclidian distance :
-                eucl = cdist(v, xyz[[i], :])
-                # Get the closest vertex :
-                eucl_argmin = eucl.argmin()
-                # Get distance to zero :
-                xyz_t0 = np.sqrt((xyz[[i], :] ** 2).sum())
-                v_t0 = np.sqrt((v[eucl_argmin, :] ** 2).sum())
-                if select in ['inside', 'outside']:
-                    inside[i] = xyz_t0 <= v_t0
-                elif select == 'close':
-                    inside[i] = np.abs(xyz_t0 - v_t0) > distance
+            v, tree = _get_vertices_tree(v)
+            # Get the closest vertex of every source :
+            v_closest = v[_nearest_vertices(v, xyz, tree), :]
+            # Get distance to zero :
+            xyz_t0 = np.sqrt((xyz ** 2).sum(1))
+            v_t0 = np.sqrt((v_closest ** 2).sum(1))
+            if select in ['inside', 'outside']:
+                inside = xyz_t0 <= v_t0
+            elif select == 'close':
+                inside = np.abs(xyz_t0 - v_t0) > distance
             self.visible = inside if select == 'inside' else np.invert(inside)
         elif select in ['all', 'none', None, True, False]:
             cond = select in ['all', True]
@@ -546,22 +538,16 @@ class SourceObj(VisbrainObject):
 
         Parameters
         ----------
-        v : array_like
-            The vertices of shape (nv, 3) or (nv, 3, 3) if index faced.
+        v : array_like | BrainObj | RoiObj
+            The vertices of shape (nv, 3) or (nv, 3, 3) if index faced. If a
+            brain or roi object is used, the nearest neighbour search uses
+            the spatial index cached by the object.
         """
-        if v.ndim == 2:  # index faced vertices
-            v = v[:, np.newaxis, :]
-        # Predifined inside :
-        nv, index_faced = v.shape[0], v.shape[1]
-        v = v.reshape(nv * index_faced, 3)
+        v, tree = _get_vertices_tree(v)
         new_pos = np.zeros_like(self._xyz)
-
-        # Loop over visible and not-masked sources :
-        for i, k in enumerate(self):
-            # Get the euclidian distance :
-            eucl = cdist(v, k)
-            # Set new coordinate using the closest vertex :
-            new_pos[i, :] = v[eucl.argmin(), :]
+        # Set visible and not-masked sources to the closest vertex :
+        xyz = self.xyz
+        new_pos[:len(xyz), :] = v[_nearest_vertices(v, xyz, tree), :]
         # Finally update data sources and text :
         self._sources._data['a_position'] = new_pos
         self._sources_text.pos = new_pos
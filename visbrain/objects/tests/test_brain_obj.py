@@ -126,6 +126,14 @@ class TestBrainObj(_TestObjects):
         b_obj.project_sources(s_obj, 'modulation')
         b_obj.project_sources(s_obj, 'repartition')
 
+    def test_projection_frames(self):
+        """Test the projection of time-resolved activity."""
+        op = b_obj.projection_operator(s_obj, radius=10.)
+        assert b_obj.projection_operator(s_obj, radius=10.) is op
+        data = np.random.rand(len(s_obj), 20)
+        frames = list(b_obj.project_sources_frames(s_obj, data, radius=10.))
+        assert frames == list(range(20))
+
     def test_properties(self):
         """Test BrainObj properties (setter and getter)."""
         self._tested_obj = b_obj
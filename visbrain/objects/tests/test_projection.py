@@ -0,0 +1,129 @@
+"""Test the projection of sources onto vertices."""
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from visbrain.objects import SourceObj
+from visbrain.objects._projection import (_project_modulation,
+                                          _project_repartition,
+                                          _get_masked_index, _max_distance,
+                                          ProjectionOperator,
+                                          _get_projection_operator,
+                                          _nearest_vertices,
+                                          _get_vertices_tree)
+
+
+rnd = np.random.RandomState(0)
+xyz = rnd.uniform(-50., 50., (40, 3))
+data = rnd.rand(40) * 10.
+vertices = rnd.uniform(-60., 60., (3000, 3)).astype(np.float32)
+mask = rnd.rand(40) > .7
+s_obj = SourceObj('S', xyz, data=data, mask=mask)
+
+
+def _dense_projection(v, radius, contribute):
+    """Dense projection (reference)."""
+    sel = s_obj.visible_and_not_masked
+    xyz, data = s_obj._xyz[sel, :], s_obj._data[sel]
+    eucl = cdist(v, xyz)
+    is_in = eucl <= radius
+    if not contribute:
+        is_in &= (np.sign(v[:, [0]]) == np.sign(xyz[:, 0])) | (
+            np.sign(xyz[:, 0]) == 0)
+    weights = np.where(is_in, 1. - eucl / eucl.max(), 0.)
+    count = is_in.sum(1)
+    return weights.dot(data) / np.maximum(count, 1), count
+
+
+class TestProjection(object):
+    """Test functions in _projection.py."""
+
+    def test_max_distance(self):
+        """Test function max_distance."""
+        dist = _max_distance(vertices, s_obj._xyz)
+        np.testing.assert_almost_equal(dist, cdist(vertices,
+                                                   s_obj._xyz).max(), 4)
+
+    def test_project_modulation(self):
+        """Test function project_modulation."""
+        for contribute in [False, True]:
+            mod = _project_modulation(s_obj, vertices, 15., contribute)
+            ref, count = _dense_projection(vertices, 15., contribute)
+            np.testing.assert_array_equal(mod.mask, count == 0)
+            # Modulations are normalized between sources min / max :
+            ref = ref[count > 0]
+            corr = np.corrcoef(mod.compressed(), ref)[0, 1]
+            np.testing.assert_almost_equal(corr, 1., 5)
+
+    def test_project_repartition(self):
+        """Test function project_repartition."""
+        rep = _project_repartition(s_obj, vertices, 15., True)
+        _, count = _dense_projection(vertices, 15., True)
+        np.testing.assert_array_equal(rep.filled(0), count)
+        assert rep.dtype == int
+
+    def test_get_masked_index(self):
+        """Test function get_masked_index."""
+        idx = _get_masked_index(s_obj, vertices, 15., True)
+        ref = (cdist(vertices, s_obj._xyz[s_obj.mask, :]) <= 15.).any(1)
+        np.testing.assert_array_equal(idx, ref)
+
+    def test_index_faced(self):
+        """Test the projection on index faced vertices."""
+        v_faced = vertices.reshape(-1, 3, 3)
+        mod = _project_modulation(s_obj, v_faced, 15.)
+        assert mod.shape == (1000, 3)
+        ref, count = _dense_projection(vertices, 15., False)
+        np.testing.assert_array_equal(mod.mask.ravel(), count == 0)
+
+    def test_projection_operator(self):
+        """Test the projection of several frames with an operator."""
+        sel = s_obj.visible_and_not_masked
+        op = ProjectionOperator(s_obj._xyz, vertices, 15., False, sel)
+        mod = _project_modulation(s_obj, vertices, 15.)
+        np.testing.assert_array_equal(op.mask, mod.mask)
+        np.testing.assert_array_equal(op.vertices, np.where(~mod.mask)[0])
+        # Each frame is the projection of the corresponding data :
+        frames = rnd.rand(len(s_obj), 5) * 10.
+        proj = op.apply(frames)
+        assert proj.shape == (len(op), 5) and proj.dtype == np.float32
+        for k in range(5):
+            s_k = SourceObj('S', xyz, data=frames[:, k], mask=mask)
+            mod_k = _project_modulation(s_k, vertices, 15.)
+            np.testing.assert_allclose(proj[:, k], mod_k.compressed(),
+                                       rtol=1e-4)
+        np.testing.assert_allclose(op.apply(frames[:, 0]), proj[:, 0])
+        # Weighted averages, without normalization :
+        raw = op.apply(frames, norm=False)
+        np.testing.assert_allclose(raw, op.weights.dot(frames[sel, :]),
+                                   rtol=1e-5)
+
+    def test_projection_operator_cache(self):
+        """Test that projection operators are cached."""
+        class _Brain(object):
+            _proj_operators = {}
+        b_obj = _Brain()
+        s_c = SourceObj('S', xyz, data=data, mask=mask)
+        op = _get_projection_operator(s_c, b_obj, vertices, 15., False)
+        assert _get_projection_operator(s_c, b_obj, vertices, 15.,
+                                        False) is op
+        # Operators are updated when the geometry change :
+        assert _get_projection_operator(s_c, b_obj, vertices, 10.,
+                                        False) is not op
+        assert _get_projection_operator(s_c, b_obj, vertices.copy(), 15.,
+                                        False) is not op
+        s_c.mask = ~mask
+        assert _get_projection_operator(s_c, b_obj, vertices, 15.,
+                                        False) is not op
+
+    def test_nearest_vertices(self):
+        """Test function nearest_vertices."""
+        # Rounded coordinates to get equidistant vertices :
+        v_r, xyz_r = np.round(vertices), np.round(xyz)
+        for v_t in [v_r, v_r.reshape(-1, 3, 3), vertices]:
+            v_t, tree = _get_vertices_tree(v_t)
+            idx = _nearest_vertices(v_t, xyz_r, tree, k=2)
+            np.testing.assert_array_equal(idx, cdist(v_t, xyz_r).argmin(0))
+        # Sources equidistant to all of the neighbours :
+        v_sym = np.array([[1., 0, 0], [-1., 0, 0], [0, 1., 0], [0, 0, 5.]])
+        idx = _nearest_vertices(v_sym, np.zeros((1, 3)), k=2)
+        np.testing.assert_array_equal(idx, [0])
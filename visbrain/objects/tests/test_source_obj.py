@@ -109,10 +109,17 @@ class TestSourceObj(_TestObjects):
         for k in to_test:
             s_obj.set_visible_sources(select=k, v=vertices_x3)
             s_obj.set_visible_sources(select=k, v=vertices)
+        # Spatial index cached by the brain object :
+        for k in ['inside', 'outside', 'close']:
+            s_obj.set_visible_sources(select=k, v=b_obj.vertices)
+            visible = s_obj.visible.copy()
+            s_obj.set_visible_sources(select=k, v=b_obj)
+            np.testing.assert_array_equal(visible, s_obj.visible)
 
     def test_fit_to_vertices(self):
         """Test function source_fit_to_vertices."""
         s_obj.fit_to_vertices(vertices_x3)
+        s_obj.fit_to_vertices(b_obj)
 
     def test_projection(self):
         """Test function source_projection."""
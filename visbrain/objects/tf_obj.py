@@ -4,7 +4,7 @@ import numpy as np
 from scipy.signal import spectrogram
 
 from .image_obj import ImageObj
-from ..utils import (morlet, averaging, normalization)
+from ..utils import (morlet_bank, averaging, normalization)
 from ..io.dependencies import is_lspopt_installed
 
 logger = logging.getLogger('visbrain')
@@ -154,12 +154,11 @@ class TimeFrequencyObj(ImageObj):
             n_pts = len(data)
             freqs = np.arange(f_min, f_max, f_step)
             time = np.arange(n_pts) / sf
-            tf = np.zeros((len(freqs), n_pts), dtype=data.dtype)
-            # Compute TF and inplace normalization :
+            # Compute TF (all frequencies at once) and inplace normalization :
             logger.info("    Compute the time-frequency map ("
                         "normalization=%r)" % norm)
-            for i, k in enumerate(freqs):
-                tf[i, :] = np.square(np.abs(morlet(data, sf, k)))
+            tf = morlet_bank(data, sf, freqs, get='power').astype(
+                data.dtype, copy=False)
             normalization(tf, norm=norm, baseline=baseline, axis=1)
 
             # Averaging :
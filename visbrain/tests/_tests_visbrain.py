@@ -1,9 +1,14 @@
 """Utility function for Visbrain tests."""
 import os
 import numpy as np
+import pytest
 
 from visbrain.io import download_file, path_to_visbrain_data
 
+# Benchmarks only run if the VISBRAIN_BENCHMARK variable is set :
+benchmark = pytest.mark.skipif(not os.environ.get('VISBRAIN_BENCHMARK'),
+                               reason="Set VISBRAIN_BENCHMARK to run")
+
 
 class _TestVisbrain(object):
     """Visbrain testing utility methods."""
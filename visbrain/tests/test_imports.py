@@ -1,4 +1,7 @@
 """Test modules importation."""
+import sys
+
+import pytest
 
 
 def test_import_matplotlib():
@@ -39,3 +42,72 @@ def test_import_signal():
 def test_import_figure():
     """Import the Figure module.."""
     from visbrain.gui import Figure  # noqa
+
+
+###############################################################################
+#                              LAZY IMPORTS
+###############################################################################
+HEAVY_MODULES = ('PyQt5', 'vispy', 'matplotlib')
+# Packages are loaded lazily with Python >= 3.7 only (see visbrain._lazy) :
+needs_lazy = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason="Requires Python >= 3.7")
+
+
+def _import_in_subprocess(*modules):
+    """Import modules in a new interpreter.
+
+    Returns the import duration (in seconds) and the heavy modules imported.
+    """
+    import json
+    import subprocess
+    code = ("import sys, json, time; t_start = time.perf_counter(); "
+            "import %s; print(json.dumps([time.perf_counter() - t_start, "
+            "[k for k in %r if k in sys.modules]]))" % (
+                ', '.join(modules), HEAVY_MODULES))
+    out = subprocess.run([sys.executable, '-c', code], check=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         universal_newlines=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+@needs_lazy
+def test_import_packages_time():
+    """Import visbrain packages without importing their submodules."""
+    duration, heavy = _import_in_subprocess(
+        'visbrain', 'visbrain.utils', 'visbrain.io', 'visbrain.objects',
+        'visbrain.gui', 'visbrain.config')
+    assert not heavy
+    # Generous budget, relative to the import of NumPy (used by config) :
+    duration_numpy = _import_in_subprocess('numpy')[0]
+    assert duration < 5. * duration_numpy + .1
+
+
+@needs_lazy
+def test_import_headless():
+    """Import signal processing functions without any graphical library."""
+    for module in ('visbrain.utils.sleep.detection', 'visbrain.io.rw_hypno',
+                   'visbrain.utils.sleep.detectpool',
+                   'visbrain.io.sleep_batch', 'visbrain.utils.filtering'):
+        assert not _import_in_subprocess(module)[1], module
+
+
+def test_lazy_attributes():
+    """Test that lazily exported names match their submodules."""
+    import importlib
+    for name in ('visbrain.utils', 'visbrain.utils.sleep', 'visbrain.io',
+                 'visbrain.objects'):
+        package = importlib.import_module(name)
+        for attr in package.__all__:
+            assert getattr(package, attr) is not None, (name, attr)
+            assert attr in dir(package)
+    # Every public function of a submodule is exported :
+    for name in ('utils.filtering', 'utils.sigproc', 'utils.physio',
+                 'io.rw_hypno', 'io.read_data'):
+        package, mod = name.split('.')
+        exported = importlib.import_module('visbrain.' + package).__all__
+        sub = importlib.import_module('visbrain.' + name)
+        assert set(sub.__all__) <= set(exported), name
+    # The batch function is exported under another name than its module :
+    from visbrain.io import run_sleep_batch
+    from visbrain.io.sleep_batch import sleep_batch
+    assert run_sleep_batch is sleep_batch
@@ -1,15 +1,43 @@
-from .cameras import *
-from .color import *
-from .filtering import *
-from .gui import *
-from .guitools import *
-from .logging import *
-from .memory import *
-from .mesh import *
-from .others import *
-from .physio import *
-from .picture import (piccrop, picresize)
-from .sigproc import *
-from .sleep import *
-from .transform import *
-from .wrappers import *
+"""Visbrain utility functions.
+
+Submodules are only imported when one of their functions is used (see
+visbrain._lazy), so that headless signal processing does not import PyQt5,
+VisPy or matplotlib.
+"""
+from .._lazy import lazy_package
+
+__getattr__, __dir__, __all__ = lazy_package(__name__, attributes={
+    'cameras': ['FixedCam', 'ScrollCamera', 'rotate_turntable',
+                'optimal_scale_factor', 'merge_cameras'],
+    'color': ['Colormap', 'color2vb', 'array2colormap', 'cmap_to_glsl',
+              'dynamic_color', 'color2faces', 'type_coloring', 'mpl_cmap',
+              'color2tuple', 'mpl_cmap_index', 'vector_to_opacity'],
+    'filtering': ['filt', 'resample', 'resample_window', 'morlet',
+                  'ndmorlet', 'morlet_bank', 'morlet_power', 'welch_power',
+                  'PrepareData'],
+    'gui': ['Ui_Screenshot', 'ShortcutPopup', 'ScreenshotPopup', 'HelpMenu'],
+    'guitools': ['slider2opacity', 'textline2color', 'color2json',
+                 'ndsubplot', 'combo', 'is_color', 'MouseEventControl',
+                 'disconnect_all', 'extend_combo_list',
+                 'get_combo_list_index', 'safely_set_cbox', 'safely_set_spin',
+                 'safely_set_slider', 'toggle_enable_tab', 'get_screen_size',
+                 'set_widget_size', 'fill_pyqt_table', 'RenderScheduler'],
+    'logging': ['set_log_level'],
+    'memory': ['id', 'arrays_share_data', 'code_timer'],
+    'mesh': ['vispy_array', 'convert_meshdata', 'volume_to_mesh',
+             'smoothing_matrix', 'mesh_edges', 'SmoothingCache',
+             'laplacian_smoothing'],
+    'others': ['Profiler', 'get_dsf', 'set_if_not_none', 'spawn_executor'],
+    'physio': ['find_non_eeg', 'rereferencing', 'bipolarization',
+               'commonaverage', 'tal2mni', 'mni2tal', 'generate_eeg'],
+    'picture': ['piccrop', 'picresize'],
+    'sigproc': ['normalize', 'derivative', 'tkeo', 'zerocrossing',
+                'power_of_ten', 'averaging', 'normalization', 'smoothing',
+                'smooth_3d'],
+    'sleep': ['kcdetect', 'spindlesdetect', 'remdetect', 'slowwavedetect',
+              'mtdetect', 'peakdetect', 'RLEHypnogram', 'transient',
+              'sleepstats', 'hypno_lut', 'hypno_lookup'],
+    'transform': ['vprescale', 'vprecenter', 'vpnormalize', 'array_to_stt',
+                  'stt_to_array'],
+    'wrappers': ['wrap_properties'],
+})
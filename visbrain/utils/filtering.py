@@ -1,16 +1,40 @@
 """Set of tools to filter data."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import numpy as np
-from scipy.signal import butter, filtfilt, lfilter, bessel, welch, detrend
+from scipy.signal import (butter, filtfilt, lfilter, bessel, welch, detrend,
+                          resample_poly)
+from scipy import fft as sp_fft
 
-__all__ = ('filt', 'morlet', 'ndmorlet', 'morlet_power', 'welch_power',
-           'PrepareData')
+__all__ = ('filt', 'resample', 'resample_window', 'morlet', 'ndmorlet',
+           'morlet_bank', 'morlet_power', 'welch_power', 'PrepareData')
 
 #############################################################################
 # FILTERING
 #############################################################################
 
 
+@lru_cache(maxsize=32)
+def _filt_coefs(sf, f, btype, order, method):
+    """Get filter coefficients (see filt)."""
+    # Normalize frequency vector according to btype :
+    if btype in ['bandpass', 'bandstop']:
+        fnorm = np.divide(f, .5 * sf)
+    elif btype == 'lowpass':
+        fnorm = np.array(f[-1] / (.5 * sf))
+    elif btype == 'highpass':
+        fnorm = np.array(f[0] / (.5 * sf))
+
+    # Get filter coefficients :
+    if method == 'butterworth':
+        b, a = butter(order, fnorm, btype=btype)
+    elif method == 'bessel':
+        b, a = bessel(order, fnorm, btype=btype)
+    return b, a
+
+
 def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
          way='filtfilt', axis=0):
     """Filt data.
@@ -41,19 +65,9 @@ def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
     xfilt : array_like
         Filtered data.
     """
-    # Normalize frequency vector according to btype :
-    if btype in ['bandpass', 'bandstop']:
-        fnorm = np.divide(f, .5 * sf)
-    elif btype == 'lowpass':
-        fnorm = np.array(f[-1] / (.5 * sf))
-    elif btype == 'highpass':
-        fnorm = np.array(f[0] / (.5 * sf))
-
-    # Get filter coefficients :
-    if method == 'butterworth':
-        b, a = butter(order, fnorm, btype=btype)
-    elif method == 'bessel':
-        b, a = bessel(order, fnorm, btype=btype)
+    # Get filter coefficients (cached) :
+    b, a = _filt_coefs(float(sf), tuple(np.ravel(f).astype(float)), btype,
+                       int(order), method)
 
     # Apply filter :
     if way == 'filtfilt':
@@ -61,6 +75,116 @@ def filt(sf, f, x, btype='bandpass', order=3, method='butterworth',
     elif way == 'lfilter':
         return lfilter(b, a, x, axis=axis)
 
+#############################################################################
+# RESAMPLING
+#############################################################################
+
+
+def _resample_pad(up, down):
+    """Number of input samples to pad on each side of a window.
+
+    The number of samples is a multiple of down, such as padded windows stay
+    aligned with the polyphase grid of the whole signal.
+    """
+    half_len = 10 * max(up, down)  # default half-length used by scipy
+    n_pad = int(np.ceil(half_len / up)) + 1
+    return int(np.ceil(n_pad / down)) * down
+
+
+def _n_jobs(n_jobs):
+    """Get the number of jobs (-1 for all cpus)."""
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    return max(int(n_jobs), 1)
+
+
+def resample_window(read, n_in, up, down, start, stop, window=('kaiser', 5.)):
+    """Anti-aliased polyphase resampling of a window of a signal.
+
+    The signal is never fully loaded : only the window, padded to account for
+    the length of the low-pass filter, is read. Results are identical to
+    those obtained by resampling the whole signal.
+
+    Parameters
+    ----------
+    read : callable
+        Function read(i_start, i_stop) returning the input samples
+        [i_start, i_stop) (time on the last axis).
+    n_in : int
+        Total number of input time points.
+    up, down : int
+        Up-sampling and down-sampling factors.
+    start, stop : int
+        First and last (excluded) resampled time points to return.
+    window : string, tuple | ('kaiser', 5.)
+        Window used to design the low-pass filter (see
+        scipy.signal.resample_poly).
+
+    Returns
+    -------
+    y : array_like
+        The resampled window with stop - start time points.
+    """
+    if up == down:
+        return read(start, stop)
+    pad = _resample_pad(up, down)
+    # Align the start of the window on the polyphase grid :
+    o_start = start - start % up
+    i_start = max(o_start * down // up - pad, 0)
+    i_stop = min(int(np.ceil(stop * down / up)) + pad, n_in)
+    y = resample_poly(read(i_start, i_stop), up, down, axis=-1,
+                      window=window)
+    o_start = i_start * up // down
+    return y[..., start - o_start:stop - o_start]
+
+
+def resample(x, up, down, n_jobs=1, chunk_size=2 ** 20, dtype=np.float32):
+    """Chunked multi-channel polyphase resampling with anti-aliasing.
+
+    Parameters
+    ----------
+    x : array_like
+        Array of data of shape (n_channels, n_times) or (n_times,).
+    up, down : int
+        Up-sampling and down-sampling factors (e.g up=1 and down=dsf to
+        decimate by an integer factor).
+    n_jobs : int | 1
+        Number of threads used to resample blocks of channels. Use -1 to use
+        all the cpus.
+    chunk_size : int | 2 ** 20
+        Number of resampled time points computed at once.
+    dtype : type | np.float32
+        Data type of the resampled array.
+
+    Returns
+    -------
+    y : array_like
+        Resampled data of shape (n_channels, ceil(n_times * up / down)).
+    """
+    if x.ndim == 1:
+        return resample(x[np.newaxis, :], up, down, n_jobs, chunk_size,
+                        dtype)[0, :]
+    n_chan, n_in = x.shape
+    n_out = int(np.ceil(n_in * up / down))
+    y = np.empty((n_chan, n_out), dtype=dtype)
+    # Chunks aligned on the polyphase grid :
+    chunk_size = max(chunk_size - chunk_size % up, up)
+
+    def _resample_block(chan):
+        read = lambda i_s, i_e: x[chan, i_s:i_e]  # noqa
+        for k in range(0, n_out, chunk_size):
+            k_end = min(k + chunk_size, n_out)
+            y[chan, k:k_end] = resample_window(read, n_in, up, down, k, k_end)
+
+    blocks = np.array_split(np.arange(n_chan), min(_n_jobs(n_jobs), n_chan))
+    blocks = [slice(b[0], b[-1] + 1) for b in blocks if len(b)]
+    if len(blocks) == 1:
+        _resample_block(blocks[0])
+    else:
+        with ThreadPoolExecutor(len(blocks)) as executor:
+            list(executor.map(_resample_block, blocks))
+    return y
+
 #############################################################################
 # WAVELET
 #############################################################################
@@ -94,6 +218,99 @@ def _morlet_wlt(sf, f, width=7.0):
     return wlt
 
 
+@lru_cache(maxsize=32)
+def _morlet_spectra(sf, freqs, width, n_fft, dtype):
+    """Get the spectra of a bank of Morlet's wavelets (cached, read-only).
+
+    Each wavelet is circularly shifted so that the output of the circular
+    convolution is aligned on the output of np.convolve (see morlet).
+    """
+    wlt = np.zeros((len(freqs), n_fft), dtype=dtype)
+    for num, f in enumerate(freqs):
+        m = _morlet_wlt(sf, f, width)
+        # Index of the "center" of the wavelet (see morlet) :
+        c = int(np.ceil(len(m) / 2)) - 1
+        wlt[num, 0:len(m) - c] = m[c:]
+        wlt[num, n_fft - c:] = m[:c]
+    wlt = sp_fft.fft(wlt, axis=-1)
+    wlt.flags.writeable = False
+    return wlt
+
+
+@lru_cache(maxsize=32)
+def _morlet_pads(sf, freqs, width):
+    """Get the number of past / future samples needed by the wavelets."""
+    lengths = [len(_morlet_wlt(sf, f, width)) for f in freqs]
+    pad_r = max([int(np.ceil(m / 2)) - 1 for m in lengths])
+    pad_l = max([m - 1 - (int(np.ceil(m / 2)) - 1) for m in lengths])
+    return pad_l, pad_r
+
+
+def morlet_bank(x, sf, freqs, width=7.0, get=None, axis=-1,
+                dtype=np.float64, chunk_size=None):
+    """Batched decomposition of signals using a bank of Morlet's wavelets.
+
+    The FFT of the signal is computed once (at an optimal padded length) and
+    multiplied by the spectra of all of the wavelets. The result is the same
+    as the one of the morlet function, for each frequency.
+
+    Parameters
+    ----------
+    x : array_like
+        The signals to decompose. The time dimension is located at axis.
+    sf : float
+        Sampling frequency
+    freqs : array_like
+        Central frequencies of the wavelets, of shape (n_freqs,).
+    width : float | 7.0
+        Width of the wavelets
+    get : {None, 'amplitude', 'phase', 'power'}
+        Specify if the amplitude, phase or power of the filtered signals have
+        to be returned or the complex decomposition.
+    axis : int | -1
+        Specify the axis where is located the time dimension.
+    dtype : {np.float32, np.float64}
+        Precision of the computations (complex64 or complex128) and type of
+        returned amplitude, phase and power.
+    chunk_size : int | None
+        Number of time points computed at once (overlap-save). If None, the
+        whole signals are decomposed at once.
+
+    Returns
+    -------
+    xout : array_like
+        Decomposition of x of shape (n_freqs,) + x.shape.
+    """
+    freqs = tuple(np.atleast_1d(np.asarray(freqs, dtype=float)))
+    sf, width = float(sf), float(width)
+    cdtype = np.result_type(dtype, np.complex64)
+    x = np.moveaxis(np.asarray(x), axis, -1)
+    n_pts = x.shape[-1]
+    get_fcn = {None: None, 'amplitude': np.abs, 'phase': np.angle,
+               'power': lambda y: np.square(np.abs(y))}[get]
+    out_dtype = cdtype if get is None else dtype
+    xout = np.empty((len(freqs),) + x.shape, dtype=out_dtype)
+    # Overlap-save parameters :
+    pad_l, pad_r = _morlet_pads(sf, freqs, width)
+    chunk_size = n_pts if chunk_size is None else int(chunk_size)
+    chunk_size = max(min(chunk_size, n_pts), 1)
+    n_fft = sp_fft.next_fast_len(chunk_size + pad_l + pad_r)
+    wlt = _morlet_spectra(sf, freqs, width, n_fft, cdtype)
+    wlt = wlt.reshape((len(freqs),) + (1,) * (x.ndim - 1) + (n_fft,))
+    for start in range(0, n_pts, chunk_size):
+        stop = min(start + chunk_size, n_pts)
+        # Get the chunk (with past and future samples) :
+        i_start, i_stop = max(start - pad_l, 0), min(stop + pad_r, n_pts)
+        x_chunk = np.zeros(x.shape[:-1] + (n_fft,), dtype=cdtype)
+        offset = pad_l - (start - i_start)
+        x_chunk[..., offset:offset + i_stop - i_start] = x[..., i_start:i_stop]
+        # Filter with every wavelets at once :
+        y = sp_fft.ifft(sp_fft.fft(x_chunk, axis=-1) * wlt, axis=-1,
+                        overwrite_x=True)[..., pad_l:pad_l + stop - start]
+        xout[..., start:stop] = y if get_fcn is None else get_fcn(y)
+    return np.moveaxis(xout, -1, axis if axis < 0 else axis + 1)
+
+
 def morlet(x, sf, f, width=7.0):
     """Complex decomposition of a signal x using the morlet wavelet.
 
@@ -114,17 +331,10 @@ def morlet(x, sf, f, width=7.0):
     xout: array_like
         The complex decomposition of the signal x.
     """
-    # Get the wavelet :
-    m = _morlet_wlt(sf, f, width)
-
-    # Compute morlet :
-    y = np.convolve(x, m)
-    xout = y[int(np.ceil(len(m) / 2)) - 1:int(len(y) - np.floor(len(m) / 2))]
+    return morlet_bank(x, sf, [f], width=width, chunk_size=2 ** 20)[0]
 
-    return xout
 
-
-def ndmorlet(x, sf, f, axis=0, get=None, width=7.0):
+def ndmorlet(x, sf, f, axis=0, get=None, width=7.0, dtype=np.float64):
     """Complex decomposition using Morlet's wlt for a multi-dimentional array.
 
     Parameters
@@ -142,30 +352,17 @@ def ndmorlet(x, sf, f, axis=0, get=None, width=7.0):
         be returned or only the filtered signal.
     width : float | 7.0
         Width of the wavelet
+    dtype : {np.float32, np.float64}
+        Precision of the computations.
 
     Returns
     -------
         xout: array, same shape as x
             Complex decomposition of x.
     """
-    # Get the wavelet :
-    m = _morlet_wlt(sf, f, width)
-
-    # Define a morlet function :
-    def morlet_fcn(xt):
-        # Compute morlet :
-        y = np.convolve(xt, m)
-        return y[int(np.ceil(len(m) / 2)) - 1:int(len(y) - np.floor(
-            len(m) / 2))]
-
-    xf = np.apply_along_axis(morlet_fcn, axis, x)
-    # Get amplitude / power / phase :
-    if get == 'amplitude':
-        return np.abs(xf)
-    elif get == 'power':
-        return np.square(np.abs(xf))
-    elif get == 'phase':
-        return np.angle(xf)
+    # All of the vectors are decomposed at once :
+    return morlet_bank(x, sf, [f], width=width, get=get, axis=axis,
+                       dtype=dtype, chunk_size=2 ** 20)[0]
 
 
 def morlet_power(x, freqs, sf, norm=True):
@@ -192,12 +389,8 @@ def morlet_power(x, freqs, sf, norm=True):
     """
     # Build frequency vector :
     f = np.c_[freqs[0:-1], freqs[1::]].mean(1)
-    # Get wavelet transform :
-    xpow = np.zeros((len(f), len(x)), dtype=np.float64)
-    for num, k in enumerate(f):
-        xpow[num, :] = np.abs(morlet(x, sf, k))
-    # Compute inplace power :
-    np.power(xpow, 2, out=xpow)
+    # Get wavelet transform (all frequencies at once) :
+    xpow = morlet_bank(x, sf, f, get='power', chunk_size=2 ** 20)
     # Normalize by the band sum :
     if norm:
         sum_pow = xpow.sum(0).reshape(1, -1)
@@ -286,29 +479,66 @@ class PrepareData(object):
         """Return if data have to be prepared."""
         return any([self.demean, self.detrend, self.filt])
 
+    def get_settings(self):
+        """Get the preparation settings.
+
+        Returns
+        -------
+        settings : tuple
+            Tuple of (name, value) settings (hashable).
+        """
+        names = ('axis', 'demean', 'detrend', 'filt', 'fstart', 'fend',
+                 'forder', 'way', 'filt_meth', 'btype', 'dispas')
+        return tuple([(k, getattr(self, k)) for k in names])
+
+    def copy(self):
+        """Get an independent PrepareData object with the same settings.
+
+        Prepared data are written into a buffer owned by each object. Use a
+        copy to prepare data from another thread.
+        """
+        return PrepareData(**dict(self.get_settings()))
+
+    def _get_prep_buffer(self, shape):
+        """Get the preallocated float32 buffer of prepared data."""
+        buf = getattr(self, '_prep_buffer', None)
+        if (buf is None) or (buf.shape != shape):
+            buf = self._prep_buffer = np.empty(shape, dtype=np.float32)
+        return buf
+
     def _prepare_data(self, sf, data, time):
-        """Prepare data before plotting."""
+        """Prepare data before plotting.
+
+        Data are not modified. Prepared data are written into a float32
+        buffer, reused across calls with the same shape. All of the channels
+        are processed at once.
+        """
+        out = self._get_prep_buffer(data.shape)
+        np.copyto(out, data, casting='unsafe')
         # ============= DEMEAN =============
         if self.demean:
-            mean = np.mean(data, axis=self.axis, keepdims=True)
-            np.subtract(data, mean, out=data)
+            out -= np.mean(out, axis=self.axis, keepdims=True)
 
         # ============= DETREND =============
         if self.detrend:
-            data = detrend(data, axis=self.axis)
+            out[...] = detrend(out, axis=self.axis, overwrite_data=True)
 
         # ============= FILTERING =============
         if self.filt:
             if self.dispas == 'filter':
-                data = filt(sf, np.array([self.fstart, self.fend]), data,
-                            btype=self.btype, order=self.forder, way=self.way,
-                            method=self.filt_meth, axis=self.axis)
+                out[...] = filt(sf, np.array([self.fstart, self.fend]), out,
+                                btype=self.btype, order=self.forder,
+                                way=self.way, method=self.filt_meth,
+                                axis=self.axis)
             else:
-                # Compute ndwavelet :
+                # Compute ndwavelet (real part of the complex decomposition if
+                # dispas is None) :
                 f = np.array([self.fstart, self.fend]).mean()
-                data = ndmorlet(data, sf, f, axis=self.axis, get=self.dispas)
+                out[...] = np.real(ndmorlet(out, sf, f, axis=self.axis,
+                                            get=self.dispas,
+                                            dtype=np.float32))
 
-        return data
+        return out
 
     def update(self):
         """Update object."""
@@ -1,4 +1,6 @@
 """Usefull functions for graphical interface managment."""
+import time
+import logging
 
 from PyQt5 import QtCore
 
@@ -11,7 +13,9 @@ __all__ = ('slider2opacity', 'textline2color', 'color2json',
            'disconnect_all', 'extend_combo_list', 'get_combo_list_index',
            'safely_set_cbox', 'safely_set_spin', 'safely_set_slider',
            'toggle_enable_tab', 'get_screen_size', 'set_widget_size',
-           'fill_pyqt_table')
+           'fill_pyqt_table', 'RenderScheduler')
+
+logger = logging.getLogger('visbrain')
 
 
 def slider2opacity(value, thmin=0.0, thmax=100.0, vmin=-5.0, vmax=105.0,
@@ -230,6 +234,101 @@ class MouseEventControl(object):
             return False
 
 
+class RenderScheduler(object):
+    """Coalescing and frame-rate capped scheduler of redraws.
+
+    Requests are not executed immediately but at the next frame. Requests
+    received in the meantime (e.g while dragging a slider or holding a key)
+    are merged into the latest one, so that superseded redraws are dropped.
+
+    Parameters
+    ----------
+    fcn : callable
+        The redraw function.
+    fps : float | 60.
+        Maximum number of redraws per second.
+    """
+
+    def __init__(self, fcn, fps=60.):
+        """Init."""
+        assert hasattr(fcn, '__call__')
+        self._fcn = fcn
+        self.fps = fps
+        self._pending = None  # (args, kwargs) of the latest request
+        self._t_request = None  # time of the oldest merged request
+        self._t_frame = 0.  # time of the last redraw
+        self._timer = QtCore.QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.frames, self.dropped = 0, 0
+        self.latency, self._sum_latency = 0., 0.
+
+    def __repr__(self):
+        """Representation."""
+        return ("RenderScheduler(frames=%i, dropped=%i, latency=%.1fms, "
+                "mean_latency=%.1fms)" % (self.frames, self.dropped,
+                                          1000. * self.latency,
+                                          1000. * self.mean_latency))
+
+    @property
+    def mean_latency(self):
+        """Get the mean time between a request and its redraw (in s)."""
+        return self._sum_latency / max(self.frames, 1)
+
+    @property
+    def stats(self):
+        """Get a dictionary of redraw statistics (latencies in seconds)."""
+        return dict(frames=self.frames, dropped=self.dropped,
+                    latency=self.latency, mean_latency=self.mean_latency)
+
+    @property
+    def is_pending(self):
+        """Get if a redraw is pending."""
+        return self._pending is not None
+
+    def request(self, *args, **kwargs):
+        """Request a redraw.
+
+        Parameters
+        ----------
+        args, kwargs : tuple, dict
+            Arguments passed to the redraw function. Only those of the latest
+            request are used.
+        """
+        if self._pending is not None:
+            self.dropped += 1
+        else:
+            self._t_request = time.perf_counter()
+            # Wait for the next frame :
+            elapsed = self._t_request - self._t_frame
+            delay = max(1. / self.fps - elapsed, 0.)
+            self._timer.start(int(1000. * delay))
+        self._pending = (args, kwargs)
+
+    def trigger(self, *args):
+        """Request a redraw, ignoring the values emitted by Qt signals."""
+        self.request()
+
+    def flush(self):
+        """Execute the pending redraw now."""
+        self._timer.stop()
+        if self._pending is None:
+            return
+        (args, kwargs), self._pending = self._pending, None
+        self._t_frame = time.perf_counter()
+        self._fcn(*args, **kwargs)
+        # Latency between the oldest merged request and the end of redraw :
+        self.latency = time.perf_counter() - self._t_request
+        self._sum_latency += self.latency
+        self.frames += 1
+        logger.debug(repr(self))
+
+    def cancel(self):
+        """Cancel the pending redraw."""
+        self._timer.stop()
+        self._pending = None
+
+
 def disconnect_all(obj):
     """Disconnect all functions related to an PyQt object.
 
@@ -1,17 +1,17 @@
 """Surfaces (mesh) and volume utility functions."""
 import logging
+import os
+import hashlib
+from collections import OrderedDict
 
 import numpy as np
-from scipy.spatial.distance import cdist
-
-from vispy.geometry import MeshData
-from vispy.geometry.isosurface import isosurface
 
 from .sigproc import smooth_3d
 
 
 __all__ = ('vispy_array', 'convert_meshdata', 'volume_to_mesh',
-           'smoothing_matrix', 'mesh_edges', 'laplacian_smoothing')
+           'smoothing_matrix', 'mesh_edges', 'SmoothingCache',
+           'laplacian_smoothing')
 
 
 logger = logging.getLogger('visbrain')
@@ -80,6 +80,7 @@ def convert_meshdata(vertices=None, faces=None, normals=None, meshdata=None,
             faces -= faces.min()
         # Get normals if None :
         if (normals is None) or (normals.ndim != 2):
+            from vispy.geometry import MeshData
             md = MeshData(vertices=vertices, faces=faces)
             normals = md.get_vertex_normals()
             logger.debug('Indexed faces normals converted // extracted')
@@ -133,6 +134,7 @@ def volume_to_mesh(vol, smooth_factor=3, level=None, **kwargs):
     elif isinstance(level, int):
         vol_s[vol_s != level] = 0
         level = .5
+    from vispy.geometry.isosurface import isosurface
     vert_n, faces_n = isosurface(vol_s, level=level)
     # Smoothing compensation :
     vert_n = tf.map(vert_n)[:, 0:-1]
@@ -230,9 +232,146 @@ def mesh_edges(faces):
     return edges
 
 
-def laplacian_smoothing(vertices, faces, n_neighbors=-1):
+def _array_hash(x):
+    """Get the hash of an array."""
+    x = np.ascontiguousarray(x)
+    sha = hashlib.sha1(str((x.dtype.str, x.shape)).encode())
+    sha.update(x.data)
+    return sha.hexdigest()
+
+
+class SmoothingCache(object):
+    """Cache of the smoothing matrices of a mesh.
+
+    The adjacency matrix is computed once per mesh, and smoothing matrices
+    are cached by (vertices, smoothing_steps). Least recently used smoothing
+    matrices are removed first. Smoothing matrices can also be saved to a
+    folder (e.g for standard brain templates) so that they are only computed
+    once across sessions.
+
+    Parameters
+    ----------
+    max_entries : int | 8
+        Maximum number of smoothing matrices kept in memory.
+    folder : string | None
+        Folder where smoothing matrices are saved. If None, matrices are only
+        kept in memory.
+    """
+
+    def __init__(self, max_entries=8, folder=None):
+        """Init."""
+        self.max_entries = max(int(max_entries), 1)
+        self.folder = folder
+        self._faces = None  # (faces, hash, adjacency matrix)
+        self._entries = OrderedDict()  # (hash, steps) -> smoothing matrix
+
+    def __len__(self):
+        """Get the number of cached smoothing matrices."""
+        return len(self._entries)
+
+    def edges(self, faces):
+        """Get the adjacency matrix of a mesh.
+
+        Parameters
+        ----------
+        faces : array_like
+            The mesh faces of shape (n_faces, 3).
+
+        Returns
+        -------
+        edges : sparse matrix
+            The adjacency matrix.
+        """
+        if (self._faces is None) or (self._faces[0] is not faces):
+            # Smoothing matrices of a previous mesh can't be used :
+            self._entries.clear()
+            self._faces = (faces, _array_hash(faces), mesh_edges(faces))
+        return self._faces[2]
+
+    def get(self, faces, vertices, smoothing_steps=20):
+        """Get a smoothing matrix.
+
+        Parameters
+        ----------
+        faces : array_like
+            The mesh faces of shape (n_faces, 3).
+        vertices : array_like
+            Vertex indices of shape (N,)
+        smoothing_steps : int | 20
+            Number of smoothing steps (see smoothing_matrix).
+
+        Returns
+        -------
+        smooth_mat : sparse matrix
+            CSR smoothing matrix of shape (n_vertices, len(vertices)).
+        """
+        from scipy import sparse
+        edges = self.edges(faces)
+        vertices = np.asarray(vertices, dtype=np.int64)
+        key = (_array_hash(vertices), smoothing_steps)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        file = None
+        if isinstance(self.folder, str):
+            file = os.path.join(self.folder, 'smoothing_%s_%s_%s.npz' % (
+                self._faces[1][:16], key[0][:16], str(smoothing_steps)))
+        if (file is not None) and os.path.isfile(file):
+            logger.debug("    Load smoothing matrix from %s" % file)
+            smooth_mat = sparse.load_npz(file).tocsr()
+        else:
+            smooth_mat = smoothing_matrix(vertices, edges,
+                                          smoothing_steps).tocsr()
+            if file is not None:
+                os.makedirs(self.folder, exist_ok=True)
+                sparse.save_npz(file, smooth_mat)
+        self._entries[key] = smooth_mat
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return smooth_mat
+
+    def clear(self):
+        """Clear the cache (saved matrices are kept)."""
+        self._faces = None
+        self._entries.clear()
+
+
+def _laplacian_operator(vertices, adj, n_neighbors=-1):
+    """Get the sparse operator averaging the neighbors of each vertex."""
+    from scipy import sparse
+    n_vertices = adj.shape[0]
+    row = np.repeat(np.arange(n_vertices), np.diff(adj.indptr))
+    col = adj.indices
+    if n_neighbors != -1:
+        # Keep the n closest neighbors of each vertex (sparse top-k). Sorts
+        # are stable so that ties are sorted by vertex index :
+        dist = np.linalg.norm(vertices[row, :] - vertices[col, :], axis=1)
+        degree = np.diff(adj.indptr)
+        max_degree = degree.max() if len(degree) else 0
+        if max_degree <= 64:  # sort a (n_vertices, max_degree) array
+            pos = np.arange(len(row)) - adj.indptr[row]
+            pad = np.full((n_vertices, max_degree), np.inf)
+            pad[row, pos] = dist
+            srt = np.argsort(pad, axis=1, kind='stable')[:, 0:n_neighbors]
+            keep = (adj.indptr[:-1, np.newaxis] + srt)[
+                srt < degree[:, np.newaxis]]
+        else:
+            order = np.lexsort((dist, row))
+            rank = np.arange(len(order)) - adj.indptr[row[order]]
+            keep = order[rank < n_neighbors]
+        row, col = row[keep], col[keep]
+    count = np.bincount(row, minlength=n_vertices)
+    weights = 1. / count[row]
+    return sparse.csr_matrix((weights, (row, col)),
+                             shape=(n_vertices, n_vertices)), count > 0
+
+
+def laplacian_smoothing(vertices, faces, n_neighbors=-1, n_iter=1,
+                        inplace=False):
     """Apply a laplacian smoothing to vertices.
 
+    Each vertex is replaced by the mean of the vertices connected to it.
+
     Parameters
     ----------
     vertices : array_like
@@ -242,29 +381,35 @@ def laplacian_smoothing(vertices, faces, n_neighbors=-1):
     n_neighbors : int | -1
         Specify maximum number of closest neighbors to take into account in the
         mean.
+    n_iter : int | 1
+        Number of smoothing iterations.
+    inplace : bool | False
+        Smooth vertices inplace.
 
     Returns
     -------
     new_vertices : array_like
-        New smoothed vertices.
+        New smoothed vertices (float32, unless vertices are smoothed inplace).
+        Vertices without any neighbor are not moved.
     """
     assert vertices.ndim == 2 and vertices.shape[1] == 3
     assert faces.ndim == 2 and faces.shape[1] == 3
     assert n_neighbors >= -1 and isinstance(n_neighbors, int)
+    assert isinstance(n_iter, int) and n_iter >= 0
     n_vertices = vertices.shape[0]
-    new_vertices = np.zeros_like(vertices)
-    for k in range(n_vertices):
-        # Find connected vertices :
-        faces_idx = np.where(faces == k)[0]
-        u_faces_idx = np.unique(np.ravel(faces[faces_idx, :])).tolist()
-        u_faces_idx.remove(k)
-        # Select closest connected vertices :
-        if n_neighbors == -1:
-            to_smooth = u_faces_idx
-        else:
-            norms = cdist(vertices[[k], :], vertices[u_faces_idx, :]).ravel()
-            n_norm = min(n_neighbors, len(norms))
-            to_smooth = np.array(u_faces_idx)[np.argsort(norms)[0:n_norm]]
-        # Take the mean of selected vertices :
-        new_vertices[k, :] = vertices[to_smooth, :].mean(0).reshape(1, -1)
+    # Adjacency matrix (without self-connections) :
+    adj = mesh_edges(faces).tocsr()
+    adj.resize((n_vertices, n_vertices))
+    adj.setdiag(0)
+    adj.eliminate_zeros()
+    adj.sort_indices()
+    new_vertices = vertices if inplace else np.empty(vertices.shape,
+                                                     dtype=np.float32)
+    v = np.asarray(vertices, dtype=float)
+    lap, is_connected = _laplacian_operator(v, adj, n_neighbors)
+    for k in range(n_iter):
+        if k and (n_neighbors != -1):  # closest neighbors have changed
+            lap, is_connected = _laplacian_operator(v, adj, n_neighbors)
+        v = np.where(is_connected[:, np.newaxis], lap.dot(v), v)
+    new_vertices[...] = v
     return new_vertices
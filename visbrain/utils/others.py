@@ -1,11 +1,14 @@
 """This script contains some other utility functions."""
+import os
+import sys
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-from vispy.util import profiler
 
 
-__all__ = ('Profiler', 'get_dsf', 'set_if_not_none')
+__all__ = ('Profiler', 'get_dsf', 'set_if_not_none', 'spawn_executor')
 
 
 class Profiler(object):
@@ -20,12 +23,14 @@ class Profiler(object):
         logger = logging.getLogger('visbrain')
         enable = logger.level == 1  # enable for PROFILER
         if enable and not hasattr(self, '_vp_profiler'):
+            from vispy.util import profiler
             self._vp_profiler = profiler.Profiler(disabled=not enable,
                                                   delayed=self._delayed)
 
     def __bool__(self):
         """Return if the profiler is enable."""
         if hasattr(self, '_vp_profiler'):
+            from vispy.util import profiler
             return not isinstance(self._vp_profiler,
                                   profiler.Profiler.DisabledProfiler)
         else:
@@ -90,3 +95,27 @@ def set_if_not_none(to_set, value, cond=True):
         The value if not None else to_set
     """
     return value if (value is not None) and cond else to_set
+
+
+def spawn_executor(n_jobs=-1):
+    """Get a pool of spawned processes.
+
+    Forking a process with running threads (e.g the GUI) can copy locks held
+    by these threads into the children. Processes are spawned instead
+    (Python >= 3.7, forked on older versions).
+
+    Parameters
+    ----------
+    n_jobs : int | -1
+        Number of processes. If -1, all of the cpus are used.
+
+    Returns
+    -------
+    pool : ProcessPoolExecutor
+        The pool of processes.
+    """
+    n_jobs = os.cpu_count() if n_jobs == -1 else max(int(n_jobs), 1)
+    kw = dict(max_workers=n_jobs)
+    if sys.version_info >= (3, 7):
+        kw['mp_context'] = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(**kw)
@@ -4,8 +4,6 @@ import logging
 import numpy as np
 from scipy.signal import fftconvolve
 
-from vispy.visuals.transforms import STTransform, NullTransform
-
 
 __all__ = ('normalize', 'derivative', 'tkeo', 'zerocrossing', 'power_of_ten',
            'averaging', 'normalization', 'smoothing', 'smooth_3d')
@@ -348,6 +346,7 @@ def smooth_3d(vol, smooth_factor=3, correct=True):
     vol_smooth : array_like
         The smooth volume with the same shape as vol.
     """
+    from vispy.visuals.transforms import STTransform, NullTransform
     tf = NullTransform()
     # No smoothing :
     if (not isinstance(smooth_factor, int)) or (smooth_factor < 3):
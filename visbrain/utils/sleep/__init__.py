@@ -1,2 +1,8 @@
-from .detection import *
-from .hypnoprocessing import *
+from ..._lazy import lazy_package
+
+__getattr__, __dir__, __all__ = lazy_package(__name__, attributes={
+    'detection': ['kcdetect', 'spindlesdetect', 'remdetect', 'slowwavedetect',
+                  'mtdetect', 'peakdetect'],
+    'hypnoprocessing': ['RLEHypnogram', 'transient', 'sleepstats',
+                        'hypno_lut', 'hypno_lookup'],
+})
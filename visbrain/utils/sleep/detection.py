@@ -12,14 +12,91 @@ Perform:
 """
 import numpy as np
 from scipy.signal import hilbert, detrend, welch
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
 
 from ..filtering import filt, morlet, morlet_power
 from ..sigproc import derivative, tkeo, smoothing, normalization
-from .event import (_events_distance_fill, _index_to_events, _events_to_index)
+from .event import (_index_to_events, _mask_to_events, _events_to_mask,
+                    _events_merge, _events_extend, _events_duration,
+                    _events_ptp)
 
 __all__ = ('kcdetect', 'spindlesdetect', 'remdetect', 'slowwavedetect',
            'mtdetect', 'peakdetect')
 
+
+###########################################################################
+# SLEEP STAGES SEGMENTS
+###########################################################################
+
+
+def _stage_segments(is_stage, n_pts, sf, pad_s=5.):
+    """Get the segments of the recording to process.
+
+    Parameters
+    ----------
+    is_stage : array_like | None
+        Boolean vector of shape (n_pts,) which is True for samples of the
+        target sleep stages. If None, the whole recording is used.
+    n_pts : int
+        Number of time points.
+    sf : float
+        Sampling frequency.
+    pad_s : float | 5.
+        Duration (s) added before and after each segment to avoid edge
+        effects of filters and wavelets.
+
+    Returns
+    -------
+    segments : array_like
+        Segments of the target stages of shape (n_segments, 2).
+    padded : array_like
+        Padded and merged segments.
+    """
+    if is_stage is None:
+        segments = np.array([[0, n_pts - 1]])
+        return segments, segments
+    segments = _mask_to_events(is_stage)
+    n_pad = int(np.ceil(pad_s * sf))
+    padded = np.c_[np.maximum(segments[:, 0] - n_pad, 0),
+                   np.minimum(segments[:, 1] + n_pad, n_pts - 1)]
+    return segments, _events_merge(padded)
+
+
+def _segments_apply(fcn, data, segments, padded):
+    """Apply transformations only on some segments of the data.
+
+    Parameters
+    ----------
+    fcn : callable
+        Function fcn(x) returning a tuple of arrays of shape (..., len(x)).
+    data : array_like
+        Data of shape (n_pts,).
+    segments, padded : array_like
+        Segments of the data and padded segments (see _stage_segments).
+
+    Returns
+    -------
+    out : tuple
+        Tuple of arrays of shape (..., n_pts). Values outside segments are
+        set to NaN.
+    """
+    n_pts = len(data)
+    if (len(segments) == 1) and (segments[0, 0] == 0) and (
+            segments[0, 1] == n_pts - 1):
+        return fcn(data)
+    out = None
+    for start, stop in padded:
+        seg_out = fcn(data[start:stop + 1])
+        if out is None:
+            out = [np.full(k.shape[:-1] + (n_pts,), np.nan) for k in seg_out]
+        for k, seg_k in zip(out, seg_out):
+            k[..., start:stop + 1] = seg_k
+    # Remove pads :
+    is_out = ~_events_to_mask(segments, n_pts)
+    for k in out:
+        k[..., is_out] = np.nan
+    return tuple(out)
+
 ###########################################################################
 # K-COMPLEX DETECTION
 ###########################################################################
@@ -85,8 +162,8 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
     freqs = np.array([0.1, 4., 8., 12., 16., 30.])
     delta_npow = morlet_power(data, freqs, sf, norm=True)[0]
     delta_nfpow = smoothing(delta_npow, smoothing_s * sf)
-    idx_no_delta = np.where(delta_nfpow < delta_thr)[0]
-    idx_loc_delta = np.where(delta_npow > np.median(delta_npow))[0]
+    is_no_delta = delta_nfpow < delta_thr
+    is_loc_delta = delta_npow > np.median(delta_npow)
 
     # MAIN DETECTION
     # Bandpass filtering
@@ -98,49 +175,33 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
     soft_thr = 0.8 * hard_thr
 
     with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(sig_tkeo > hard_thr)[0]
-        idx_soft = np.where(sig_tkeo > soft_thr)[0]
-
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
+        ev_hard = _mask_to_events(sig_tkeo > hard_thr)
+        ev_soft = _mask_to_events(sig_tkeo > soft_thr)
 
-    if idx_hard.size == 0:
+    if not len(ev_hard):
         return np.array([], dtype=int)
 
-    # Initialize K-complexes index vector
-    idx_kc = np.array([], dtype=int)
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
-    # Get where K-complex start / end :
-    idx_start, idx_stop = _events_to_index(idx_hard).T
-
+    ev_kc = _events_merge(ev_hard, min_distance_ms, sf)
     # Find true beginning / end using soft threshold
-    for s in idx_start:
-        d = s - idx_zc_soft
-        soft_beg = d[d > 0].min()
-        soft_end = np.abs(d[d < 0]).min()
-        idx_kc = np.append(idx_kc, np.arange(s - soft_beg, s + soft_end))
+    ev_kc = _events_extend(ev_kc, ev_soft)
 
     # Check if spindles are present in range_spin_sec
-    idx_spin = spindlesdetect(data, sf, spindles_thresh, hypno, False)[0]
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    spin_bool = np.array([], dtype=np.bool)
-
-    for idx, val in enumerate(idx_start):
-        step = 0.5 * range_spin_sec * sf
-        is_spin = np.in1d(np.arange(val - step, val + step, 1),
-                          idx_spin, assume_unique=True)
-        spin_bool = np.append(spin_bool, any(is_spin))
-
-    kc_spin = np.where(spin_bool)[0]
-    idx_kc_spin = _index_to_events(np.c_[idx_start, idx_stop][kc_spin])
+    ev_spin = spindlesdetect(data, sf, spindles_thresh, hypno, False)
+    ev_spin = np.asarray(ev_spin).reshape(-1, 2)
+    step = 0.5 * range_spin_sec * sf
+    # Number of spindles overlapping [start - step, start + step) :
+    n_spin = np.searchsorted(ev_spin[:, 0], ev_kc[:, 0] + step, 'left') - \
+        np.searchsorted(ev_spin[:, 1], ev_kc[:, 0] - step, 'left')
+    ev_kc_spin = ev_kc[n_spin > 0]
 
     # Compute probability
+    is_kc = _events_to_mask(ev_kc, len(data))
     proba = np.zeros(shape=data.shape)
-    proba[idx_kc] += 0.1
-    proba[idx_no_delta] += 0.1
-    proba[idx_loc_delta] += 0.1
-    proba[idx_kc_spin] += 0.1
+    proba[is_kc] += 0.1
+    proba[is_no_delta] += 0.1
+    proba[is_loc_delta] += 0.1
+    proba[_events_to_mask(ev_kc_spin, len(data))] += 0.1
 
     if hyploaded:
         proba[hypno == -1] += -0.1
@@ -154,29 +215,19 @@ def kcdetect(data, sf, proba_thr, amp_thr, hypno, nrem_only, tmin, tmax,
     proba = proba / 0.5 if hyploaded else proba / 0.4
     proba = smoothing(proba, sf)
     # Keep only proba >= proba_thr (user defined threshold)
-    idx_kc = np.intersect1d(idx_kc, np.where(proba >= proba_thr)[0], True)
+    ev_kc = _mask_to_events(is_kc & (proba >= proba_thr))
 
-    if idx_kc.size == 0:
+    if not len(ev_kc):
         return np.array([], dtype=int)
 
-    # Morphological criteria
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
-
-    # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
-    idx_kc = _index_to_events(np.c_[idx_start, idx_stop][good_dur])
+    # Morphological criteria : remove events with bad duration
+    ev_kc = _events_duration(ev_kc, sf, tmin, tmax)
 
     # Remove events with bad amplitude
-    idx_start, idx_stop = _events_to_index(idx_kc).T
-    amp = np.zeros(shape=idx_start.size)
-    for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[i] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > kc_min_amp,
-                                       amp < kc_max_amp))[0]
+    amp = _events_ptp(data, ev_kc)
+    good_amp = np.logical_and(amp > kc_min_amp, amp < kc_max_amp)
 
-    return np.c_[idx_start, idx_stop][good_amp]
+    return ev_kc[good_amp]
 
 
 ###########################################################################
@@ -225,112 +276,94 @@ def spindlesdetect(data, sf, threshold, hypno, nrem_only, fmin=12., fmax=14.,
     idx_spindles : array_like
         Indices of detected spindles of shape (n_events, 2)
     """
+    # Check "Detect only for NREM sleep" (only NREM segments are processed)
+    is_nrem = None
+    if np.unique(hypno).size > 1 and nrem_only:
+        is_nrem = np.logical_and(hypno >= 1, hypno != 4)
+    segments, padded = _stage_segments(is_nrem, len(data), sf)
+    if not len(segments):
+        return np.array([], dtype=int)
+    length = np.sum(segments[:, 1] - segments[:, 0] + 1)
+
     # Pre-detection
     if adapt_band:
-        # Find peak sigma frequency
-        f, pxx_den = welch(data, sf)
-        mfs = f[pxx_den == pxx_den[np.where((f >= 11) & (f < 16))].max()][0]
-        fmin = mfs - 1
-        fmax = mfs + 1
-
-    # Compute relative sigma power
+        # Find peak sigma frequency (on the whole signal if NREM segments are
+        # shorter than a Welch segment, i.e 256 samples) :
+        use_nrem = (is_nrem is not None) and (is_nrem.sum() >= 256)
+        f, pxx_den = welch(data[is_nrem] if use_nrem else data, sf)
+        is_sigma = (f >= 11) & (f < 16)
+        if is_sigma.any():  # otherwise, the frequency resolution is too low
+            mfs = f[is_sigma][pxx_den[is_sigma].argmax()]
+            fmin = mfs - 1
+            fmax = mfs + 1
     freqs = np.array([0.5, 4., 8., fmin, fmax])
-    sigma_npow = morlet_power(data, freqs, sf, norm=True)[-1]
-    sigma_nfpow = smoothing(sigma_npow, sf * (tmin / 1000))
-    # Vector of sigma power supra-threshold values
-    idx_sigma = np.where(sigma_nfpow > sigma_thr)[0]
-
-    # Get complex decomposition of filtered data :
-    if method == 'hilbert':
-        # Bandpass filter
-        data_filt = filt(sf, [fmin, fmax], data, order=4)
-        if data.size % 2:
-            analytic = hilbert(data_filt)
-        else:
-            analytic = hilbert(data_filt[:-1], len(data_filt))
-    elif method == 'wavelet':
-        analytic = morlet(data, sf, np.mean([fmin, fmax]))
-
-    # Get envelope
-    amplitude = np.abs(analytic)
-
-    # Check "Detect only for NREM sleep"
-    if np.unique(hypno).size > 1 and nrem_only:
-        idx_zero = np.where(np.logical_or(hypno < 1, hypno == 4))[0]
-        amplitude[idx_zero] = np.nan
-        length = max(data.shape) - idx_zero.size
-    else:
-        length = max(data.shape)
+
+    def _transform(x):
+        # Compute relative sigma power
+        sigma_npow = morlet_power(x, freqs, sf, norm=True)[-1]
+        sigma_nfpow = smoothing(sigma_npow, sf * (tmin / 1000))
+        # Get complex decomposition of filtered data :
+        if method == 'hilbert':
+            # Bandpass filter
+            x_filt = filt(sf, [fmin, fmax], x, order=4)
+            if x.size % 2:
+                analytic = hilbert(x_filt)
+            else:
+                analytic = hilbert(x_filt[:-1], len(x_filt))
+        elif method == 'wavelet':
+            analytic = morlet(x, sf, np.mean([fmin, fmax]))
+        # Get envelope
+        return sigma_nfpow, np.abs(analytic)
+
+    sigma_nfpow, amplitude = _segments_apply(_transform, data, segments,
+                                             padded)
+    # Sigma power supra-threshold values
+    with np.errstate(invalid='ignore'):
+        is_sigma = sigma_nfpow > sigma_thr
 
     # Define hard and soft thresholds
     hard_thr = np.nanmean(amplitude) + threshold * np.nanstd(amplitude)
     soft_thr = 0.5 * hard_thr
 
     with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(amplitude > hard_thr)[0]
-        idx_soft = np.where(amplitude > soft_thr)[0]
-
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
-
-    if idx_hard.size > 0:
-        # Initialize spindles vector
-        idx_spindles = np.array([], dtype=int)
-
         # Keep only period with high relative sigma power
-        idx_hard = np.intersect1d(idx_hard, idx_sigma, True)
-
-        # Fill gap between events separated by less than min_distance_ms
-        idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
+        ev_hard = _mask_to_events((amplitude > hard_thr) & is_sigma)
+        ev_soft = _mask_to_events(amplitude > soft_thr)
 
-        # Get where spindles start / end :
-        idx_start, idx_stop = _events_to_index(idx_hard).T
-
-        # Find true beginning / end using soft threshold
-        for s in idx_start:
-            d = s - idx_zc_soft
-            # Find distance to nearest soft threshold crossing before start
-            soft_beg = d[d > 0].min()
-            # Find distance to nearest soft threshold crossing after end
-            soft_end = np.abs(d[d < 0]).min()
-            idx_spindles = np.append(idx_spindles, np.arange(
-                                     s - soft_beg, s + soft_end))
+    if not len(ev_hard):
+        return np.array([], dtype=int)
 
-        # Fill gap between events separated by less than min_distance_ms
-        idx_spindles = _events_distance_fill(idx_spindles, min_distance_ms, sf)
+    # Fill gap between events separated by less than min_distance_ms
+    ev_spindles = _events_merge(ev_hard, min_distance_ms, sf)
+    # Find true beginning / end using soft threshold
+    ev_spindles = _events_extend(ev_spindles, ev_soft)
+    # Fill gap between events separated by less than min_distance_ms
+    ev_spindles = _events_merge(ev_spindles, min_distance_ms, sf)
+    # Remove events with bad duration
+    ev_good = _events_duration(ev_spindles, sf, tmin, tmax)
 
-        # Get duration
-        idx_start, idx_stop = _events_to_index(idx_spindles).T
+    if return_full:
+        # Compute number, duration, density
+        idx_start, idx_stop = ev_good.T
+        number = idx_start.size
         duration_ms = (idx_stop - idx_start) * (1000 / sf)
-
-        # Remove events with bad duration
-        good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                           duration_ms < tmax))[0]
-
-        if idx_spindles.size == 0:
-            return np.array([], dtype=int)
-
-        if return_full:
-            # Compute number, duration, density
-            idx_start, idx_stop = np.c_[idx_start, idx_stop][good_dur].T
-            number = idx_start.size
-            duration_ms = (idx_stop - idx_start) * (1000 / sf)
-            density = number / (length / sf / 60.)
-
-            # Compute mean power of each spindles
-            pwrs = np.zeros(shape=number)
-            for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-                ind_pwr = morlet_power(data[start:stop], [fmin, fmax], sf,
-                                       norm=False)[0]
-                pwrs[i] = np.mean(ind_pwr)
-            # Normalize by dividing by the mean
-            normalization(pwrs, norm=2)
-
-            return (idx_spindles, number, density, duration_ms, pwrs,
-                    idx_start, idx_stop, hard_thr, soft_thr, idx_sigma,
-                    fmin, fmax, sigma_nfpow, amplitude, sigma_thr)
-        else:
-            return np.c_[idx_start, idx_stop][good_dur]
+        density = number / (length / sf / 60.)
+
+        # Compute mean power of each spindles
+        pwrs = np.zeros(shape=number)
+        for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
+            ind_pwr = morlet_power(data[start:stop], [fmin, fmax], sf,
+                                   norm=False)[0]
+            pwrs[i] = np.mean(ind_pwr)
+        # Normalize by dividing by the mean
+        normalization(pwrs, norm=2)
+
+        return (_index_to_events(ev_spindles), number, density, duration_ms,
+                pwrs, idx_start, idx_stop, hard_thr, soft_thr,
+                np.flatnonzero(is_sigma), fmin, fmax, sigma_nfpow, amplitude,
+                sigma_thr)
+    else:
+        return ev_good
 
 
 ###########################################################################
@@ -376,69 +409,47 @@ def remdetect(data, sf, hypno, rem_only, threshold, tmin=300, tmax=800,
     idx_rem: array_like
         Indices of detected REMs of shape (n_events, 2)
     """
-    # Compute relative beta power
+    # Only REM segments are processed :
+    is_rem = np.asarray(hypno) >= 4 if (rem_only and 4 in hypno) else None
+    segments, padded = _stage_segments(is_rem, len(data), sf)
     freqs = np.array([0.5, 4., 8., 12, 40])
-    beta_npow = morlet_power(data, freqs, sf, norm=True)[-1]
-    beta_nfpow = smoothing(beta_npow, sf * (tmin / 1000))
-    # Vector of beta power supra-threshold values
-    idx_beta = np.where(beta_nfpow < np.percentile(beta_nfpow, 60))[0]
 
-    # Compute smoothed derivative
-    sm_sig = smoothing(data, sf * (smoothing_ms / 1000))
-    deriv = derivative(sm_sig, deriv_ms, sf)
-    deriv = smoothing(deriv, sf * (smoothing_ms / 1000))
+    def _transform(x):
+        # Compute relative beta power
+        beta_npow = morlet_power(x, freqs, sf, norm=True)[-1]
+        beta_nfpow = smoothing(beta_npow, sf * (tmin / 1000))
+        # Compute smoothed derivative
+        sm_sig = smoothing(x, sf * (smoothing_ms / 1000))
+        deriv = derivative(sm_sig, deriv_ms, sf)
+        return beta_nfpow, smoothing(deriv, sf * (smoothing_ms / 1000))
 
-    if rem_only and 4 in hypno:
-        idx_zero = np.where(hypno < 4)[0]
-        deriv[idx_zero] = np.nan
+    beta_nfpow, deriv = _segments_apply(_transform, data, segments, padded)
+    # Beta power infra-threshold values
+    with np.errstate(invalid='ignore'):
+        is_beta = beta_nfpow < np.nanpercentile(beta_nfpow, 60)
 
     # Define hard and soft thresholds
     hard_thr = np.nanmean(deriv) + threshold * np.nanstd(deriv)
     soft_thr = 0.5 * hard_thr
 
     with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(deriv > hard_thr)[0]
-        idx_soft = np.where(deriv > soft_thr)[0]
-
-    # Find threshold-crossing indices of soft threshold
-    idx_zc_soft = _events_to_index(idx_soft).flatten()
+        # Keep only period with low relative beta power (i.e. remove
+        # artefact)
+        ev_hard = _mask_to_events((deriv > hard_thr) & is_beta)
+        ev_soft = _mask_to_events(deriv > soft_thr)
 
-    if idx_hard.size == 0:
+    if not len(ev_hard):
         return np.array([], dtype=int)
 
-    # Initialize rem vector
-    idx_rem = np.array([], dtype=int)
-
-    # Keep only period with low relative beta power (i.e. remove artefact)
-    idx_hard = np.intersect1d(idx_hard, idx_beta, True)
-
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
-
-    # Get where spindles start / end :
-    idx_start, idx_stop = _events_to_index(idx_hard).T
-
+    ev_rem = _events_merge(ev_hard, min_distance_ms, sf)
     # Find true beginning / end using soft threshold
-    for s in idx_start:
-        d = s - idx_zc_soft
-        # Find distance to nearest soft threshold crossing before start
-        soft_beg = d[d > 0].min()
-        # Find distance to nearest soft threshold crossing after end
-        soft_end = np.abs(d[d < 0]).min()
-        idx_rem = np.append(idx_rem, np.arange(s - soft_beg, s + soft_end))
-
+    ev_rem = _events_extend(ev_rem, ev_soft)
     # Fill gap between events separated by less than min_distance_ms
-    idx_rem = _events_distance_fill(idx_rem, min_distance_ms, sf)
-
-    # Get duration
-    idx_start, idx_stop = _events_to_index(idx_rem).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    ev_rem = _events_merge(ev_rem, min_distance_ms, sf)
 
     # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
-
-    return np.c_[idx_start, idx_stop][good_dur]
+    return _events_duration(ev_rem, sf, tmin, tmax)
 
 
 ###########################################################################
@@ -487,23 +498,12 @@ def slowwavedetect(data, sf, threshold, min_amp=70., max_amp=400., tmin=1000.,
     delta_nfpow = smoothing(delta_nfpow, smoothing_s * sf)
 
     # Normalized power criteria
-    idx_sw = np.where(delta_nfpow > threshold)[0]
-
-    if idx_sw.size == 0:
-        return np.array([], dtype=int)
-
-    # Get where slow waves start / end :
-    idx_start, idx_stop = _events_to_index(idx_sw).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    idx_sw = _mask_to_events(delta_nfpow > threshold)
 
-    # Check amplitude and duration
-    amp = np.zeros(shape=idx_start.shape)
-    for idx, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[idx] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > min_amp, amp < max_amp))[0]
-    good_dur = np.where(duration_ms > tmin)[0]
-    good_event = np.intersect1d(good_amp, good_dur, True)
-    idx_sw = np.c_[idx_start, idx_stop][good_event]
+    # Check duration and amplitude
+    idx_sw = _events_duration(idx_sw, sf, tmin)
+    amp = _events_ptp(data, idx_sw)
+    idx_sw = idx_sw[np.logical_and(amp > min_amp, amp < max_amp)]
 
     if idx_sw.size == 0:
         return np.array([], dtype=int)
@@ -559,51 +559,44 @@ def mtdetect(data, sf, threshold, hypno, rem_only, fmin=0., fmax=50.,
     idx_mt : array_like
         Indices of MTs of shape (n_events, 2)
     """
+    # Only REM segments are processed :
+    is_rem = np.asarray(hypno) >= 4 if (rem_only and 4 in hypno) else None
+    segments, padded = _stage_segments(is_rem, len(data), sf)
+
+    def _transform(x):
+        # Morlet envelope
+        analytic = morlet(x, sf, np.mean([fmin, fmax]))
+        amplitude = smoothing(np.abs(analytic), sf * (tmin / 1000))
+        # Morlet power in delta band
+        return amplitude, morlet_power(x, [0.5, 4], sf, norm=False)[0]
+
     # PRE DETECTION
-    # Morlet envelope
-    analytic = morlet(data, sf, np.mean([fmin, fmax]))
-    amplitude = np.abs(analytic)
-    amplitude = smoothing(amplitude, sf * (tmin / 1000))
-    # Morlet power in delta band
-    delta_nfpow = morlet_power(data, [0.5, 4], sf, norm=False)
-    idx_high_delta = np.where(delta_nfpow > np.percentile(delta_nfpow, 75))[0]
-
-    if rem_only and 4 in hypno:
-        idx_zero = np.where(hypno < 4)[0]
-        amplitude[idx_zero] = np.nan
+    amplitude, delta_nfpow = _segments_apply(_transform, data, segments,
+                                             padded)
+    with np.errstate(invalid='ignore'):
+        is_high_delta = delta_nfpow > np.nanpercentile(delta_nfpow, 75)
 
     # Define hard threshold
     hard_thr = np.nanmean(amplitude) + threshold * np.nanstd(amplitude)
 
     with np.errstate(divide='ignore', invalid='ignore'):
-        idx_hard = np.where(amplitude > hard_thr)[0]
+        is_hard = amplitude > hard_thr
 
-    if idx_hard.size == 0:
+    if not is_hard.any():
         return np.array([], dtype=int)
 
     # Keep only MT in period with low relative delta power
-    idx_hard = np.setdiff1d(idx_hard, idx_high_delta, True)
+    idx_mt = _mask_to_events(is_hard & ~is_high_delta)
 
     # Fill gap between events separated by less than min_distance_ms
-    idx_hard = _events_distance_fill(idx_hard, min_distance_ms, sf)
-
-    # MORPHOLOGICAL CRITERIA
-    idx_start, idx_stop = _events_to_index(idx_hard).T
-    duration_ms = (idx_stop - idx_start) * (1000 / sf)
+    idx_mt = _events_merge(idx_mt, min_distance_ms, sf)
 
-    # Remove events with bad duration
-    good_dur = np.where(np.logical_and(duration_ms > tmin,
-                                       duration_ms < tmax))[0]
-    idx_mt = _index_to_events(np.c_[idx_start, idx_stop][good_dur])
+    # MORPHOLOGICAL CRITERIA : remove events with bad duration
+    idx_mt = _events_duration(idx_mt, sf, tmin, tmax)
 
     # Remove events with bad amplitude
-    idx_start, idx_stop = _events_to_index(idx_mt).T
-    amp = np.zeros(shape=idx_start.size)
-    for i, (start, stop) in enumerate(zip(idx_start, idx_stop)):
-        amp[i] = np.ptp(data[start:stop])
-    good_amp = np.where(np.logical_and(amp > min_amp,
-                                       amp < max_amp))[0]
-    idx_mt = np.c_[idx_start, idx_stop][good_amp]
+    amp = _events_ptp(data, idx_mt)
+    idx_mt = idx_mt[np.logical_and(amp > min_amp, amp < max_amp)]
 
     # Compute number, duration, density
     if idx_mt.size == 0:
@@ -667,14 +660,12 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         A vector containing peak indices of shape (n_events, 2)
     """
     # ============== CHECK DATA ==============
-    if x_axis is None:
-        x_axis = range(len(y_axis))
     # Check length :
-    if len(y_axis) != len(x_axis):
+    if (x_axis is not None) and (len(y_axis) != len(x_axis)):
         raise ValueError("Input vectors y_axis and x_axis must have same "
                          "length")
     # Needs to be a numpy array
-    y_axis, x_axis = np.asarray(y_axis), np.asarray(x_axis)
+    y_axis = np.asarray(y_axis)
 
     # store data length for later use
     length = len(y_axis)
@@ -690,15 +681,7 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         raise ValueError("The get parameter must either be 'min', 'max' or"
                          " 'minmax'")
 
-    # ============== PRE-ALLOCATION ==============
-    max_peaks, min_peaks = [], []
-    dump = []   # Used to pop the first hit which almost always is false
-
-    # maxima and minima candidates are temporarily stored in
-    # mx and mn respectively
-    mn, mx = np.Inf, -np.Inf
-
-    # ============== THRESHOLD ==============
+    # ============== ITERATED SAMPLES ==============
     if threshold is not None:
         if threshold == 'auto':
             threshold = np.std(y_axis)
@@ -706,48 +689,36 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         y_axisp = detrend(y_axis)
         y_axisp -= y_axisp.mean()
         # Find values above threshold :
-        above = np.abs(y_axisp) >= threshold
-        zp = zip(np.arange(length)[above], x_axis[above], y_axis[above])
+        pos = np.flatnonzero(np.abs(y_axisp) >= threshold)
     else:
-        zp = zip(np.arange(length)[:-lookahead], x_axis[:-lookahead],
-                 y_axis[:-lookahead])
+        pos = np.arange(max(length - lookahead, 0))
+    y_pos = y_axis[pos]
+
+    # Maximum / minimum in the lookahead window of each sample :
+    lookahead = int(lookahead)
+    origin = -(lookahead // 2)
+    la_max = maximum_filter1d(y_axis, lookahead, mode='nearest',
+                              origin=origin)[pos]
+    la_min = minimum_filter1d(y_axis, lookahead, mode='nearest',
+                              origin=origin)[pos]
 
     # ============== FIND MIN / MAX PEAKS ==============
-    # Only detect peak if there is 'lookahead' amount of points after it
-    for index, x, y in zp:
-        if y > mx:
-            mx = y
-        if y < mn:
-            mn = y
-
-        # ==== Look for max ====
-        if y < mx - delta and mx != np.Inf:
-            # Maxima peak candidate found
-            # look ahead in signal to ensure that this is a peak and not jitter
-            if y_axis[index:index + lookahead].max() < mx:
-                max_peaks.append(index)
-                dump.append(True)
-                # set algorithm to only find minima now
-                mx = np.Inf
-                mn = np.Inf
-                if index + lookahead >= length:
-                    # end is within lookahead no more peaks can be found
-                    break
-                continue
-
-        # ==== Look for max ====
-        if y > mn + delta and mn != -np.Inf:
-            # Minima peak candidate found
-            # look ahead in signal to ensure that this is a peak and not jitter
-            if y_axis[index:index + lookahead].min() > mn:
-                min_peaks.append(index)
-                dump.append(False)
-                # set algorithm to only find maxima now
-                mn = -np.Inf
-                mx = -np.Inf
-                if index + lookahead >= length:
-                    # end is within lookahead no more peaks can be found
-                    break
+    # Maxima and minima alternate (find is True for a maximum, False for a
+    # minimum and None for the first peak)
+    max_peaks, min_peaks = [], []
+    dump = []   # Used to pop the first hit which almost always is false
+    find, k = None, 0
+    while k < len(pos):
+        k, is_max = _peakdetect_next(y_pos, la_max, la_min, delta, k, find)
+        if k is None:
+            break
+        (max_peaks if is_max else min_peaks).append(pos[k])
+        dump.append(is_max)
+        find = not is_max
+        if pos[k] + lookahead >= length:
+            # end is within lookahead no more peaks can be found
+            break
+        k += 1
 
     if min_peaks and max_peaks:
         # ============== CLEAN ==============
@@ -765,8 +736,62 @@ def peakdetect(sf, y_axis, x_axis=None, lookahead=200, delta=1., get='max',
         elif get == 'min':
             index = np.array(min_peaks)
         elif get == 'minmax':
-            index = np.vstack((min_peaks, max_peaks))
+            index = np.sort(np.r_[min_peaks, max_peaks]).astype(int)
 
         return np.c_[index, index]
     else:
         return np.array([])
+
+
+def _peakdetect_next(y, la_max, la_min, delta, start, find=None,
+                     block=256):
+    """Find the next peak of peakdetect.
+
+    Samples are processed by blocks of increasing size. In each block, the
+    running extremum since start is computed at once and the first sample
+    satisfying the peak condition ends the search.
+
+    Parameters
+    ----------
+    y : array_like
+        Values of the iterated samples.
+    la_max, la_min : array_like
+        Maximum and minimum of the lookahead window of the iterated samples.
+    delta : float
+        Minimum difference between a peak and the following points.
+    start : int
+        Position where the search begins.
+    find : bool | None
+        Find either a maximum (True), a minimum (False) or the first of
+        both (None).
+    block : int | 256
+        Initial number of samples of a block.
+
+    Returns
+    -------
+    k : int | None
+        Position of the sample where the peak is detected (None if there is
+        no more peak).
+    is_max : bool
+        Specify if the peak is a maximum.
+    """
+    mx, mn = -np.inf, np.inf
+    while start < len(y):
+        stop = min(start + block, len(y))
+        y_b = y[start:stop]
+        is_max = is_min = False
+        if find is not False:  # maxima
+            mx_b = np.maximum(np.maximum.accumulate(y_b), mx)
+            is_max = (y_b < mx_b - delta) & (la_max[start:stop] < mx_b)
+            mx = mx_b[-1]
+        if find is not True:  # minima
+            mn_b = np.minimum(np.minimum.accumulate(y_b), mn)
+            is_min = (y_b > mn_b + delta) & (la_min[start:stop] > mn_b)
+            mn = mn_b[-1]
+        is_peak = is_max | is_min
+        k = is_peak.argmax()
+        if is_peak[k]:
+            # A maximum is checked before a minimum :
+            return start + k, (find is not False) and bool(is_max[k])
+        start, block = stop, 2 * block
+    return None, None
@@ -0,0 +1,450 @@
+"""Run the detection of events on several channels in a process pool.
+
+Data, time and hypnogram are shared with the processes through memory-mapped
+files : data already mapped onto a file are used as is, other channels are
+copied one by one into a temporary file from a background thread. Workers
+only receive the names of the files and the row of the channel to process,
+so that channels are never pickled. Results are returned channel by channel,
+as soon as each detection is over.
+"""
+import logging
+import os
+import mmap
+import tempfile
+import threading
+from time import perf_counter
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .detection import (kcdetect, spindlesdetect, remdetect, slowwavedetect,
+                        mtdetect, peakdetect)
+from .event import _events_to_index
+from ..others import spawn_executor
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('DETECTIONS', 'DEFAULT_SETTINGS', 'format_detection',
+           'run_detection', 'SharedArray', 'ParallelDetection')
+
+
+# Default detection functions :
+DETECTIONS = {'Spindles': spindlesdetect, 'Slow waves': slowwavedetect,
+              'K-complexes': kcdetect, 'REM': remdetect,
+              'Muscle twitches': mtdetect, 'Peaks': peakdetect}
+# Default settings of each detection (same as in the Sleep GUI) :
+DEFAULT_SETTINGS = {
+    'Spindles': dict(threshold=2., nrem_only=False, fmin=12., fmax=14.,
+                     tmin=500., tmax=2000.),
+    'Slow waves': dict(threshold=.75),
+    'K-complexes': dict(proba_thr=.7, amp_thr=1., nrem_only=False, tmin=400.,
+                        tmax=3000., kc_min_amp=80., kc_max_amp=600.),
+    'REM': dict(rem_only=False, threshold=3.),
+    'Muscle twitches': dict(threshold=3., rem_only=False),
+    'Peaks': dict(lookahead=50, delta=1., get='max', threshold='auto')}
+# Detections that use the hypnogram :
+HYPNO_DETECTIONS = ('Spindles', 'K-complexes', 'REM', 'Muscle twitches')
+
+
+def format_detection(idx, n_pts):
+    """Format detected events to an array of (start, end) indices.
+
+    Parameters
+    ----------
+    idx : array_like
+        Either an (n_events, 2) array, a boolean array of shape (n_pts,) or
+        an array of consecutive detected indices.
+    n_pts : int
+        Number of time points of the data.
+
+    Returns
+    -------
+    index : array_like
+        Integer array of shape (n_events, 2) (empty if there is no event).
+    """
+    idx = np.asarray(idx)
+    if not idx.size:
+        return idx
+    # Check indices shape and format to (n_events, 2) :
+    if (idx.ndim == 2) and (idx.shape[1] == 2):  # (n_events, 2)
+        return idx.astype(int)
+    elif idx.ndim == 1:  # 1d vector
+        if idx.dtype == bool:  # boolean array
+            assert len(idx) == n_pts
+            idx = np.arange(n_pts)[idx]
+        return _events_to_index(idx)
+    else:
+        raise ValueError("Return indices should either be an (n_events"
+                         ", 2) array or a boolean array of shape "
+                         "(n_time_points,) or an array with "
+                         "consecutive detected events.")
+
+
+def run_detection(method, data, sf, hypno=None, time=None, **kwargs):
+    """Run a default detection on a single channel.
+
+    Parameters
+    ----------
+    method : {'Spindles', 'Slow waves', 'K-complexes', 'REM',
+              'Muscle twitches', 'Peaks'}
+        The detection method.
+    data : array_like
+        The data of shape (n_pts,).
+    sf : float
+        The sampling frequency.
+    hypno : array_like | None
+        Per-sample hypnogram of shape (n_pts,).
+    time : array_like | None
+        The time vector (only used by the peak detection).
+    kwargs : dict | {}
+        Additional arguments of the detection function. Missing arguments
+        are taken from DEFAULT_SETTINGS.
+
+    Returns
+    -------
+    index : array_like
+        Integer array of shape (n_events, 2) (empty if there is no event).
+    """
+    if method not in DETECTIONS:
+        raise ValueError("%s is not a valid detection method. Use %s" % (
+            method, ', '.join(DETECTIONS.keys())))
+    fcn = DETECTIONS[method]
+    kwargs = dict(DEFAULT_SETTINGS[method], **kwargs)
+    if method == 'Peaks':
+        idx = fcn(sf, data, time, **kwargs)
+    elif method in HYPNO_DETECTIONS:
+        idx = fcn(data, sf, hypno=hypno, **kwargs)
+    else:
+        idx = fcn(data, sf, **kwargs)
+    return format_detection(idx, len(data))
+
+
+class SharedArray(object):
+    """Array shared with other processes through a memory-mapped file.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the array.
+    dtype : string | type
+        Data type of the array.
+    """
+
+    def __init__(self, shape, dtype):
+        """Init."""
+        shape, dtype = tuple(shape), np.dtype(dtype)
+        self._file = None
+        self.array = np.empty(shape, dtype)
+        if self.array.size:
+            fid, self._file = tempfile.mkstemp(prefix='visbrain_',
+                                               suffix='.dat')
+            os.close(fid)
+            self.array = np.memmap(self._file, dtype=dtype, mode='w+',
+                                   shape=shape)
+        self.spec = (self._file, shape, dtype.str, 0)
+
+    @classmethod
+    def from_array(cls, arr):
+        """Copy an array into a shared array.
+
+        Parameters
+        ----------
+        arr : array_like
+            The array to share.
+
+        Returns
+        -------
+        shared : SharedArray
+            The shared array.
+        """
+        arr = np.asarray(arr)
+        shared = cls(arr.shape, arr.dtype)
+        shared.array[...] = arr
+        shared.flush()
+        return shared
+
+    @staticmethod
+    def file_spec(arr):
+        """Get the specification of an array already mapped onto a file.
+
+        Parameters
+        ----------
+        arr : array_like
+            The array.
+
+        Returns
+        -------
+        spec : tuple | None
+            The (filename, shape, dtype, offset) specification of the array
+            or None if the array is not a (read-only or read-write) memory
+            map of a whole file region. Copy-on-write maps are excluded as
+            their modifications are not written to the file.
+        """
+        if not isinstance(arr, np.memmap) or not isinstance(arr.base,
+                                                            mmap.mmap):
+            return None  # not a memmap or a view of a memmap
+        if (arr.mode not in ('r', 'r+')) or (arr.filename is None) or (
+                not arr.flags.c_contiguous):
+            return None
+        return (arr.filename, arr.shape, arr.dtype.str, arr.offset)
+
+    @staticmethod
+    def attach(spec):
+        """Attach to a shared array (e.g from another process).
+
+        Parameters
+        ----------
+        spec : tuple
+            The (filename, shape, dtype, offset) specification of the shared
+            array.
+
+        Returns
+        -------
+        arr : array_like
+            Copy-on-write array mapped onto the file (delete it after use).
+        """
+        if spec[0] is None:  # empty array
+            return np.empty(spec[1], np.dtype(spec[2]))
+        return np.memmap(spec[0], dtype=np.dtype(spec[2]), mode='c',
+                         shape=spec[1], offset=spec[3])
+
+    def flush(self):
+        """Write changes of the array to the file."""
+        if isinstance(self.array, np.memmap):
+            self.array.flush()
+
+    def close(self):
+        """Remove the temporary file."""
+        self.array = None
+        if self._file is not None:
+            try:
+                os.remove(self._file)
+            except OSError:
+                logger.warning("Can't remove %s" % self._file)
+            self._file = None
+
+
+def _detect_channel(method, kwargs, row, sf, data_spec, hypno_spec,
+                    time_spec):
+    """Run the detection of a channel stored in a shared array."""
+    t_start = perf_counter()
+    arrays = [None if spec is None else SharedArray.attach(spec) for spec in (
+        data_spec, hypno_spec, time_spec)]
+    try:
+        index = run_detection(method, arrays[0][row, :], sf, arrays[1],
+                              arrays[2], **kwargs)
+    finally:
+        del arrays
+    return index, perf_counter() - t_start
+
+
+class _DetectionRun(object):
+    """State of a detection run."""
+
+    def __init__(self, run_id):
+        """Init."""
+        self.run_id = run_id
+        self.futures = {}  # {future: channel}
+        self.shared = []  # shared arrays (removed once the run is over)
+        self.writing = True  # channels are still submitted
+        self.cancelled = False
+        self.done = threading.Event()
+
+
+class ParallelDetection(object):
+    """Run the detection of events on several channels in parallel.
+
+    Parameters
+    ----------
+    n_jobs : int | -1
+        Number of processes. If -1, all of the cpus are used.
+    """
+
+    def __init__(self, n_jobs=-1):
+        """Init."""
+        self.n_jobs = os.cpu_count() if n_jobs == -1 else max(int(n_jobs), 1)
+        self._pool = None
+        self._run = None  # running _DetectionRun
+        self._n_run = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        """Get if a detection is running."""
+        return self._run is not None
+
+    def run(self, method, data, sf, channels, hypno=None, time=None,
+            callback=None, **kwargs):
+        """Run a default detection on several channels.
+
+        The detection previously running is cancelled. Channels are shared
+        with the processes from a background thread (without any copy if
+        data are a memory-mapped file) and each channel is submitted as soon
+        as it is shared.
+
+        Parameters
+        ----------
+        method : string
+            The detection method (see run_detection).
+        data : array_like | RecordingSource
+            The data of shape (n_channels, n_pts).
+        sf : float
+            The sampling frequency.
+        channels : array_like
+            Indices of the channels.
+        hypno : array_like | None
+            Per-sample hypnogram of shape (n_pts,).
+        time : array_like | None
+            The time vector.
+        callback : callable | None
+            Function callback(run_id, channel, index, elapsed) called (from
+            a background thread) each time the detection of a channel is
+            over. If the detection failed, index is None.
+        kwargs : dict | {}
+            Additional arguments of the detection function.
+
+        Returns
+        -------
+        run_id : int | None
+            Identifier of the run (None if there is no channel).
+        """
+        self.cancel()
+        channels = [int(k) for k in channels]
+        if not channels:
+            return None
+        with self._lock:
+            self._n_run += 1
+            run = self._run = _DetectionRun(self._n_run)
+        args = (run, method, data, sf, channels, hypno, time, callback,
+                kwargs)
+        threading.Thread(target=self._submit_run, args=args,
+                         daemon=True).start()
+        logger.info("Run %s detection on %i channels (%i processes)" % (
+            method, len(channels), self.n_jobs))
+        return run.run_id
+
+    def _submit_run(self, run, method, data, sf, channels, hypno, time,
+                    callback, kwargs):
+        """Share the channels and submit their detection."""
+        submitted = 0
+        try:
+            specs = []
+            for arr in (hypno, time):
+                if arr is None:
+                    specs.append(None)
+                    continue
+                shared = SharedArray.from_array(arr)
+                run.shared.append(shared)
+                specs.append(shared.spec)
+            # Only the processed channels are copied, one by one :
+            data_spec, copy = SharedArray.file_spec(data), None
+            if data_spec is None:
+                copy = SharedArray((len(channels), data.shape[1]),
+                                   data.dtype)
+                run.shared.append(copy)
+                data_spec = copy.spec
+            for row, c in enumerate(channels):
+                if run.cancelled:
+                    break
+                if copy is None:  # the channel is read from the data file
+                    row = c
+                elif hasattr(data, 'read'):  # RecordingSource
+                    data.read([c], out=copy.array[row:row + 1, :])
+                else:
+                    copy.array[row, :] = data[c, :]
+                with self._lock:
+                    if run.cancelled:
+                        break
+                    fut = self._submit(_detect_channel, method, kwargs, row,
+                                       sf, data_spec, *specs)
+                    run.futures[fut] = c
+                submitted += 1
+                fut.add_done_callback(self._get_done(run, c, callback))
+        except Exception as e:
+            logger.error("Detection failed (%s)" % e)
+            # Report remaining channels as failed :
+            if (callback is not None) and not run.cancelled:
+                for c in channels[submitted:]:
+                    callback(run.run_id, c, None, 0.)
+        finally:
+            with self._lock:
+                run.writing = False
+                self._check_over(run)
+
+    def _submit(self, fcn, *args):
+        """Submit a function to the pool of processes.
+
+        The pool is (re)created if needed, e.g if a process was killed.
+        """
+        if self._pool is None:
+            self._pool = spawn_executor(self.n_jobs)
+        try:
+            return self._pool.submit(fcn, *args)
+        except BrokenProcessPool:
+            logger.warning("Detection processes restarted")
+            self._pool.shutdown(wait=False)
+            self._pool = spawn_executor(self.n_jobs)
+            return self._pool.submit(fcn, *args)
+
+    def _get_done(self, run, channel, callback):
+        """Get the function called when the detection of a channel is over."""
+        def _done(fut):
+            if not (run.cancelled or fut.cancelled()):
+                try:
+                    index, elapsed = fut.result()
+                except Exception as e:
+                    logger.error("Detection failed on channel %i (%s)" % (
+                        channel, e))
+                    index, elapsed = None, 0.
+                if (callback is not None) and not run.cancelled:
+                    callback(run.run_id, channel, index, elapsed)
+            with self._lock:
+                run.futures.pop(fut, None)
+                self._check_over(run)
+        return _done
+
+    def _check_over(self, run):
+        """Release the shared arrays of a run once it is over.
+
+        Shared files are only removed when no process uses them anymore (a
+        mapped file can't be removed on Windows). Called with the lock.
+        """
+        if run.writing or run.futures:
+            return
+        for shared in run.shared:
+            shared.close()
+        run.shared = []
+        if self._run is run:
+            self._run = None
+        run.done.set()
+
+    def wait(self):
+        """Wait until the running detection is over (results included)."""
+        run = self._run
+        if run is not None:
+            run.done.wait()
+
+    def cancel(self):
+        """Cancel the running detection.
+
+        Detections that already started are not interrupted but their
+        results are ignored. Shared arrays are removed once they are over.
+        """
+        with self._lock:
+            run = self._run
+            if run is None:
+                return
+            run.cancelled = True
+            self._run = None
+            futures = list(run.futures.keys())
+        # Done callbacks are called by cancel (outside of the lock) :
+        for fut in futures:
+            fut.cancel()
+
+    def close(self):
+        """Cancel the running detection and stop the processes."""
+        self.cancel()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
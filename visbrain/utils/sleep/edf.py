@@ -7,13 +7,17 @@ Values are slightly different from those computed by FieldTrip, however they
 are identical to those computed by Biosig and EDFBrowser. The difference is due
 to the calibration.
 
+Data are accessed through a memory-map of the data section, seen as a
+(n_records, n_samples_per_record_total) int16 matrix. All channels and samples
+requested are then sliced in one vectorized pass.
 """
 from logging import getLogger
+import os
 
 from datetime import datetime
-from math import floor
 from re import findall
-from numpy import empty, asarray, frombuffer, iinfo
+from numpy import (empty, asarray, iinfo, memmap, arange, dtype as np_dtype,
+                   float32, int64)
 
 
 lg = getLogger(__name__)
@@ -21,6 +25,8 @@ EDF_FORMAT = 'int16'  # by definition
 edf_iinfo = iinfo(EDF_FORMAT)
 DIGITAL_MAX = edf_iinfo.max
 DIGITAL_MIN = -1 * edf_iinfo.max  # so that digital 0 = physical 0
+# Maximum number of int16 values gathered from the memory-map at once :
+EDF_CHUNK_SIZE = 2 ** 24
 
 
 def _assert_all_the_same(items):
@@ -100,7 +106,18 @@ class Edf:
 
             assert f.tell() == hdr['header_n_bytes']
 
-            self.hdr = hdr
+        # The number of records can be unknown (-1) or wrong if the
+        # recording has been interrupted. Infer it from the file size :
+        n_rec_tot = sum(hdr['n_samples_per_record'])
+        n_rec_file = ((os.path.getsize(self.filename) -
+                       hdr['header_n_bytes']) // (2 * n_rec_tot))
+        if (hdr['n_records'] < 0) or (hdr['n_records'] > n_rec_file):
+            lg.warning("Number of records in header (%i) does not match the "
+                       "file size. %i records used instead" % (
+                           hdr['n_records'], n_rec_file))
+            hdr['n_records'] = n_rec_file
+
+        self.hdr = hdr
 
     def return_hdr(self):
         """Return the header for further use.
@@ -136,12 +153,29 @@ class Edf:
 
         return subj_id, start_time, s_freq, chan_name, n_samples, self.hdr
 
+    def _memmap(self):
+        """Memory-map the data section of the file.
+
+        Returns
+        -------
+        mm : numpy.memmap
+            Read-only int16 view of shape (n_records, n_samples_per_record
+            summed over channels).
+        """
+        n_rec_tot = sum(self.hdr['n_samples_per_record'])
+        return memmap(self.filename, dtype='<i2', mode='r',
+                      offset=self.hdr['header_n_bytes'],
+                      shape=(self.hdr['n_records'], n_rec_tot))
+
+    def _chan_index(self, chan):
+        """Convert a list of channel names and / or indices into indices."""
+        labels = self.hdr['label']
+        return [labels.index(k) if isinstance(k, str) else int(k)
+                for k in chan]
+
     def _read_dat(self, i_chan, begsam, endsam):
         """Read raw data from a single EDF channel.
 
-        Reads only one channel at the time. Very initial implementation, very
-        simple and probably not very fast
-
         Parameters
         ----------
         i_chan : int
@@ -157,60 +191,81 @@ class Edf:
             A vector with the data as written on file, in 16-bit precision
         """
         assert begsam < endsam
+        dat = empty((1, endsam - begsam), dtype='int16')
+        self._read_raw([i_chan], begsam, endsam, dat)
+        return dat[0, :]
 
-        begsam = float(begsam)
-        endsam = float(endsam)
-
-        n_sam_rec = self.hdr['n_samples_per_record']
-
-        begrec = int(floor(begsam / n_sam_rec[i_chan]))
-        begsam_rec = int(begsam % n_sam_rec[i_chan])
-
-        endrec = int(floor(endsam / n_sam_rec[i_chan]))
-        endsam_rec = int(endsam % n_sam_rec[i_chan])
-
-        dat = empty(shape=(int(endsam) - int(begsam)), dtype='int16')
-        i_dat = 0
-
-        with open(self.filename, 'rb') as f:
-            for rec in range(begrec, endrec + 1):
-                if rec == begrec:
-                    begpos_rec = begsam_rec
-                else:
-                    begpos_rec = 0
-
-                if rec == endrec:
-                    endpos_rec = endsam_rec
-                else:
-                    endpos_rec = n_sam_rec[i_chan]
-
-                begpos = begpos_rec + sum(n_sam_rec) * rec + sum(
-                    n_sam_rec[:i_chan])
-                endpos = endpos_rec + sum(n_sam_rec) * rec + sum(
-                    n_sam_rec[:i_chan])
-
-                f.seek(begpos * 2 + self.hdr['header_n_bytes'])
-                samples = f.read(2 * (endpos - begpos))
+    def _read_raw(self, chan, begsam, endsam, out, gain=None, offset=None):
+        """Vectorized read of several channels sharing the same sampling rate.
 
-                i_dat_end = i_dat + endpos - begpos
-                dat[i_dat:i_dat_end] = frombuffer(samples, dtype='<i2')
-                i_dat = i_dat_end
-
-        return dat
-
-    def return_dat(self, chan, begsam, endsam):
+        Parameters
+        ----------
+        chan : list of int
+            Indices of the channels to read.
+        begsam, endsam : int
+            Index of the first and last (excluded) samples.
+        out : array_like
+            Output array of shape (len(chan), endsam - begsam).
+        gain, offset : array_like | None
+            Calibration (data * gain + offset) applied on each chunk, in the
+            precision of out.
+        """
+        n_sam_rec = asarray(self.hdr['n_samples_per_record'], dtype=int64)
+        n_sam = n_sam_rec[chan]
+        if len(set(n_sam)) != 1:
+            raise ValueError("Channels sampled at different rates can't be "
+                             "read at once (%s)" % str(set(n_sam)))
+        n_sam = int(n_sam[0])
+        n_rec = self.hdr['n_records']
+        if not (0 <= begsam < endsam <= n_rec * n_sam):
+            raise ValueError("Samples [%i, %i] out of the recording (%i "
+                             "samples)" % (begsam, endsam, n_rec * n_sam))
+        # Column of each requested sample inside a record :
+        chan_start = (n_sam_rec.cumsum() - n_sam_rec)[chan]
+        cols = (chan_start.reshape(-1, 1) + arange(n_sam)).ravel()
+        begrec, endrec = begsam // n_sam, (endsam - 1) // n_sam + 1
+        # Number of records gathered at once (bounded memory) :
+        n_rec_chunk = max(1, EDF_CHUNK_SIZE // cols.size)
+
+        mm = self._memmap()
+        nchan = len(chan)
+        for r_start in range(begrec, endrec, n_rec_chunk):
+            r_end = min(r_start + n_rec_chunk, endrec)
+            # (n_rec, nchan * n_sam) -> (nchan, n_rec * n_sam) :
+            raw = mm[r_start:r_end, cols].reshape(r_end - r_start, nchan,
+                                                  n_sam)
+            raw = raw.transpose(1, 0, 2).reshape(nchan, -1)
+            # Crop samples outside of [begsam, endsam) :
+            s_start = max(begsam, r_start * n_sam)
+            s_end = min(endsam, r_end * n_sam)
+            raw = raw[:, s_start - r_start * n_sam:s_end - r_start * n_sam]
+            sl = out[:, s_start - begsam:s_end - begsam]
+            sl[:] = raw
+            if gain is not None:
+                sl *= gain
+                sl += offset
+        del mm
+
+    def return_dat(self, chan, begsam, endsam, out=None, dtype=float32):
         """Read data from an EDF file.
 
-        Reads channel by channel, and adjusts the values by calibration.
+        All channels are read in a single vectorized pass over the
+        memory-mapped file and adjusted by calibration.
 
         Parameters
         ----------
-        chan : list of str
-            index (indices) of the channels to read
+        chan : list of str or int
+            Names or indices of the channels to read. Channels must share the
+            same sampling rate.
         begsam : int
             index of the first sample
         endsam : int
-            index of the last sample
+            index of the last sample (excluded)
+        out : array_like | None
+            Pre-allocated output array of shape (len(chan), endsam - begsam).
+            If None, a new array is created.
+        dtype : type | np.float32
+            Data type of the output array (ignored if out is provided).
 
         Returns
         -------
@@ -218,24 +273,26 @@ class Edf:
             A 2d matrix, where the first dimension is the channels and the
             second dimension are the samples.
         """
+        chan = self._chan_index(chan)
+        shape = (len(chan), endsam - begsam)
+        if out is None:
+            out = empty(shape, dtype=dtype)
+        elif out.shape != shape:
+            raise ValueError("out should be an array of shape %s" % (shape,))
+        dtype = np_dtype(out.dtype)
+
+        # Calibration : (d - dig_min) * gain + phys_min = d * gain + offset
         hdr = self.hdr
-        dig_min = hdr['digital_min']
-        phys_min = hdr['physical_min']
         phys_range = hdr['physical_max'] - hdr['physical_min']
         dig_range = hdr['digital_max'] - hdr['digital_min']
-
-        # assert all(phys_range > 0)
-        # assert all(dig_range > 0)
-
         gain = phys_range / dig_range
+        offset = hdr['physical_min'] - hdr['digital_min'] * gain
+        gain = gain[chan].astype(dtype).reshape(-1, 1)
+        offset = offset[chan].astype(dtype).reshape(-1, 1)
 
-        dat = empty(shape=(len(chan), endsam - begsam), dtype='float64')
-
-        for i, i_chan in enumerate(chan):
-            d = self._read_dat(i, begsam, endsam).astype('float64')
-            dat[i, :] = (d - dig_min[i]) * gain[i] + phys_min[i]
+        self._read_raw(chan, begsam, endsam, out, gain, offset)
 
-        return dat
+        return out
 
     def return_markers(self):
         """Return markers."""
@@ -1,10 +1,29 @@
-"""Goup of functions for index / event managment."""
+"""Goup of functions for index / event managment.
+
+Events are described by an integer array of shape (n_events, 2) of sorted
+and non-overlapping (start, stop) indices, where the stop index is included
+in the event. Event functions work on these intervals (and never on the
+indices of every sample) so that the cost only depends on the number of
+events.
+"""
 
 import numpy as np
 
-__all__ = ('_events_distance_fill', '_events_to_index', '_index_to_events')
+__all__ = ('_events_distance_fill', '_events_to_index', '_index_to_events',
+           '_mask_to_events', '_events_to_mask', '_events_merge',
+           '_events_extend', '_events_duration', '_events_intersect',
+           '_events_ptp')
+
+
+def _empty_events():
+    """Get an empty array of events."""
+    return np.zeros((0, 2), dtype=int)
 
 
+###############################################################################
+#                            INDEX <-> EVENTS
+###############################################################################
+
 def _events_distance_fill(index, min_distance_ms, sf):
     """Remove events that do not have the good duration.
 
@@ -23,21 +42,11 @@ def _events_distance_fill(index, min_distance_ms, sf):
     f_index : array_like
         Filled (corrected) Indices of supra-threshold events
     """
-    # Convert min_distance_ms
-    min_distance = min_distance_ms / 1000. * sf
-    idx_diff = np.diff(index)
-    condition = idx_diff > 1
-    idx_distance = np.where(condition)[0]
-    distance = idx_diff[condition]
-    bad = idx_distance[np.where(distance < min_distance)[0]]
-    # Fill gap between events separated with less than min_distance_ms
-    if len(bad) > 0:
-        fill = np.hstack([np.arange(index[j] + 1, index[j + 1])
-                          for i, j in enumerate(bad)])
-        f_index = np.sort(np.append(index, fill))
-        return f_index
-    else:
+    index = np.asarray(index)
+    if not index.size:
         return index
+    events = _events_merge(_events_to_index(index), min_distance_ms, sf)
+    return _index_to_events(events)
 
 
 def _events_to_index(x):
@@ -54,10 +63,13 @@ def _events_to_index(x):
         An array of shape (n_events, 2) where the dimension 2 refer to the
         indices where each event start and finish.
     """
+    x = np.asarray(x).astype(int, copy=False)
+    if not x.size:
+        return _empty_events()
     # Split indices where it stopped :
-    sp = np.split(x, np.where(np.diff(x) != 1)[0] + 1)
+    split = np.flatnonzero(np.diff(x) != 1)
     # Return (start, end) :
-    return np.array([[k[0], k[-1]] for k in sp]).astype(int)
+    return np.c_[x[np.r_[0, split + 1]], x[np.r_[split, x.size - 1]]]
 
 
 def _index_to_events(x):
@@ -73,7 +85,211 @@ def _index_to_events(x):
     index : array_like
         Continuous array of indicies.
     """
-    index = np.array([])
-    for k in range(x.shape[0]):
-        index = np.append(index, np.arange(x[k, 0], x[k, 1] + 1))
-    return index.astype(int)
+    x = np.asarray(x).reshape(-1, 2).astype(int, copy=False)
+    lengths = np.maximum(x[:, 1] - x[:, 0] + 1, 0)
+    # Index of each sample relative to the start of its event :
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) -
+                                                  lengths, lengths)
+    return np.repeat(x[:, 0], lengths) + offset
+
+
+###############################################################################
+#                             MASK <-> EVENTS
+###############################################################################
+
+def _mask_to_events(mask):
+    """Get the events of a boolean vector.
+
+    Parameters
+    ----------
+    mask : array_like
+        Boolean array of shape (n_pts,).
+
+    Returns
+    -------
+    events : array_like
+        Array of shape (n_events, 2) of consecutive True values.
+    """
+    edges = np.diff(np.r_[0, np.asarray(mask, dtype=np.int8), 0])
+    start, stop = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return np.c_[start, stop - 1]
+
+
+def _events_to_mask(events, n_pts):
+    """Get the boolean vector of events.
+
+    Parameters
+    ----------
+    events : array_like
+        Array of events of shape (n_events, 2).
+    n_pts : int
+        Number of time points.
+
+    Returns
+    -------
+    mask : array_like
+        Boolean array of shape (n_pts,) (True inside events).
+    """
+    events = np.asarray(events).reshape(-1, 2)
+    edges = np.zeros((n_pts + 1,), dtype=int)
+    np.add.at(edges, events[:, 0], 1)
+    np.add.at(edges, events[:, 1] + 1, -1)
+    return np.cumsum(edges[:-1]) > 0
+
+
+###############################################################################
+#                              EVENTS ALGEBRA
+###############################################################################
+
+def _events_merge(events, min_distance_ms=0., sf=1.):
+    """Merge overlapping events and events separated by a small gap.
+
+    Parameters
+    ----------
+    events : array_like
+        Array of events of shape (n_events, 2) sorted by start.
+    min_distance_ms : float | 0.
+        Minimum distance (ms) between two events to consider them as two
+        distinct events. Contiguous events are always merged.
+    sf : float | 1.
+        Sampling frequency of the data (Hz)
+
+    Returns
+    -------
+    events : array_like
+        Merged events.
+    """
+    events = np.asarray(events).reshape(-1, 2)
+    if len(events) < 2:
+        return events
+    min_distance = max(min_distance_ms / 1000. * sf, 2.)
+    # Stops are accumulated for events included in a previous one :
+    stop = np.maximum.accumulate(events[:, 1])
+    new = np.r_[True, events[1:, 0] - stop[:-1] >= min_distance]
+    first = np.flatnonzero(new)
+    return np.c_[events[first, 0], np.maximum.reduceat(events[:, 1], first)]
+
+
+def _events_extend(events, soft):
+    """Extend events to the boundaries of larger events.
+
+    This is used to find the true beginning / end of events detected with a
+    hard threshold using a soft threshold.
+
+    Parameters
+    ----------
+    events : array_like
+        Array of events of shape (n_events, 2) sorted by start.
+    soft : array_like
+        Array of larger events of shape (n_soft, 2) (e.g events detected
+        using a soft threshold).
+
+    Returns
+    -------
+    events : array_like
+        Extended and merged events. Events start (respectively finish) where
+        the soft event containing their start (resp. end) starts (resp.
+        finishes).
+    """
+    events, soft = np.asarray(events).reshape(-1, 2), np.asarray(soft)
+    if not (len(events) and len(soft)):
+        return events
+    start, stop = events[:, 0].copy(), events[:, 1].copy()
+    # Soft event containing the start of each event :
+    i_start = np.searchsorted(soft[:, 1], start, side='left')
+    i_start = np.minimum(i_start, len(soft) - 1)
+    is_in = (soft[i_start, 0] <= start) & (soft[i_start, 1] >= start)
+    start[is_in] = soft[i_start[is_in], 0]
+    # Soft event containing the end of each event :
+    i_stop = np.maximum(np.searchsorted(soft[:, 0], stop, side='right') - 1,
+                        0)
+    is_in = (soft[i_stop, 0] <= stop) & (soft[i_stop, 1] >= stop)
+    stop[is_in] = soft[i_stop[is_in], 1]
+    return _events_merge(np.c_[start, stop])
+
+
+def _events_duration(events, sf, tmin=None, tmax=None):
+    """Keep events according to their duration.
+
+    Parameters
+    ----------
+    events : array_like
+        Array of events of shape (n_events, 2).
+    sf : float
+        Sampling frequency of the data (Hz)
+    tmin, tmax : float | None
+        Events have to last more than tmin and less than tmax (ms).
+
+    Returns
+    -------
+    events : array_like
+        Events with the good duration.
+    """
+    events = np.asarray(events).reshape(-1, 2)
+    duration_ms = (events[:, 1] - events[:, 0]) * (1000 / sf)
+    keep = np.ones((len(events),), dtype=bool)
+    if tmin is not None:
+        keep &= duration_ms > tmin
+    if tmax is not None:
+        keep &= duration_ms < tmax
+    return events[keep]
+
+
+def _events_intersect(events, segments):
+    """Intersection between events and segments.
+
+    Parameters
+    ----------
+    events : array_like
+        Array of events of shape (n_events, 2) sorted by start.
+    segments : array_like
+        Array of sorted and non-overlapping segments of shape
+        (n_segments, 2) (e.g segments of a sleep stage).
+
+    Returns
+    -------
+    events : array_like
+        Parts of events that are inside segments. An event overlapping
+        several segments is splitted.
+    """
+    events = np.asarray(events).reshape(-1, 2)
+    segments = np.asarray(segments).reshape(-1, 2)
+    if not (len(events) and len(segments)):
+        return _empty_events()
+    # Range of segments overlapping each event :
+    i_first = np.searchsorted(segments[:, 1], events[:, 0], side='left')
+    i_last = np.searchsorted(segments[:, 0], events[:, 1], side='right')
+    n_overlap = np.maximum(i_last - i_first, 0)
+    # One row per (event, segment) overlap :
+    ev = np.repeat(np.arange(len(events)), n_overlap)
+    seg = np.arange(n_overlap.sum()) + np.repeat(
+        i_first - np.cumsum(n_overlap) + n_overlap, n_overlap)
+    return np.c_[np.maximum(events[ev, 0], segments[seg, 0]),
+                 np.minimum(events[ev, 1], segments[seg, 1])]
+
+
+def _events_ptp(data, events):
+    """Get the peak-to-peak amplitude of each event.
+
+    Parameters
+    ----------
+    data : array_like
+        Data of shape (n_pts,).
+    events : array_like
+        Array of sorted and non-overlapping events of shape (n_events, 2).
+
+    Returns
+    -------
+    amp : array_like
+        Peak-to-peak amplitude of data[start:stop] for each event.
+    """
+    events = np.asarray(events).reshape(-1, 2)
+    if not len(events):
+        return np.zeros((0,), dtype=float)
+    # Reduce over [start, stop) (the last sample is only used by empty
+    # events) :
+    stop = np.maximum(events[:, 1], events[:, 0] + 1)
+    idx = np.c_[events[:, 0], np.minimum(stop, len(data) - 1)].ravel()
+    d_max = np.maximum.reduceat(data, idx)[::2]
+    d_min = np.minimum.reduceat(data, idx)[::2]
+    return d_max - d_min
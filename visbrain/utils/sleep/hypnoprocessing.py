@@ -2,7 +2,243 @@
 
 import numpy as np
 
-__all__ = ('transient', 'sleepstats')
+__all__ = ('RLEHypnogram', 'transient', 'sleepstats', 'hypno_lut',
+           'hypno_lookup')
+
+
+class RLEHypnogram(object):
+    """Run-length encoded hypnogram.
+
+    The hypnogram is stored as a list of segments (onset, value), which is
+    orders of magnitude smaller than one value per sample. Per-sample values
+    are only computed for the requested window. The object behaves like a
+    1D array (len, indexing, slicing, slice assignment and conversion with
+    np.asarray).
+
+    Parameters
+    ----------
+    onsets : array_like
+        Index of the first sample of each segment. The first onset must be 0.
+    values : array_like
+        Vigilance state value of each segment.
+    n : int
+        Total number of samples.
+    """
+
+    def __init__(self, onsets, values, n):
+        """Init."""
+        self._n = int(n)
+        self._set(np.asarray(onsets, dtype=np.int64),
+                  np.asarray(values).astype(int))
+
+    def _set(self, onsets, values):
+        """Set segments (remove empty ones and merge identical ones)."""
+        keep = onsets < self._n
+        onsets, values = onsets[keep], values[keep]
+        keep = np.diff(np.r_[onsets, self._n]) > 0
+        onsets, values = onsets[keep], values[keep]
+        keep = np.r_[True, values[1:] != values[:-1]] if len(values) else keep
+        self._onsets, self._values = onsets[keep], values[keep]
+
+    @classmethod
+    def from_array(cls, hypno):
+        """Encode a per-sample hypnogram.
+
+        Parameters
+        ----------
+        hypno : array_like
+            Hypnogram data of shape (n_pts,).
+
+        Returns
+        -------
+        hypno : RLEHypnogram
+            The run-length encoded hypnogram.
+        """
+        if isinstance(hypno, RLEHypnogram):
+            return hypno.copy()
+        hypno = np.asarray(hypno).ravel()
+        onsets = np.flatnonzero(hypno[1:] != hypno[:-1]) + 1
+        onsets = np.r_[0, onsets] if len(hypno) else onsets
+        return cls(onsets, hypno[onsets], len(hypno))
+
+    @classmethod
+    def full(cls, n, value=0):
+        """Get an hypnogram of n samples with a single state."""
+        return cls([0], [value], n)
+
+    def __repr__(self):
+        """Representation."""
+        return "RLEHypnogram(n_samples=%i, n_segments=%i)" % (
+            len(self), self.n_segments)
+
+    def __len__(self):
+        """Get the number of samples."""
+        return self._n
+
+    def __array__(self, dtype=None, copy=None):
+        """Get per-sample values."""
+        return self.to_array(dtype=np.float32 if dtype is None else dtype)
+
+    def __getitem__(self, idx):
+        """Get per-sample values (int, slice or array of indices)."""
+        if isinstance(idx, slice) and idx.step in [None, 1]:
+            return self.to_array(idx.start, idx.stop)
+        elif isinstance(idx, slice):
+            return self.take(np.arange(*idx.indices(len(self))))
+        elif np.ndim(idx) == 0:
+            idx = int(idx) + len(self) if int(idx) < 0 else int(idx)
+            if not 0 <= idx < len(self):
+                raise IndexError("Index out of range")
+            return self.take([idx])[0]
+        return self.take(idx)
+
+    def __setitem__(self, idx, value):
+        """Set a vigilance state (int or slice)."""
+        if isinstance(idx, slice) and idx.step in [None, 1]:
+            start, stop, _ = idx.indices(len(self))
+        elif np.ndim(idx) == 0:
+            start = int(idx) + len(self) if int(idx) < 0 else int(idx)
+            stop = start + 1
+        else:
+            raise IndexError("Only integers and slices are supported")
+        self.set_state(start, stop, value)
+
+    # ----------- PROPERTIES -----------
+    @property
+    def shape(self):
+        """Get the shape of the per-sample hypnogram."""
+        return (len(self),)
+
+    @property
+    def ndim(self):
+        """Get the number of dimensions."""
+        return 1
+
+    @property
+    def dtype(self):
+        """Get the type of per-sample values."""
+        return np.dtype(np.float32)
+
+    @property
+    def nbytes(self):
+        """Get the memory used by segments."""
+        return self._onsets.nbytes + self._values.nbytes
+
+    @property
+    def n_segments(self):
+        """Get the number of segments."""
+        return len(self._onsets)
+
+    @property
+    def onsets(self):
+        """Get the index of the first sample of each segment."""
+        return self._onsets
+
+    @property
+    def ends(self):
+        """Get the index of the sample following each segment."""
+        return np.r_[self._onsets[1:], self._n]
+
+    @property
+    def durations(self):
+        """Get the number of samples of each segment."""
+        return self.ends - self._onsets
+
+    @property
+    def values(self):
+        """Get the vigilance state value of each segment."""
+        return self._values
+
+    # ----------- METHODS -----------
+    def copy(self):
+        """Get a copy of the hypnogram."""
+        return RLEHypnogram(self._onsets.copy(), self._values.copy(), self._n)
+
+    def to_array(self, start=None, stop=None, dtype=np.float32):
+        """Get per-sample values of a window.
+
+        Parameters
+        ----------
+        start, stop : int | None
+            First and last (excluded) samples of the window.
+        dtype : type | np.float32
+            Data type of the returned array.
+
+        Returns
+        -------
+        hypno : array_like
+            The hypnogram data of shape (stop - start,).
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        i_start = max(np.searchsorted(self._onsets, start, 'right') - 1, 0)
+        i_stop = np.searchsorted(self._onsets, stop, 'left')
+        sl = slice(i_start, i_stop)
+        dur = np.clip(self.ends[sl], start, stop) - np.clip(
+            self._onsets[sl], start, stop)
+        return np.repeat(self._values[sl].astype(dtype), dur)
+
+    def take(self, index):
+        """Get the value of specific samples."""
+        index = np.asarray(index, dtype=np.int64)
+        index = np.where(index < 0, index + len(self), index)
+        if index.size and ((index.min() < 0) or (index.max() >= len(self))):
+            raise IndexError("Index out of range")
+        seg = np.searchsorted(self._onsets, index, 'right') - 1
+        return self._values[seg].astype(self.dtype)
+
+    def set_state(self, start, stop, value):
+        """Set a vigilance state on an interval.
+
+        Parameters
+        ----------
+        start, stop : int
+            First and last (excluded) samples of the interval.
+        value : int
+            Vigilance state value.
+        """
+        start, stop = max(int(start), 0), min(int(stop), len(self))
+        if stop <= start:
+            return
+        left, right = self._onsets < start, self.ends > stop
+        onsets = np.r_[self._onsets[left], start,
+                       np.maximum(self._onsets[right], stop)]
+        values = np.r_[self._values[left], int(value), self._values[right]]
+        self._set(onsets, values)
+
+    def segments(self, xvec=None):
+        """Get the first and last (included) sample of each segment.
+
+        Parameters
+        ----------
+        xvec : array_like | None
+            Time vector used to convert samples.
+
+        Returns
+        -------
+        index : array_like
+            Array of shape (n_segments, 2).
+        values : array_like
+            Vigilance state value of each segment.
+        """
+        index = np.c_[self._onsets, self.ends - 1]
+        if (xvec is not None) and (len(xvec) == len(self)):
+            index = np.asarray(xvec)[index]
+        return index, self._values.copy()
+
+    def downsample(self, dsf):
+        """Down-sample the hypnogram (equivalent to hypno[::dsf])."""
+        dsf = int(dsf)
+        n = -(-len(self) // dsf)
+        onsets = -(-self._onsets // dsf)
+        out = RLEHypnogram([], [], n)
+        out._set(onsets, self._values)
+        return out
+
+    def oversample(self, n):
+        """Over-sample the hypnogram (see visbrain.io.oversample_hypno)."""
+        rep_nb = int(np.round(n / len(self)))
+        return RLEHypnogram(self._onsets * rep_nb, self._values, n)
 
 
 def transient(data, xvec=None):
@@ -10,7 +246,7 @@ def transient(data, xvec=None):
 
     Parameters
     ----------
-    data : array_like
+    data : array_like | RLEHypnogram
         The hypnogram data.
     xvec : array_like | None
         The time vector to use. If None, np.arange(len(data)) will be used
@@ -26,6 +262,9 @@ def transient(data, xvec=None):
     values : array_like
         The vigilance state value for each segment.
     """
+    if isinstance(data, RLEHypnogram):
+        idx, states = data.segments(xvec)
+        return data.onsets[1:] - 1, idx, states
     # Transient detection :
     t = list(np.nonzero(np.abs(data[:-1] - data[1:]))[0])
     # Add first and last points :
@@ -43,6 +282,58 @@ def transient(data, xvec=None):
     return np.array(t), st, states.astype(int)
 
 
+def hypno_lut(hvalues, items, fill=np.nan):
+    """Build a dense lookup table indexed by vigilance state values.
+
+    Parameters
+    ----------
+    hvalues : array_like
+        Integer values of the vigilance states, of shape (n_states,).
+    items : array_like
+        Item of each state (e.g Y position or color), of shape
+        (n_states, ...).
+    fill : float | np.nan
+        Item of values which are not vigilance states.
+
+    Returns
+    -------
+    lut : array_like
+        The lookup table of shape (max(hvalues) - min(hvalues) + 1, ...).
+    vmin : int
+        Value of the first row of the table.
+    """
+    hvalues = np.asarray(hvalues).astype(int)
+    items = np.asarray(items)
+    vmin = int(hvalues.min())
+    lut = np.full((hvalues.max() - vmin + 1,) + items.shape[1:], fill,
+                  dtype=np.result_type(items, np.asarray(fill)))
+    lut[hvalues - vmin] = items
+    return lut, vmin
+
+
+def hypno_lookup(lut, vmin, data):
+    """Get the item of each sample of a hypnogram.
+
+    Parameters
+    ----------
+    lut : array_like
+        The lookup table (see hypno_lut).
+    vmin : int
+        Value of the first row of the table.
+    data : array_like
+        The hypnogram data of shape (n_pts,).
+
+    Returns
+    -------
+    items : array_like
+        Item of each sample, of shape (n_pts, ...).
+    """
+    idx = np.asarray(data).astype(int) - vmin
+    if idx.size and ((idx.min() < 0) or (idx.max() >= len(lut))):
+        raise ValueError("Some hypnogram values are not vigilance states.")
+    return lut[idx]
+
+
 def sleepstats(hypno, sf_hyp, hstates, hvalues):
     """Compute sleep stats from an hypnogram vector.
 
@@ -74,7 +365,7 @@ def sleepstats(hypno, sf_hyp, hstates, hvalues):
 
     Parameters
     ----------
-    hypno : array_like
+    hypno : array_like | RLEHypnogram
         Hypnogram vector
     sf_hyp : float
         The sampling frequency of the hypnogram
@@ -91,12 +382,12 @@ def sleepstats(hypno, sf_hyp, hstates, hvalues):
     stats = {}
     tov = np.nan
 
-    # Downsample to 1 value per second
-    hypno = hypno[::int(sf_hyp)]
+    # Downsample to 1 value per second (computations are made on segments)
+    hypno = RLEHypnogram.from_array(hypno).downsample(int(sf_hyp))
+    onsets, ends, values = hypno.onsets, hypno.ends, hypno.values
 
     stats['TIB'] = len(hypno)
-    stats['TDT'] = np.where(hypno != 0)[0].max() if np.nonzero(
-        hypno)[0].size else tov
+    stats['TDT'] = ends[values != 0][-1] - 1 if np.any(values != 0) else tov
 
     state_values = {
         label: value for label, value in zip(hstates, hvalues)
@@ -104,21 +395,22 @@ def sleepstats(hypno, sf_hyp, hstates, hvalues):
 
     # Duration of each sleep stages
     for label, value in state_values.items():
-        stats[label] = hypno[hypno == value].size
+        stats[label] = (ends - onsets)[values == value].sum()
 
     # Sleep stage latencies
     for label, value in state_values.items():
         stats[f'Lat{label}'] = \
-            np.where(hypno == value)[0].min() if value in hypno else tov
+            onsets[values == value][0] if value in values else tov
 
     if ('LatN1' in stats
         and not np.isnan(stats['LatN1'])
         and not np.isnan(stats['TDT'])
     ):
-        hypno_s = hypno[stats['LatN1']:stats['TDT']]
-
-        stats['SPT'] = hypno_s.size
-        stats['WASO'] = hypno_s[hypno_s == 0].size
+        start, stop = stats['LatN1'], stats['TDT']
+        wake = values == 0
+        stats['SPT'] = max(stop - start, 0)
+        stats['WASO'] = np.maximum(np.minimum(ends[wake], stop) - np.maximum(
+            onsets[wake], start), 0).sum()
         stats['TST'] = stats['SPT'] - stats['WASO']
     else:
         stats['SPT'] = tov
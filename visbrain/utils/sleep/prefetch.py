@@ -0,0 +1,201 @@
+"""Background preparation of the windows around the displayed one.
+
+When navigating through a recording (page by page or with the slider), the
+next window can be predicted from the direction and the step of the previous
+moves. The windows ahead (and the one behind) are prepared in worker threads
+and kept in a bounded LRU cache. Displaying them then only consists in
+swapping buffers.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('WindowPrefetcher',)
+
+
+class WindowPrefetcher(object):
+    """Prefetch windows of a recording in background threads.
+
+    Parameters
+    ----------
+    fcn : callable
+        Function fcn(start, stop, key) returning the window [start, stop)
+        prepared with the settings described by key. It is called from worker
+        threads and should not modify shared states.
+    n_pts : int
+        Number of time points of the recording.
+    max_windows : int | 8
+        Maximum number of prepared windows kept in memory.
+    depth : int | 2
+        Number of windows prefetched in the direction of the navigation
+        (the previous window is also prefetched).
+    n_jobs : int | 2
+        Number of worker threads.
+    """
+
+    def __init__(self, fcn, n_pts, max_windows=8, depth=2, n_jobs=2):
+        """Init."""
+        assert hasattr(fcn, '__call__')
+        self._fcn = fcn
+        self.n_pts = int(n_pts)
+        self.max_windows = max(int(max_windows), 1)
+        self.depth = int(depth)
+        self._n_jobs = max(int(n_jobs), 1)
+        self._windows = OrderedDict()  # (key, start, stop) -> window
+        self._pending = {}  # (key, start, stop) -> future
+        self._last = None  # last requested (key, start, stop)
+        self._gen = 0  # incremented each time prepared windows are cleared
+        self._lock = threading.Lock()
+        self._executor = None
+        self.hits, self.misses = 0, 0
+
+    def __len__(self):
+        """Get the number of prepared windows."""
+        return len(self._windows)
+
+    def __contains__(self, window):
+        """Get if a (key, start, stop) window is prepared."""
+        return window in self._windows
+
+    # ----------- GET -----------
+    def get(self, start, stop, key=None):
+        """Get a prepared window and prefetch its neighbours.
+
+        Parameters
+        ----------
+        start, stop : int
+            First and last (excluded) time points of the window.
+        key : hashable | None
+            Key of the preparation settings. Windows prepared with other
+            settings are ignored.
+
+        Returns
+        -------
+        window : object
+            The window returned by fcn(start, stop, key).
+        """
+        start, stop = int(start), int(stop)
+        window = (key, start, stop)
+        with self._lock:
+            fut = self._pending.get(window, None)
+            is_prepared = window in self._windows
+            if is_prepared:
+                self._windows.move_to_end(window)
+                out = self._windows[window]
+                self.hits += 1
+            elif fut is None:
+                self.misses += 1
+        if (not is_prepared) and (fut is not None):  # prepared in background
+            try:
+                out = fut.result()
+            except Exception:
+                fut = None
+            with self._lock:
+                if fut is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        if (not is_prepared) and (fut is None):
+            out = self._fcn(start, stop, key)
+            self._store(window, out, self._gen)
+        self._prefetch(window)
+        self._last = window
+        return out
+
+    def predict(self, start, stop, key=None):
+        """Predict the next windows from the previous move.
+
+        Parameters
+        ----------
+        start, stop : int
+            First and last (excluded) time points of the current window.
+        key : hashable | None
+            Key of the preparation settings.
+
+        Returns
+        -------
+        windows : list
+            List of (start, stop) windows, most likely first.
+        """
+        length = stop - start
+        step, direction = length, 1
+        last = self._last
+        if (last is not None) and (last[0] == key) and (last[1] != start) and (
+                last[2] - last[1] == length):
+            step = abs(start - last[1])
+            direction = 1 if start > last[1] else -1
+        starts = [start + direction * step * k for k in range(
+            1, self.depth + 1)] + [start - direction * step]
+        return [(s, s + length) for s in starts if (s >= 0) and (
+            s + length <= self.n_pts)]
+
+    def _prefetch(self, window):
+        """Prepare the predicted windows in the background."""
+        key = window[0]
+        todo = [(key, s, e) for s, e in self.predict(*window[1:], key=key)]
+        with self._lock:
+            # Cancel predictions that are not relevant anymore :
+            for k, fut in list(self._pending.items()):
+                if (k not in todo) and fut.cancel():
+                    self._pending.pop(k)
+            todo = [k for k in todo if (k not in self._windows) and (
+                k not in self._pending)]
+            if not todo:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._n_jobs)
+            for k in todo:
+                self._pending[k] = self._executor.submit(self._compute, k,
+                                                         self._gen)
+
+    def _compute(self, window, gen):
+        """Prepare a window in the background."""
+        try:
+            out = self._fcn(window[1], window[2], window[0])
+        except Exception as e:
+            logger.debug("Prefetch of window %s failed (%s)" % (str(
+                window[1:]), e))
+            with self._lock:
+                self._pending.pop(window, None)
+            raise
+        self._store(window, out, gen)
+        return out
+
+    def _store(self, window, out, gen):
+        """Save a prepared window (least recently used are removed)."""
+        with self._lock:
+            if gen != self._gen:  # prepared before a clear
+                return
+            self._pending.pop(window, None)
+            self._windows[window] = out
+            self._windows.move_to_end(window)
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+
+    def wait(self):
+        """Wait until all of the background preparations are done."""
+        with self._lock:
+            futures = list(self._pending.values())
+        for fut in futures:
+            if not fut.cancelled():
+                fut.exception()
+
+    def clear(self):
+        """Cancel background preparations and remove prepared windows."""
+        with self._lock:
+            for fut in self._pending.values():
+                fut.cancel()
+            self._pending.clear()
+            self._windows.clear()
+            self._last = None
+            self._gen += 1
+
+    def close(self):
+        """Clear prepared windows and stop worker threads."""
+        self.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
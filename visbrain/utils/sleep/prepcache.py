@@ -0,0 +1,199 @@
+"""Whole-recording cache of prepared (filtered) data.
+
+Filtering each displayed window is slow and adds edge transients at every
+window boundary. Instead, each channel is filtered once over the whole
+recording, in a background thread and by chunks of channels. Navigating then
+simply slices the cached arrays. Entries are keyed by the filtering settings
+of a PrepareData instance, so that going back to previous settings is free.
+The memory used by the cache is bounded : least recently used channels are
+removed first.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from visbrain.utils.filtering import PrepareData
+
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('PreparedCache',)
+
+# PrepareData attributes defining the filtering of the whole recording :
+PREP_SETTINGS = ('fstart', 'fend', 'forder', 'way', 'filt_meth', 'btype',
+                 'dispas')
+
+
+class PreparedCache(object):
+    """Whole-recording cache of prepared data.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of data of shape (n_channels, n_pts). Any object supporting
+        (channels, time) slicing is accepted (e.g a RecordingSource).
+    sf : float
+        The sampling frequency.
+    max_size : float | 1.
+        Maximum size of the cache (in Gb).
+    chunk_size : int | 4
+        Number of channels filtered at once in the background.
+    callback : callable | None
+        Function called (from the background thread) when all of the
+        requested channels are ready.
+    """
+
+    def __init__(self, data, sf, max_size=1., chunk_size=4, callback=None):
+        """Init."""
+        self._data, self._sf = data, sf
+        self.max_size = max_size
+        self.chunk_size = max(int(chunk_size), 1)
+        self._callback = callback
+        self._entries = OrderedDict()  # (key, channel) -> prepared channel
+        self._pending = {}  # (key, channel) -> future
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __len__(self):
+        """Get the number of cached channels."""
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """Get the total size of the cache (in bytes)."""
+        return sum([k.nbytes for k in self._entries.values()])
+
+    # ----------- KEY -----------
+    @staticmethod
+    def key(prep):
+        """Get the key of the filtering settings of a PrepareData instance.
+
+        Parameters
+        ----------
+        prep : PrepareData
+            The PrepareData instance.
+
+        Returns
+        -------
+        key : tuple | None
+            Tuple of (name, value) settings. None if data are not filtered.
+        """
+        if not prep.filt:
+            return None
+        return tuple([(k, getattr(prep, k)) for k in PREP_SETTINGS])
+
+    # ----------- GET -----------
+    def get(self, prep, channels, sl=None):
+        """Get prepared data.
+
+        Missing channels are computed in the background. Only the filtering
+        is applied to the whole recording : de-meaning and de-trending are
+        window operations left to the caller.
+
+        Parameters
+        ----------
+        prep : PrepareData
+            The PrepareData instance defining the filtering settings.
+        channels : array_like
+            Indices of the channels to get.
+        sl : slice | None
+            The time slice of data to get.
+
+        Returns
+        -------
+        data : array_like | None
+            Float32 array of prepared data of shape (len(channels), n_pts).
+            None if some channels are not ready yet or if the data are not
+            filtered.
+        """
+        key = self.key(prep)
+        if key is None:
+            return None
+        sl = slice(None) if sl is None else sl
+        channels = [int(k) for k in channels]
+        with self._lock:
+            missing = [c for c in channels if (key, c) not in self._entries]
+            if not missing:
+                for c in channels:
+                    self._entries.move_to_end((key, c))
+                return np.stack([self._entries[(key, c)][sl] for c in
+                                 channels])
+            # Channels that would not fit in the cache are never computed :
+            n_bytes = len(channels) * self._data.shape[1] * 4
+            if n_bytes > self.max_size * 1024 ** 3:
+                return None
+            self._submit(key, missing)
+        return None
+
+    def _submit(self, key, channels):
+        """Compute missing channels in the background."""
+        # Settings have changed, cancel computations not started yet :
+        for k, fut in list(self._pending.items()):
+            if (k[0] != key) and fut.cancel():
+                self._pending.pop(k)
+        todo = [c for c in channels if (key, c) not in self._pending]
+        if not todo:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        for k in range(0, len(todo), self.chunk_size):
+            chans = todo[k:k + self.chunk_size]
+            fut = self._executor.submit(self._compute, key, chans)
+            for c in chans:
+                self._pending[(key, c)] = fut
+
+    def _compute(self, key, channels):
+        """Filter the whole recording of a chunk of channels."""
+        try:
+            prep = PrepareData(axis=1, filt=True, **dict(key))
+            data = prep._prepare_data(self._sf, np.asarray(
+                self._data[channels, :]), None)
+        except Exception as e:
+            logger.warning("Whole-recording filtering failed (%s)" % e)
+            data = None
+        with self._lock:
+            for i, c in enumerate(channels):
+                self._pending.pop((key, c), None)
+                if data is not None:
+                    self._entries[(key, c)] = data[i, :].copy()
+            self._evict()
+            done = not any([k[0] == key for k in self._pending])
+        logger.debug("Whole-recording filtering of channels %s done" % str(
+            channels))
+        if (data is not None) and done and (self._callback is not None):
+            self._callback()
+
+    # ----------- EVICTION -----------
+    def _evict(self):
+        """Remove least recently used channels until the size is bounded."""
+        max_size = self.max_size * 1024 ** 3
+        total = self.size
+        while self._entries and (total > max_size):
+            _, data = self._entries.popitem(last=False)
+            total -= data.nbytes
+
+    def wait(self):
+        """Wait until all of the background computations are done."""
+        with self._lock:
+            futures = set(self._pending.values())
+        for fut in futures:
+            if not fut.cancelled():
+                fut.result()
+
+    def clear(self):
+        """Cancel background computations and remove all entries."""
+        with self._lock:
+            for fut in self._pending.values():
+                fut.cancel()
+            self._pending.clear()
+            self._entries.clear()
+
+    def close(self):
+        """Clear the cache and stop the background thread."""
+        self.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
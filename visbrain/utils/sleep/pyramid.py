@@ -0,0 +1,160 @@
+"""Min / max level-of-detail pyramid for long signal display.
+
+Drawing a whole-night signal means sending millions of vertices to the GPU
+while the canvas only has a few thousands pixels. Instead, each channel is
+summarized by its min / max envelope at several resolutions. For a given
+window, the level whose bin size best matches the canvas width is then used,
+so that the number of vertices stays close to 2 x pixels.
+"""
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('minmax_envelope', 'MinMaxPyramid')
+
+
+def minmax_envelope(data, bin_size):
+    """Get the min / max envelope of a signal.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of data of shape (n_channels, n_pts).
+    bin_size : int
+        Number of time points per bin.
+
+    Returns
+    -------
+    env : array_like
+        The envelope of shape (n_channels, 2 * n_bins) where the min and max
+        of each bin are interleaved (min of the first bin, max of the first
+        bin, min of the second bin...). The last bin can be partial.
+    """
+    n_chan, n_pts = data.shape
+    n_full = n_pts // bin_size
+    n_bins = -(-n_pts // bin_size)
+    env = np.empty((n_chan, 2 * n_bins), dtype=data.dtype)
+    if n_full:
+        full = data[:, :n_full * bin_size].reshape(n_chan, n_full, bin_size)
+        full.min(axis=-1, out=env[:, 0:2 * n_full:2])
+        full.max(axis=-1, out=env[:, 1:2 * n_full:2])
+    if n_bins != n_full:  # last partial bin
+        env[:, -2] = data[:, n_full * bin_size:].min(1)
+        env[:, -1] = data[:, n_full * bin_size:].max(1)
+    return env
+
+
+class MinMaxPyramid(object):
+    """Multi-resolution min / max envelope of a recording.
+
+    Parameters
+    ----------
+    data : array_like
+        Array of data of shape (n_channels, n_pts). Any object supporting
+        (channels, time) slicing is accepted (e.g a RecordingSource).
+    base : int | 16
+        Number of time points per bin of the finest level.
+    factor : int | 4
+        Ratio between the bin sizes of two consecutive levels.
+    min_bins : int | 512
+        Levels are added until the number of bins is below min_bins.
+    chunk_size : int | 2 ** 20
+        Number of time points read at once to build the finest level.
+    """
+
+    def __init__(self, data, base=16, factor=4, min_bins=512,
+                 chunk_size=2 ** 20):
+        """Init."""
+        self._n_pts = data.shape[1]
+        self._levels = []
+        # Finest level (built by chunks of data) :
+        chunk_size = max(chunk_size - chunk_size % base, base)
+        env = np.concatenate([minmax_envelope(
+            np.asarray(data[:, k:k + chunk_size]), base) for k in range(
+            0, self._n_pts, chunk_size)], axis=1)
+        self._levels.append((base, env))
+        # Coarser levels (built from the previous one) :
+        while env.shape[1] // 2 > min_bins:
+            n_chan, n_bins = env.shape[0], env.shape[1] // 2
+            n_full = n_bins // factor
+            n_new = -(-n_bins // factor)
+            new = np.empty((n_chan, 2 * n_new), dtype=env.dtype)
+            mins, maxs = env[:, 0::2], env[:, 1::2]
+            full = slice(0, n_full * factor)
+            mins[:, full].reshape(n_chan, n_full, factor).min(
+                axis=-1, out=new[:, 0:2 * n_full:2])
+            maxs[:, full].reshape(n_chan, n_full, factor).max(
+                axis=-1, out=new[:, 1:2 * n_full:2])
+            if n_new != n_full:
+                new[:, -2] = mins[:, n_full * factor:].min(1)
+                new[:, -1] = maxs[:, n_full * factor:].max(1)
+            env = new
+            self._levels.append((self._levels[-1][0] * factor, env))
+        logger.debug("Min / max pyramid built with %i levels (bin sizes : "
+                     "%s)" % (len(self), str(self.bin_sizes)))
+
+    def __len__(self):
+        """Get the number of levels."""
+        return len(self._levels)
+
+    @property
+    def bin_sizes(self):
+        """Get the bin size of each level."""
+        return [k[0] for k in self._levels]
+
+    @property
+    def nbytes(self):
+        """Get the memory used by the pyramid."""
+        return sum([k[1].nbytes for k in self._levels])
+
+    def get_level(self, n_pts, n_pixels):
+        """Get the coarsest level with at least n_pixels bins.
+
+        Parameters
+        ----------
+        n_pts : int
+            Number of time points in the window.
+        n_pixels : int
+            Number of pixels of the canvas.
+
+        Returns
+        -------
+        level : int | None
+            Index of the level. None if raw data should be used instead.
+        """
+        level = None
+        for num, bin_size in enumerate(self.bin_sizes):
+            if n_pts / bin_size >= n_pixels:
+                level = num
+        return level
+
+    def get(self, channels, start, stop, n_pixels):
+        """Get the envelope of a window.
+
+        Parameters
+        ----------
+        channels : array_like
+            Channel selection (indices or boolean mask).
+        start, stop : int
+            First and last (excluded) time points of the window.
+        n_pixels : int
+            Number of pixels of the canvas.
+
+        Returns
+        -------
+        index : array_like | None
+            Time index of each vertex, of shape (2 * n_bins,). None if raw data
+            should be used instead (window too short).
+        env : array_like | None
+            Envelope of shape (n_channels, 2 * n_bins).
+        """
+        level = self.get_level(stop - start, n_pixels)
+        if level is None:
+            return None, None
+        bin_size, env = self._levels[level]
+        b_start, b_stop = start // bin_size, -(-stop // bin_size)
+        index = np.repeat(np.arange(b_start, b_stop) * bin_size, 2)
+        return index, env[channels, 2 * b_start:2 * b_stop]
@@ -0,0 +1,391 @@
+"""Background computation and cache of whole-recording spectrograms.
+
+The spectrogram of a whole night is computed by chunks of segments (Fourier
+and multitaper methods) or of frequencies (wavelets). Between two chunks,
+the progress is reported and the computation can be cancelled. Segments of a
+spectrogram are independent, so that the chunked result is the same as the
+one computed at once.
+
+Spectrograms are kept in a bounded LRU cache keyed by the channel and the
+computation settings : going back to a previous channel or setting is free.
+Spectrograms of all channels can also be precomputed in a process pool.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import signal as scpsig
+
+from visbrain.utils.filtering import PrepareData, morlet_bank
+from visbrain.utils.others import spawn_executor
+from visbrain.utils.sigproc import averaging, normalization
+
+logger = logging.getLogger('visbrain')
+
+__all__ = ('compute_spectrogram', 'SpectrogramCache')
+
+
+def _is_cancelled(cancel):
+    """Get if a computation has been cancelled."""
+    return (cancel is not None) and cancel.is_set()
+
+
+def compute_spectrogram(data, sf, method='Fourier transform', nfft=30.,
+                        overlap=0., fstart=.5, fend=20., norm=0, n_chunks=20,
+                        progress=None, cancel=None):
+    """Compute the spectrogram of a whole recording.
+
+    Parameters
+    ----------
+    data : array_like
+        The data of shape (n_pts,).
+    sf : float
+        The sampling frequency.
+    method : {'Fourier transform', 'Multitaper', 'Wavelet'}
+        Computation method.
+    nfft : float | 30.
+        Number of fft points for the spectrogram (in seconds).
+    overlap : float | 0.
+        Ovelap proprotion (0 <= overlap <1).
+    fstart, fend : float | .5, 20.
+        Frequency range of the wavelets (the Fourier and multitaper
+        spectrograms are computed for all frequencies).
+    norm : int | 0
+        Normalization method of the wavelets. See the `normalization`
+        function.
+    n_chunks : int | 20
+        Number of chunks of computations (progress and cancellation points).
+    progress : callable | None
+        Function progress(fraction) called after each chunk.
+    cancel : threading.Event | None
+        Event checked between chunks. If set, the computation is stopped.
+
+    Returns
+    -------
+    freq : array_like
+        The frequency vector of shape (n_freqs,). None if cancelled.
+    mesh : array_like
+        The spectrogram of shape (n_freqs, n_times) (in dB for the Fourier
+        and multitaper methods). None if cancelled.
+    """
+    data = np.asarray(data).ravel()
+    nperseg = int(round(nfft * sf))
+    n_chunks = max(int(n_chunks), 1)
+
+    if method == 'Wavelet':
+        freqs = np.arange(fstart, fend, 1.)
+        tf = np.zeros((len(freqs), len(data)), dtype=data.dtype)
+        for idx in np.array_split(np.arange(len(freqs)),
+                                  min(n_chunks, len(freqs))):
+            if _is_cancelled(cancel):
+                return None, None
+            tf[idx, :] = morlet_bank(data, sf, freqs[idx], get='power')
+            if progress is not None:
+                progress((idx[-1] + 1) / len(freqs))
+        normalization(tf, norm=norm, axis=1)
+        return freqs, averaging(tf, nperseg, axis=1, overlap=overlap,
+                                window='hamming')
+
+    noverlap = int(round(overlap * nperseg))
+    step = nperseg - noverlap
+    n_seg = max((len(data) - noverlap) // step, 1)
+    if method == 'Multitaper':
+        from lspopt import spectrogram_lspopt
+
+        def _spectro(x):
+            return spectrogram_lspopt(x, fs=sf, nperseg=nperseg,
+                                      c_parameter=20, noverlap=noverlap)
+    elif method == 'Fourier transform':
+        def _spectro(x):
+            return scpsig.spectrogram(x, fs=sf, nperseg=nperseg,
+                                      noverlap=noverlap, window='hamming')
+    else:
+        raise ValueError("%s is not a valid spectrogram method" % method)
+
+    # Chunks of segments (each chunk starts at the beginning of a segment) :
+    meshes = []
+    for seg in np.array_split(np.arange(n_seg), min(n_chunks, n_seg)):
+        if _is_cancelled(cancel):
+            return None, None
+        x = data[seg[0] * step:seg[-1] * step + nperseg]
+        freq, _, mesh = _spectro(x)
+        meshes.append(mesh)
+        if progress is not None:
+            progress((seg[-1] + 1) / n_seg)
+    return freq, 20 * np.log10(np.concatenate(meshes, axis=1))
+
+
+def _compute_channel(data, sf, prep, settings, **kwargs):
+    """Prepare data and compute a spectrogram (also used by processes)."""
+    if prep is not None:
+        data = PrepareData(**dict(prep))._prepare_data(sf, data, None)
+    return compute_spectrogram(data, sf, **dict(settings), **kwargs)
+
+
+class SpectrogramCache(object):
+    """Compute spectrograms in the background and keep them in a cache.
+
+    Parameters
+    ----------
+    max_entries : int | 16
+        Maximum number of spectrograms kept in memory.
+    callback : callable | None
+        Function callback(key) called (from the background thread) when the
+        spectrogram of key is ready.
+    progress : callable | None
+        Function progress(key, fraction) called (from the background thread)
+        during the computation.
+    """
+
+    def __init__(self, max_entries=16, callback=None, progress=None):
+        """Init."""
+        self.max_entries = max(int(max_entries), 1)
+        self._callback, self._progress = callback, progress
+        self._entries = OrderedDict()  # key -> (freq, mesh)
+        self._running = None  # (key, future, cancel event)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pool = None
+        self._precomputing = set()  # futures of precomputed spectrograms
+
+    def __len__(self):
+        """Get the number of cached spectrograms."""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Get if the spectrogram of key is cached."""
+        return key in self._entries
+
+    # ----------- KEY -----------
+    @staticmethod
+    def key(channel, prep=None, method='Fourier transform', nfft=30.,
+            overlap=0., fstart=.5, fend=20., norm=0):
+        """Get the key of a spectrogram.
+
+        Parameters
+        ----------
+        channel : int
+            Index of the channel.
+        prep : PrepareData | None
+            The preprocessing applied to the channel.
+        method, nfft, overlap, fstart, fend, norm :
+            The computation settings. See compute_spectrogram.
+
+        Returns
+        -------
+        key : tuple
+            Hashable key. The frequency range and normalization are only
+            part of the key for wavelets.
+        """
+        if (prep is not None) and not prep:
+            prep = None
+        settings = [('method', method), ('nfft', float(nfft)),
+                    ('overlap', float(overlap))]
+        if method == 'Wavelet':
+            settings += [('fstart', float(fstart)), ('fend', float(fend)),
+                         ('norm', int(norm))]
+        prep = None if prep is None else prep.get_settings()
+        return (int(channel), prep, tuple(settings))
+
+    # ----------- GET -----------
+    def get(self, key):
+        """Get a cached spectrogram.
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the spectrogram (see key).
+
+        Returns
+        -------
+        spectro : tuple | None
+            The (freq, mesh) spectrogram. None if not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def compute(self, key, data, sf):
+        """Compute a spectrogram in the current thread and cache it.
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the spectrogram. The preprocessing described by the
+            key is applied to the data.
+        data : array_like
+            The raw data of the channel of shape (n_pts,).
+        sf : float
+            The sampling frequency.
+
+        Returns
+        -------
+        spectro : tuple
+            The (freq, mesh) spectrogram.
+        """
+        out = self.get(key)
+        if out is None:
+            out = _compute_channel(data, sf, key[1], key[2])
+            self._store(key, out)
+        return out
+
+    def submit(self, key, data, sf):
+        """Compute a spectrogram in the background.
+
+        The computation running for another key is cancelled.
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the spectrogram. The preprocessing described by the
+            key is applied to the data.
+        data : array_like
+            The raw data of the channel of shape (n_pts,).
+        sf : float
+            The sampling frequency.
+
+        Returns
+        -------
+        future : Future | None
+            The future of the computation. None if already cached.
+        """
+        if key in self._entries:
+            return None
+        with self._lock:
+            if self._running is not None:
+                if self._running[0] == key:
+                    return self._running[1]
+                self._running[2].set()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            cancel = threading.Event()
+            fut = self._executor.submit(self._compute, key, data, sf, cancel)
+            self._running = (key, fut, cancel)
+        return fut
+
+    def _compute(self, key, data, sf, cancel):
+        """Compute a spectrogram in the background."""
+        def _progress(fraction):
+            if self._progress is not None:
+                self._progress(key, fraction)
+
+        try:
+            out = _compute_channel(data, sf, key[1], key[2],
+                                   progress=_progress, cancel=cancel)
+        except Exception as e:
+            logger.warning("Spectrogram computation failed (%s)" % e)
+            out = (None, None)
+        with self._lock:
+            if (self._running is not None) and (self._running[0] == key):
+                self._running = None
+        if out[0] is None:
+            logger.debug("Spectrogram computation of %s cancelled" % str(key))
+            return None
+        self._store(key, out)
+        if self._callback is not None:
+            self._callback(key)
+        return out
+
+    def _store(self, key, out):
+        """Cache a spectrogram (least recently used are removed)."""
+        with self._lock:
+            self._entries[key] = out
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ----------- PRECOMPUTE -----------
+    def precompute(self, data, sf, channels=None, prep=None, n_jobs=-1,
+                   **settings):
+        """Precompute spectrograms of several channels in a process pool.
+
+        Parameters
+        ----------
+        data : array_like
+            The data of shape (n_channels, n_pts).
+        sf : float
+            The sampling frequency.
+        channels : array_like | None
+            Indices of the channels. If None, all of the channels are used.
+        prep : PrepareData | None
+            The preprocessing to apply to the channels.
+        n_jobs : int | -1
+            Number of processes. If -1, all of the cpus are used.
+        settings : dict | {}
+            Computation settings (method, nfft, overlap, fstart, fend, norm).
+
+        Returns
+        -------
+        futures : list
+            List of the futures of the computations (spectrograms are cached
+            as soon as they are ready).
+        """
+        if channels is None:
+            channels = range(data.shape[0])
+        keys = [self.key(c, prep=prep, **settings) for c in channels]
+        keys = [k for k in keys if k not in self._entries]
+        if not keys:
+            return []
+        if self._pool is None:
+            # Processes are spawned (forking the GUI could copy held locks) :
+            self._pool = spawn_executor(n_jobs)
+        futures = []
+        for k in keys:
+            fut = self._pool.submit(_compute_channel, np.asarray(data[k[0],
+                                    :]), sf, k[1], k[2])
+            with self._lock:
+                self._precomputing.add(fut)
+            fut.add_done_callback(self._precomputed(k))
+            futures.append(fut)
+        logger.info("Precomputing %i spectrograms" % len(keys))
+        return futures
+
+    def _precomputed(self, key):
+        """Get the function caching a precomputed spectrogram."""
+        def _done(fut):
+            with self._lock:
+                self._precomputing.discard(fut)
+            if fut.cancelled() or (fut.exception() is not None):
+                return
+            self._store(key, fut.result())
+            if self._callback is not None:
+                self._callback(key)
+        return _done
+
+    def wait(self):
+        """Wait until the background computation is done."""
+        running = self._running
+        if running is not None:
+            running[1].result()
+
+    def cancel(self):
+        """Cancel the background computation."""
+        with self._lock:
+            if self._running is not None:
+                self._running[2].set()
+                self._running = None
+
+    def clear(self):
+        """Cancel the background computation and remove all spectrograms."""
+        self.cancel()
+        with self._lock:
+            self._entries.clear()
+
+    def close(self):
+        """Clear the cache and stop the workers."""
+        self.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._pool is not None:
+            # Precomputations that didn't start are cancelled :
+            with self._lock:
+                futures = list(self._precomputing)
+            for fut in futures:
+                fut.cancel()
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -1,10 +1,64 @@
 """Test functions in detections.py."""
+import logging
+from time import perf_counter
+
 import numpy as np
 
 from visbrain.utils.sleep.detection import (kcdetect, spindlesdetect,
                                             remdetect, slowwavedetect,
-                                            mtdetect, peakdetect)
+                                            mtdetect, peakdetect,
+                                            _stage_segments)
 from visbrain.utils import generate_eeg
+from visbrain.tests._tests_visbrain import benchmark
+
+logger = logging.getLogger('visbrain')
+
+
+def _peakdetect_loop(y_axis, lookahead=200, delta=1., get='max',
+                     threshold='auto'):
+    """Sample by sample peak detection (reference implementation)."""
+    from scipy.signal import detrend
+    y_axis = np.asarray(y_axis)
+    length = len(y_axis)
+    max_peaks, min_peaks, dump = [], [], []
+    mn, mx = np.inf, -np.inf
+    if threshold is not None:
+        if threshold == 'auto':
+            threshold = np.std(y_axis)
+        y_axisp = detrend(y_axis)
+        y_axisp -= y_axisp.mean()
+        above = np.abs(y_axisp) >= threshold
+        zp = zip(np.arange(length)[above], y_axis[above])
+    else:
+        zp = zip(np.arange(length)[:-lookahead], y_axis[:-lookahead])
+    for index, y in zp:
+        if y > mx:
+            mx = y
+        if y < mn:
+            mn = y
+        if y < mx - delta and mx != np.inf:
+            if y_axis[index:index + lookahead].max() < mx:
+                max_peaks.append(index)
+                dump.append(True)
+                mx = mn = np.inf
+                if index + lookahead >= length:
+                    break
+                continue
+        if y > mn + delta and mn != -np.inf:
+            if y_axis[index:index + lookahead].min() > mn:
+                min_peaks.append(index)
+                dump.append(False)
+                mn = mx = -np.inf
+                if index + lookahead >= length:
+                    break
+    if not (min_peaks and max_peaks):
+        return np.array([])
+    if threshold is None:
+        (max_peaks if dump[0] else min_peaks).pop(0)
+    index = {'max': max_peaks, 'min': min_peaks,
+             'minmax': sorted(min_peaks + max_peaks)}[get]
+    return np.c_[index, index]
+
 
 """If tests continue to failed, one idea could be to save in a npz file the
 signal to test.
@@ -32,11 +86,31 @@ class TestDetections(object):
     def test_spindlesdetect(self):
         """Test function spindlesdetect."""
         spindlesdetect(signal, sf, .1, hypno, True)
+        # Very short NREM segments :
+        for n_nrem in [1, 5, 10]:
+            short = np.zeros((n_pts,))
+            short[2000:2000 + n_nrem] = 2
+            idx = spindlesdetect(signal, sf, .1, short, True)
+            assert (short[idx] == 2).all()
 
     def test_remdetect(self):
         """Test function remdetect."""
         remdetect(signal, sf, hypno, True, .1)
 
+    def test_stage_segments(self):
+        """Test detections restricted to sleep stages."""
+        segments, padded = _stage_segments(hypno == 4, n_pts, sf, pad_s=1.)
+        np.testing.assert_array_equal(segments, [[4 * n_per_seg,
+                                                  5 * n_per_seg - 1]])
+        np.testing.assert_array_equal(padded, [[4 * n_per_seg - 100,
+                                                5 * n_per_seg + 99]])
+        # Events are inside the target stages :
+        is_nrem = (hypno >= 1) & (hypno != 4)
+        idx = spindlesdetect(signal, sf, .1, hypno, True, adapt_band=False)
+        assert len(idx) and is_nrem[idx].all()
+        idx = remdetect(signal, sf, hypno, True, .1)
+        assert len(idx) and (hypno[idx] == 4).all()
+
     def test_slowwavedetect(self):
         """Test function slowwavedetect."""
         slowwavedetect(signal, sf, .8)
@@ -52,3 +126,36 @@ class TestDetections(object):
         peakdetect(sf, data, get='min')
         peakdetect(sf, data, get='max')
         peakdetect(sf, data, get='minmax', threshold=.6)
+
+    def test_peakdetect_equivalence(self):
+        """Compare peakdetect with the sample by sample implementation."""
+        rnd = np.random.RandomState(0)
+        noisy = np.cumsum(rnd.randn(5000))
+        for data in [signal, noisy, rnd.randn(3000)]:
+            for kw in [dict(lookahead=50), dict(lookahead=3, delta=.5),
+                       dict(lookahead=200, delta=0., threshold=None),
+                       dict(lookahead=20, threshold=.5),
+                       dict(lookahead=1, threshold=None)]:
+                for get in ['min', 'max', 'minmax']:
+                    ref = _peakdetect_loop(data, get=get, **kw)
+                    idx = peakdetect(sf, data, get=get, **kw)
+                    np.testing.assert_array_equal(idx, ref)
+
+    @benchmark
+    def test_peakdetect_benchmark(self):
+        """Benchmark peakdetect against the sample by sample implementation."""
+        rnd = np.random.RandomState(0)
+        for n in [10000, 100000, 1000000]:
+            data = np.cumsum(rnd.randn(n))
+            for kw in [dict(lookahead=50), dict(lookahead=200, delta=0.,
+                                                threshold=None)]:
+                t_start = perf_counter()
+                ref = _peakdetect_loop(data, get='minmax', **kw)
+                t_loop = perf_counter() - t_start
+                t_start = perf_counter()
+                idx = peakdetect(sf, data, get='minmax', **kw)
+                t_vec = perf_counter() - t_start
+                np.testing.assert_array_equal(idx, ref)
+                logger.info("peakdetect (%i points, %s) : %.4fs (loop : "
+                            "%.4fs, x%.1f)" % (n, kw, t_vec, t_loop,
+                                               t_loop / t_vec))
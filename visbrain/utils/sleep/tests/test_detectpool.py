@@ -0,0 +1,103 @@
+"""Test functions in detectpool.py."""
+import os
+
+import numpy as np
+import pytest
+
+from visbrain.utils import generate_eeg
+from visbrain.utils.sleep.detectpool import (format_detection, run_detection,
+                                             SharedArray, ParallelDetection)
+
+
+sf, n_pts = 100., 10014
+data = np.stack([np.squeeze(generate_eeg(sf=sf, n_pts=n_pts, random_state=k)[
+    0]) for k in range(3)])
+hypno = np.repeat([0, 1, 2, 3, 4, -1], n_pts // 6 + 1)[:n_pts]
+
+
+class TestDetectPool(object):
+    """Test functions in detectpool.py."""
+
+    def test_format_detection(self):
+        """Test function format_detection."""
+        index = np.array([[2, 5], [8, 9]])
+        np.testing.assert_array_equal(format_detection(index, 10), index)
+        is_event = np.zeros((10,), dtype=bool)
+        is_event[[2, 3, 4, 5, 8, 9]] = True
+        np.testing.assert_array_equal(format_detection(is_event, 10), index)
+        assert not format_detection([], 10).size
+
+    def test_shared_array(self):
+        """Test the SharedArray."""
+        shared = SharedArray.from_array(data)
+        arr = SharedArray.attach(shared.spec)
+        np.testing.assert_array_equal(arr, data)
+        del arr
+        shared.close()
+        assert not os.path.isfile(shared.spec[0])
+        # Empty arrays :
+        shared = SharedArray.from_array(np.array([]))
+        assert not SharedArray.attach(shared.spec).size
+        shared.close()
+
+    def test_file_spec(self, tmpdir):
+        """Test sharing arrays already mapped onto a file."""
+        f = str(tmpdir.join('data.npy'))
+        np.save(f, data)
+        arr = np.load(f, mmap_mode='r')
+        np.testing.assert_array_equal(SharedArray.attach(
+            SharedArray.file_spec(arr)), data)
+        # Copy-on-write maps, views and arrays are not shared :
+        assert SharedArray.file_spec(np.load(f, mmap_mode='c')) is None
+        assert SharedArray.file_spec(arr[1:, :]) is None
+        assert SharedArray.file_spec(data) is None
+
+    def test_parallel_detection(self, tmpdir):
+        """Test the ParallelDetection."""
+        results = {}
+
+        def _callback(run_id, channel, index, elapsed):
+            results[channel] = (run_id, index)
+        pool = ParallelDetection(n_jobs=2)
+        kw = dict(threshold=.1, nrem_only=True)
+        f = str(tmpdir.join('data.npy'))
+        np.save(f, data)
+        # In-memory and memory-mapped data :
+        for d in [data, np.load(f, mmap_mode='r')]:
+            results.clear()
+            run_id = pool.run('Spindles', d, sf, [0, 2], hypno=hypno,
+                              callback=_callback, **kw)
+            pool.wait()
+            assert sorted(results.keys()) == [0, 2]
+            for c in [0, 2]:
+                ref = run_detection('Spindles', data[c, :], sf, hypno, **kw)
+                assert results[c][0] == run_id
+                np.testing.assert_array_equal(results[c][1], ref)
+            assert not pool.is_running
+        # Cancelled detections are ignored :
+        results.clear()
+        pool.run('Slow waves', data, sf, range(3), callback=_callback,
+                 threshold=.8)
+        run = pool._run
+        pool.cancel()
+        pool.wait()
+        assert not pool.is_running and len(results) <= 3
+        # Shared files are removed once the running detections are over :
+        run.done.wait(60.)
+        assert not run.shared
+        pool.close()
+
+    def test_broken_pool(self):
+        """Test that a killed process doesn't break later detections."""
+        results = {}
+
+        def _callback(run_id, channel, index, elapsed):
+            results[channel] = index
+        pool = ParallelDetection(n_jobs=1)
+        with pytest.raises(Exception):
+            pool._submit(os._exit, 1).result()
+        pool.run('Slow waves', data, sf, [1], callback=_callback,
+                 threshold=.8)
+        pool.wait()
+        assert results[1] is not None
+        pool.close()
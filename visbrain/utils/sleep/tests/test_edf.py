@@ -0,0 +1,116 @@
+"""Test functions in edf.py."""
+import numpy as np
+from scipy.signal import resample_poly
+import pytest
+
+from visbrain.utils.sleep.edf import Edf
+from visbrain.io.read_sleep import read_edf
+
+
+def _write_edf(path, data, n_sam_rec, record_length=1.):
+    """Write a minimal EDF file.
+
+    data is a list of int16 arrays (one per channel) of length
+    n_records * n_sam_rec[k].
+    """
+    n_chan = len(data)
+    n_rec = len(data[0]) // n_sam_rec[0]
+
+    def _f(val, n):
+        return str(val).ljust(n)[:n].encode('ascii')
+
+    hdr = _f('0', 8) + _f('subj', 80) + _f('rec', 80)
+    hdr += _f('01.02.18', 8) + _f('10.20.30', 8)
+    hdr += _f(256 * (n_chan + 1), 8) + _f('', 44) + _f(n_rec, 8)
+    hdr += _f(record_length, 8) + _f(n_chan, 4)
+    hdr += b''.join([_f('chan%i' % k, 16) for k in range(n_chan)])
+    hdr += b''.join([_f('', 80) for k in range(n_chan)])
+    hdr += b''.join([_f('uV', 8) for k in range(n_chan)])
+    hdr += b''.join([_f(-100 * (k + 1), 8) for k in range(n_chan)])
+    hdr += b''.join([_f(100 * (k + 1), 8) for k in range(n_chan)])
+    hdr += b''.join([_f(-32768, 8) for k in range(n_chan)])
+    hdr += b''.join([_f(32767, 8) for k in range(n_chan)])
+    hdr += b''.join([_f('', 80) for k in range(n_chan)])
+    hdr += b''.join([_f(n_sam_rec[k], 8) for k in range(n_chan)])
+    hdr += b''.join([_f('', 32) for k in range(n_chan)])
+    records = []
+    for r in range(n_rec):
+        for k in range(n_chan):
+            sl = slice(r * n_sam_rec[k], (r + 1) * n_sam_rec[k])
+            records.append(data[k][sl].astype('<i2').tobytes())
+    with open(path, 'wb') as f:
+        f.write(hdr + b''.join(records))
+
+
+class TestEdf(object):
+    """Test functions in edf.py."""
+
+    @staticmethod
+    def _get_edf(tmpdir):
+        rnd = np.random.RandomState(0)
+        n_sam_rec = [20, 20, 5, 20]
+        n_rec = 7
+        data = [rnd.randint(-32768, 32767, n_rec * k) for k in n_sam_rec]
+        path = str(tmpdir.join('test.edf'))
+        _write_edf(path, data, n_sam_rec)
+        return Edf(path), data
+
+    def test_read_hdr(self, tmpdir):
+        """Test header reading."""
+        edf, _ = self._get_edf(tmpdir)
+        assert edf.hdr['n_records'] == 7
+        assert edf.hdr['n_samples_per_record'] == [20, 20, 5, 20]
+        assert edf.hdr['label'] == ['chan0', 'chan1', 'chan2', 'chan3']
+
+    def test_read_dat(self, tmpdir):
+        """Test function _read_dat."""
+        edf, data = self._get_edf(tmpdir)
+        for k, (beg, end) in enumerate([(0, 140), (13, 77), (2, 35)]):
+            chan = 2 if k == 2 else k
+            np.testing.assert_array_equal(edf._read_dat(chan, beg, end),
+                                          data[chan][beg:end])
+
+    def test_return_dat(self, tmpdir):
+        """Test function return_dat."""
+        edf, data = self._get_edf(tmpdir)
+        hdr = edf.hdr
+        gain = (hdr['physical_max'] - hdr['physical_min']) / (
+            hdr['digital_max'] - hdr['digital_min'])
+        chan, beg, end = [3, 0], 17, 121
+        ref = np.array([(data[k][beg:end] - hdr['digital_min'][k]) * gain[k] +
+                        hdr['physical_min'][k] for k in chan])
+        # Indices / names / float32 :
+        dat = edf.return_dat(chan, beg, end)
+        assert dat.dtype == np.float32
+        np.testing.assert_allclose(dat, ref, rtol=1e-5, atol=1e-3)
+        dat = edf.return_dat(['chan3', 'chan0'], beg, end, dtype=np.float64)
+        np.testing.assert_allclose(dat, ref)
+        # Pre-allocated output :
+        out = np.zeros((2, end - beg), dtype=np.float64)
+        dat = edf.return_dat(chan, beg, end, out=out)
+        assert dat is out
+        np.testing.assert_allclose(out, ref)
+        # Errors :
+        with pytest.raises(ValueError):
+            edf.return_dat([0, 2], beg, end)
+        with pytest.raises(ValueError):
+            edf.return_dat([0], 0, 141)
+        with pytest.raises(ValueError):
+            edf.return_dat([0], 0, 10, out=np.zeros((2, 10)))
+
+    def test_read_edf_mixed_rates(self, tmpdir):
+        """Test that channels with lower rates are resampled (read_edf)."""
+        edf, data = self._get_edf(tmpdir)
+        for preload in [True, False]:
+            sf, ds, dsf, dat, chan, n, _, _ = read_edf(edf.filename, 10.,
+                                                       preload=preload)
+            assert (sf, ds, dsf, n) == (20., 10., 2, 140)
+            assert chan == ['chan0', 'chan1', 'chan2', 'chan3']
+            assert dat.shape == (4, 70)
+            # Channel 2 is sampled at 5Hz (up-sampled by 2) :
+            gain = (edf.hdr['physical_max'] - edf.hdr['physical_min']) / (
+                edf.hdr['digital_max'] - edf.hdr['digital_min'])
+            ref = (data[2] - edf.hdr['digital_min'][2]) * gain[2] + \
+                edf.hdr['physical_min'][2]
+            np.testing.assert_allclose(dat[2, :], resample_poly(ref, 2, 1),
+                                       rtol=1e-4, atol=1e-3)
@@ -2,7 +2,11 @@
 import numpy as np
 
 from visbrain.utils.sleep.event import (_events_distance_fill,
-                                        _events_to_index, _index_to_events)
+                                        _events_to_index, _index_to_events,
+                                        _mask_to_events, _events_to_mask,
+                                        _events_merge, _events_extend,
+                                        _events_duration, _events_intersect,
+                                        _events_ptp)
 
 
 class TestEvent(object):
@@ -22,13 +26,72 @@ class TestEvent(object):
 
     def test_events_distance_fill(self):
         """Test function events_distance_fill."""
-        _events_distance_fill(self._get_index(), 200., 100.)
+        index = self._get_index()
+        assert np.array_equal(_events_distance_fill(index, 10., 100.), index)
+        np.testing.assert_array_equal(_events_distance_fill(index, 40., 100.),
+                                      np.r_[np.arange(11), np.arange(14, 20)])
+        np.testing.assert_array_equal(_events_distance_fill(index, 200., 100.),
+                                      np.arange(20))
 
     def test_event_to_index(self):
         """Test function event_to_index."""
-        _events_to_index(self._get_index())
+        np.testing.assert_array_equal(_events_to_index(self._get_index()),
+                                      [[0, 4], [7, 10], [14, 19]])
+        assert _events_to_index([]).shape == (0, 2)
 
     def test_index_to_event(self):
         """Test function index_to_event."""
         idx = _events_to_index(self._get_index())
-        _index_to_events(idx)
+        np.testing.assert_array_equal(_index_to_events(idx),
+                                      self._get_index())
+
+    def test_mask_to_events(self):
+        """Test functions mask_to_events and events_to_mask."""
+        mask = np.zeros((25,), dtype=bool)
+        mask[self._get_index()] = True
+        events = _mask_to_events(mask)
+        np.testing.assert_array_equal(events, [[0, 4], [7, 10], [14, 19]])
+        np.testing.assert_array_equal(_events_to_mask(events, 25), mask)
+
+    def test_events_merge(self):
+        """Test function events_merge."""
+        events = np.array([[0, 4], [2, 3], [5, 6], [10, 12], [20, 22]])
+        np.testing.assert_array_equal(_events_merge(events),
+                                      [[0, 6], [10, 12], [20, 22]])
+        np.testing.assert_array_equal(_events_merge(events, 50., 100.),
+                                      [[0, 12], [20, 22]])
+
+    def test_events_extend(self):
+        """Test function events_extend."""
+        hard = np.array([[3, 4], [6, 8], [30, 31], [50, 51]])
+        soft = np.array([[1, 5], [6, 12], [14, 20], [29, 35]])
+        np.testing.assert_array_equal(_events_extend(hard, soft),
+                                      [[1, 12], [29, 35], [50, 51]])
+
+    def test_events_duration(self):
+        """Test function events_duration."""
+        events = np.array([[0, 10], [20, 50], [60, 200]])
+        np.testing.assert_array_equal(_events_duration(events, 100., 150.,
+                                                       1000.), [[20, 50]])
+        assert len(_events_duration(events, 100., tmin=200.)) == 2
+
+    def test_events_intersect(self):
+        """Test function events_intersect."""
+        events = np.array([[0, 10], [15, 40], [60, 70]])
+        segments = np.array([[5, 20], [25, 30], [35, 65]])
+        np.testing.assert_array_equal(
+            _events_intersect(events, segments),
+            [[5, 10], [15, 20], [25, 30], [35, 40], [60, 65]])
+        # Compare with the per-sample intersection :
+        rnd = np.random.RandomState(0)
+        m_1, m_2 = rnd.rand(1000) > .5, rnd.rand(1000) > .3
+        np.testing.assert_array_equal(_events_intersect(
+            _mask_to_events(m_1), _mask_to_events(m_2)),
+            _mask_to_events(m_1 & m_2))
+
+    def test_events_ptp(self):
+        """Test function events_ptp."""
+        data = np.random.rand(1000)
+        events = np.array([[10, 50], [75, 100], [200, 999]])
+        amp = [np.ptp(data[start:stop]) for start, stop in events]
+        np.testing.assert_array_almost_equal(_events_ptp(data, events), amp)
@@ -1,7 +1,10 @@
 """Test functions in hypnoprocessing.py."""
 import numpy as np
+import pytest
 
-from visbrain.utils.sleep.hypnoprocessing import (transient, sleepstats)
+from visbrain.utils.sleep.hypnoprocessing import (transient, sleepstats,
+                                                  hypno_lut, hypno_lookup,
+                                                  RLEHypnogram)
 
 
 class TestHypnoprocessing(object):
@@ -19,7 +22,67 @@ class TestHypnoprocessing(object):
         _, idx_time, _ = transient(data, time)
         assert np.array_equal(index / 2., idx_time)
 
+    def test_rle_hypnogram(self):
+        """Test the RLEHypnogram class."""
+        rnd = np.random.RandomState(0)
+        hypno = np.repeat(rnd.randint(-1, 5, 50), rnd.randint(1, 100, 50))
+        rle = RLEHypnogram.from_array(hypno)
+        assert len(rle) == len(hypno) and rle.shape == hypno.shape
+        assert rle.n_segments == len(transient(hypno)[0]) + 1
+        assert np.array_equal(np.asarray(rle), hypno)
+        # Indexing :
+        assert rle[10] == hypno[10] and rle[-1] == hypno[-1]
+        assert np.array_equal(rle[100:1000], hypno[100:1000])
+        assert np.array_equal(rle[3::7], hypno[3::7])
+        assert np.array_equal(rle[[0, 5, -2]], hypno[[0, 5, -2]])
+        # Edition :
+        for start, stop, value in [(10, 500, 2), (0, 1, 3), (400, 401, 2),
+                                   (len(hypno) - 5, len(hypno) + 10, 0)]:
+            hypno[start:stop] = value
+            rle[start:stop] = value
+            assert np.array_equal(np.asarray(rle), hypno)
+            assert rle.n_segments == len(transient(hypno)[0]) + 1
+        # Transient :
+        time = np.arange(len(hypno)) / 10.
+        for res, ref in zip(transient(rle, time), transient(hypno, time)):
+            assert np.array_equal(res, ref)
+        # Down / over-sampling :
+        for dsf in [1, 2, 3, 10]:
+            assert np.array_equal(np.asarray(rle.downsample(dsf)),
+                                  hypno[::dsf])
+        over = RLEHypnogram.from_array([0, 1, 1, 2]).oversample(10)
+        assert np.array_equal(np.asarray(over), [0, 0, 1, 1, 1, 1, 2, 2, 2, 2])
+
+    def test_hypno_lut(self):
+        """Test functions hypno_lut and hypno_lookup."""
+        hvalues = [-1, 0, 4, 1, 2, 3]
+        ypos = [0., -1., -2., -3., -4., -5.]
+        colors = np.random.rand(6, 4)
+        hypno = np.random.randint(-1, 5, (2000,)).astype(np.float32)
+        lut, vmin = hypno_lut(hvalues, ypos)
+        assert vmin == -1 and lut.shape == (6,)
+        ref = np.array([dict(zip(hvalues, ypos))[v] for v in hypno])
+        assert np.array_equal(hypno_lookup(lut, vmin, hypno), ref)
+        # Inverse table (position -> value) :
+        inv, vinv = hypno_lut(-np.array(ypos), hvalues)
+        assert np.array_equal(hypno_lookup(inv, vinv, -ref), hypno)
+        lut, vmin = hypno_lut(hvalues, colors)
+        ref = np.array([dict(zip(hvalues, colors))[v] for v in hypno])
+        assert np.array_equal(hypno_lookup(lut, vmin, hypno), ref)
+        with pytest.raises(ValueError):
+            hypno_lookup(*hypno_lut(hvalues, ypos), [5])
+
     def test_sleepstats(self):
         """Test function sleepstats."""
         hypno = np.random.randint(-1, 3, (2000,))
         sleepstats(hypno, 100.)
+
+    def test_sleepstats_rle(self):
+        """Test function sleepstats on run-length encoded hypnograms."""
+        hstates, hvalues = ['Art', 'Wake', 'N1', 'N2'], [-1, 0, 1, 2]
+        hypno = np.repeat(np.random.randint(-1, 3, (100,)), 600)
+        ref = sleepstats(hypno, 100., hstates, hvalues)
+        res = sleepstats(RLEHypnogram.from_array(hypno), 100., hstates,
+                         hvalues)
+        assert ref.pop('Units') == res.pop('Units')
+        np.testing.assert_array_equal(list(ref.values()), list(res.values()))
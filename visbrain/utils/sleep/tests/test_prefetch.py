@@ -0,0 +1,52 @@
+"""Test functions in prefetch.py."""
+import numpy as np
+
+from visbrain.utils.sleep.prefetch import WindowPrefetcher
+
+
+class TestWindowPrefetcher(object):
+    """Test functions in prefetch.py."""
+
+    @staticmethod
+    def _get_prefetcher(**kwargs):
+        data = np.random.RandomState(0).rand(2, 1000)
+        calls = []
+
+        def fcn(start, stop, key):
+            calls.append((start, stop, key))
+            return data[:, start:stop] * key
+
+        return WindowPrefetcher(fcn, data.shape[1], **kwargs), data, calls
+
+    def test_predict(self):
+        """Test function predict."""
+        pf, _, _ = self._get_prefetcher(depth=2)
+        # Without previous move, the next windows are predicted :
+        assert pf.predict(100, 200) == [(200, 300), (300, 400), (0, 100)]
+        # Backward navigation with a step of 50 :
+        pf._last = (None, 150, 250)
+        assert pf.predict(100, 200) == [(50, 150), (0, 100), (150, 250)]
+        # Windows outside of the recording are ignored :
+        pf._last = None
+        assert pf.predict(850, 950) == [(750, 850)]
+
+    def test_get(self):
+        """Test function get."""
+        pf, data, calls = self._get_prefetcher(depth=1, max_windows=4)
+        np.testing.assert_array_equal(pf.get(0, 100, 2.), 2. * data[:, :100])
+        pf.wait()
+        assert (2., 100, 200) in pf and pf.misses == 1
+        n_calls = len(calls)
+        # Page turn (already prepared) :
+        np.testing.assert_array_equal(pf.get(100, 200, 2.),
+                                      2. * data[:, 100:200])
+        assert pf.hits == 1 and len(calls) == n_calls
+        pf.wait()
+        assert (2., 200, 300) in pf and len(pf) <= 4
+        # Other settings are never mixed :
+        np.testing.assert_array_equal(pf.get(100, 200, 3.),
+                                      3. * data[:, 100:200])
+        assert pf.misses == 2
+        pf.clear()
+        assert len(pf) == 0
+        pf.close()
@@ -0,0 +1,68 @@
+"""Test functions in prepcache.py."""
+import numpy as np
+
+from visbrain.utils.filtering import PrepareData
+from visbrain.utils.sleep.prepcache import PreparedCache
+
+
+class TestPreparedCache(object):
+    """Test functions in prepcache.py."""
+
+    @staticmethod
+    def _get_data():
+        return np.random.RandomState(0).rand(5, 20000).astype(np.float32)
+
+    def test_key(self):
+        """Test function key."""
+        prep = PrepareData(axis=1)
+        assert PreparedCache.key(prep) is None
+        prep.filt = True
+        key = PreparedCache.key(prep)
+        assert key == PreparedCache.key(prep)
+        prep.fend = 20.
+        assert key != PreparedCache.key(prep)
+
+    def test_get(self):
+        """Test function get."""
+        data, sf = self._get_data(), 100.
+        calls = []
+        cache = PreparedCache(data, sf, chunk_size=2,
+                              callback=lambda: calls.append(1))
+        prep = PrepareData(axis=1, filt=True, fstart=1., fend=10.,
+                           way='filtfilt')
+        sl = slice(1000, 3000)
+        # Not filtered / not computed yet :
+        assert cache.get(PrepareData(axis=1), [0, 1], sl) is None
+        assert cache.get(prep, [0, 2, 4], sl) is None
+        cache.wait()
+        assert len(cache) == 3 and len(calls) == 1
+        # Slices of the filtered whole recording :
+        ref = prep._prepare_data(sf, data, None)
+        np.testing.assert_allclose(cache.get(prep, [0, 2, 4], sl),
+                                   ref[[0, 2, 4], sl], rtol=1e-5, atol=1e-6)
+        # Other settings :
+        prep.dispas = 'amplitude'
+        assert cache.get(prep, [1], sl) is None
+        cache.wait()
+        ref = prep._prepare_data(sf, data[[1], :], None)
+        np.testing.assert_allclose(cache.get(prep, [1], sl), ref[:, sl],
+                                   rtol=1e-5, atol=1e-6)
+        cache.close()
+
+    def test_evict(self):
+        """Test the size-bounded eviction."""
+        data = self._get_data()
+        cache = PreparedCache(data, 100., max_size=2.5 * 20000 * 4 / 1024 ** 3)
+        prep = PrepareData(axis=1, filt=True, fstart=1., fend=10.)
+        cache.get(prep, [0, 1], None)
+        cache.wait()
+        cache.get(prep, [0], None)  # last access for the first channel
+        cache.get(prep, [2], None)
+        cache.wait()
+        assert len(cache) == 2 and cache.size <= cache.max_size * 1024 ** 3
+        assert cache.get(prep, [0, 2], None) is not None
+        # Too many channels to fit in the cache :
+        assert cache.get(prep, [0, 1, 2, 3], None) is None
+        assert not cache._pending
+        cache.clear()
+        assert len(cache) == 0
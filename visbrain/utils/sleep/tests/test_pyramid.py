@@ -0,0 +1,48 @@
+"""Test functions in pyramid.py."""
+import numpy as np
+
+from visbrain.utils.sleep.pyramid import minmax_envelope, MinMaxPyramid
+
+
+class TestPyramid(object):
+    """Test functions in pyramid.py."""
+
+    @staticmethod
+    def _get_data():
+        return np.random.RandomState(0).rand(3, 100003).astype(np.float32)
+
+    def test_minmax_envelope(self):
+        """Test function minmax_envelope."""
+        data = self._get_data()
+        env = minmax_envelope(data, 10)
+        assert env.shape == (3, 2 * 10001)
+        np.testing.assert_array_equal(env[:, 0], data[:, :10].min(1))
+        np.testing.assert_array_equal(env[:, 1], data[:, :10].max(1))
+        np.testing.assert_array_equal(env[:, -2], data[:, -3:].min(1))
+        np.testing.assert_array_equal(env[:, -1], data[:, -3:].max(1))
+
+    def test_pyramid(self):
+        """Test the MinMaxPyramid class."""
+        data = self._get_data()
+        pyr = MinMaxPyramid(data, base=16, factor=4, min_bins=100,
+                            chunk_size=1000)
+        assert pyr.bin_sizes == [16, 64, 256, 1024]
+        # Each level is the envelope of the raw data :
+        for bin_size, env in pyr._levels:
+            np.testing.assert_array_equal(env, minmax_envelope(data,
+                                                               bin_size))
+        # Short windows use raw data :
+        assert pyr.get([0], 0, 1000, 500) == (None, None)
+        # Number of vertices ~ 2 x pixels :
+        visible = np.array([True, False, True])
+        for n_pts in [20000, 60000, 100000]:
+            index, env = pyr.get(visible, 3, 3 + n_pts, 50)
+            assert env.shape[0] == 2
+            assert env.shape[1] == len(index)
+            assert 100 <= len(index) <= 2 * 4 * 50 + 4
+            bin_size = index[2] - index[0]
+            covered = data[visible, index[0]:index[-1] + bin_size]
+            np.testing.assert_array_equal(env[:, 0::2].min(1),
+                                          covered.min(1))
+            np.testing.assert_array_equal(env[:, 1::2].max(1),
+                                          covered.max(1))
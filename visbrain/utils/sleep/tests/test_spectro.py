@@ -0,0 +1,93 @@
+"""Test functions in spectro.py."""
+import threading
+import time
+
+import numpy as np
+from scipy.signal import spectrogram
+
+from visbrain.utils.filtering import PrepareData
+from visbrain.utils.sleep.spectro import compute_spectrogram, SpectrogramCache
+
+
+class TestSpectro(object):
+    """Test functions in spectro.py."""
+
+    @staticmethod
+    def _get_data():
+        return np.random.RandomState(0).rand(3, 100000).astype(np.float32)
+
+    def test_compute_spectrogram(self):
+        """Test function compute_spectrogram."""
+        data, sf = self._get_data()[0, :], 100.
+        # Chunked spectrogram is the same as the one computed at once :
+        for overlap in [0., .5]:
+            freq, mesh = compute_spectrogram(data, sf, nfft=10.,
+                                             overlap=overlap, n_chunks=7)
+            f_ref, _, m_ref = spectrogram(data, fs=sf, nperseg=1000,
+                                          noverlap=int(overlap * 1000),
+                                          window='hamming')
+            np.testing.assert_array_equal(freq, f_ref)
+            np.testing.assert_allclose(mesh, 20 * np.log10(m_ref), rtol=1e-4)
+        # Progress and cancellation :
+        fractions, cancel = [], threading.Event()
+
+        def _progress(fraction):
+            fractions.append(fraction)
+            if len(fractions) == 2:
+                cancel.set()
+        out = compute_spectrogram(data, sf, nfft=10., n_chunks=5,
+                                  progress=_progress, cancel=cancel)
+        assert out == (None, None) and len(fractions) == 2
+        compute_spectrogram(data, sf, method='Wavelet', fstart=1., fend=5.,
+                            progress=fractions.append)
+        assert fractions[-1] == 1.
+
+    def test_cache(self):
+        """Test the SpectrogramCache."""
+        data, sf = self._get_data(), 100.
+        ready, progress = [], []
+        cache = SpectrogramCache(max_entries=2, callback=ready.append,
+                                 progress=lambda k, f: progress.append(f))
+        prep = PrepareData(axis=0)
+        assert cache.key(0, prep) == cache.key(0, None)
+        assert cache.key(0, nfft=10.) != cache.key(0, nfft=10., overlap=.5)
+        key = cache.key(1, prep, nfft=10.)
+        cache.submit(key, data[1, :], sf)
+        cache.wait()
+        assert ready == [key] and progress[-1] == 1.
+        assert cache.submit(key, data[1, :], sf) is None
+        freq, mesh = cache.get(key)
+        np.testing.assert_array_equal(
+            mesh, compute_spectrogram(data[1, :], sf, nfft=10.)[1])
+        # Preprocessing is part of the key :
+        prep.demean = True
+        key_prep = cache.key(1, prep, nfft=10.)
+        assert key_prep != key and cache.get(key_prep) is None
+        cache.compute(key_prep, data[1, :], sf)
+        # Least recently used are removed :
+        cache.compute(cache.key(2, nfft=10.), data[2, :], sf)
+        assert len(cache) == 2 and key not in cache
+        cache.close()
+
+    def test_precompute(self):
+        """Test function precompute."""
+        data, sf = self._get_data(), 100.
+        cache = SpectrogramCache()
+        futures = cache.precompute(data, sf, n_jobs=2, nfft=10.)
+        [k.result() for k in futures]
+        # Results are cached by the done callbacks of the futures :
+        t_start = time.time()
+        while (len(cache) < 3) and (time.time() - t_start < 10.):
+            time.sleep(.01)
+        assert len(cache) == 3
+        for c in range(3):
+            mesh = cache.get(cache.key(c, nfft=10.))[1]
+            np.testing.assert_array_equal(
+                mesh, compute_spectrogram(data[c, :], sf, nfft=10.)[1])
+        assert cache.precompute(data, sf, nfft=10.) == []
+        cache.close()
+        # Pending precomputations are cancelled when the cache is closed :
+        cache = SpectrogramCache()
+        futures = cache.precompute(np.tile(data, (10, 1)), sf, n_jobs=1)
+        cache.close()
+        assert any([k.cancelled() for k in futures])
@@ -3,8 +3,11 @@ import numpy as np
 import math
 from itertools import product
 
+from scipy.signal import resample_poly
+
 from visbrain.utils.filtering import (filt, morlet, ndmorlet, morlet_power,
-                                      welch_power, PrepareData)
+                                      morlet_bank, welch_power, resample,
+                                      PrepareData, _morlet_wlt)
 
 
 class TestFiltering(object):
@@ -32,16 +35,56 @@ class TestFiltering(object):
         for k in self:
             filt(sf, f, x, *k)
 
+    def test_resample(self):
+        """Test resample function."""
+        x = np.random.rand(3, 10001)
+        for up, down in [(1, 5), (2, 5), (3, 2), (1, 1)]:
+            x_ref = resample_poly(x, up, down, axis=-1)
+            x_res = resample(x, up, down, n_jobs=2, chunk_size=300,
+                             dtype=np.float64)
+            np.testing.assert_allclose(x_res, x_ref)
+        np.testing.assert_allclose(resample(x[0, :], 1, 3),
+                                   resample_poly(x[0, :], 1, 3), rtol=1e-5)
+
     def test_morlet(self):
         """Test morlet function."""
         x, f, sf = self._get_data(True)
         morlet(x, sf, f)
 
+    def test_morlet_bank(self):
+        """Test morlet_bank function."""
+        x, _, sf = self._get_data(True)
+        x = np.c_[x, x[::-1]].T
+        freqs = [.5, 3., 12., 40.]
+        # Reference (time domain convolution) :
+        ref = np.zeros((len(freqs), 2, x.shape[1]), dtype=complex)
+        for i, f in enumerate(freqs):
+            m = _morlet_wlt(sf, f)
+            for k in range(2):
+                y = np.convolve(x[k, :], m)
+                ref[i, k, :] = y[int(np.ceil(len(m) / 2)) - 1:int(
+                    len(y) - np.floor(len(m) / 2))]
+        for chunk_size in [None, 100, 1500]:
+            xout = morlet_bank(x, sf, freqs, chunk_size=chunk_size)
+            np.testing.assert_allclose(xout, ref, atol=1e-10)
+        xout = morlet_bank(x.T, sf, freqs, axis=0, get='power',
+                           dtype=np.float32, chunk_size=300)
+        assert xout.shape == (4, x.shape[1], 2) and xout.dtype == np.float32
+        np.testing.assert_allclose(xout, np.abs(ref.transpose(0, 2, 1)) ** 2,
+                                   rtol=1e-3, atol=1e-3)
+        np.testing.assert_allclose(morlet(x[0, :], sf, 3.), ref[1, 0, :],
+                                   atol=1e-10)
+
     def test_ndmorlet(self):
         """Test ndmorlet function."""
         x, f, sf = self._get_data(True)
         for k in [None, 'amplitude', 'phase', 'power']:
             ndmorlet(x, sf, f, get=k)
+        # Channels are decomposed at once :
+        x = np.random.rand(4, 1000)
+        xf = ndmorlet(x, sf, f, axis=1)
+        for k in range(4):
+            np.testing.assert_allclose(xf[k, :], morlet(x[k, :], sf, f))
 
     def test_morlet_power(self):
         """Test morlet_power function."""
@@ -70,3 +113,27 @@ class TestFiltering(object):
                 p.way = k[3]
                 p.dispas = i
                 p._prepare_data(sf, x, time)
+
+    def test_prepare_data_buffer(self):
+        """Test the filtering of multi-channel data with PrepareData."""
+        p = PrepareData(axis=1, demean=True, filt=True, fstart=10., fend=14.)
+        x, sf = np.random.rand(8, 2000), 512.
+        x_ori = x.copy()
+        time = np.arange(x.shape[1]) / sf
+        for dispas in ['filter', 'amplitude']:
+            p.dispas = dispas
+            out = p._prepare_data(sf, x, time)
+            assert out.dtype == np.float32 and out.shape == x.shape
+            assert out is p._prepare_data(sf, x, time)  # reused buffer
+            np.testing.assert_array_equal(x, x_ori)  # not modified
+            ref = x - x.mean(1, keepdims=True)
+            if dispas == 'filter':
+                ref = filt(sf, [10., 14.], ref, axis=1, way='lfilter')
+            else:
+                ref = ndmorlet(ref, sf, 12., axis=1, get='amplitude')
+            np.testing.assert_allclose(out, ref, rtol=1e-3, atol=1e-4)
+            # Copies have their own buffer :
+            cp = p.copy()
+            assert cp.get_settings() == p.get_settings()
+            np.testing.assert_array_equal(cp._prepare_data(sf, x, time), out)
+            assert cp._prep_buffer is not p._prep_buffer
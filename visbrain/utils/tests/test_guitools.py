@@ -1,4 +1,6 @@
 """Test functions in guitools.py."""
+import time
+
 import pytest
 from PyQt5 import QtWidgets, QtCore
 
@@ -9,7 +11,7 @@ from visbrain.utils.guitools import (slider2opacity, textline2color,
                                      get_combo_list_index, safely_set_cbox,
                                      safely_set_spin, safely_set_slider,
                                      toggle_enable_tab, get_screen_size,
-                                     set_widget_size)
+                                     set_widget_size, RenderScheduler)
 
 
 class TestGuitools(object):
@@ -161,3 +163,30 @@ class TestGuitools(object):
         app = QtWidgets.QApplication([])
         w = QtWidgets.QWidget()
         set_widget_size(app, w)
+
+    def test_render_scheduler(self):
+        """Test class RenderScheduler."""
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+        calls = []
+        sc = RenderScheduler(lambda *args, **kw: calls.append((args, kw)))
+        # Merged requests (only the latest one is executed) :
+        for k in range(5):
+            sc.request(k, force=k % 2)
+        assert sc.is_pending and not calls
+        sc.flush()
+        assert calls == [((4,), {'force': 0})]
+        assert (sc.frames, sc.dropped) == (1, 4) and sc.latency > 0.
+        # Nothing pending :
+        sc.flush()
+        assert sc.frames == 1
+        # Executed by the event loop, at the next frame :
+        sc.trigger(10)
+        for k in range(100):
+            app.processEvents()
+            if not sc.is_pending:
+                break
+            time.sleep(.005)
+        assert calls[-1] == ((), {}) and sc.stats['frames'] == 2
+        sc.request()
+        sc.cancel()
+        assert not sc.is_pending
@@ -1,9 +1,44 @@
 """Test functions in mesh.py."""
+import logging
+from time import perf_counter
+
 import numpy as np
+from scipy.spatial import ConvexHull
+from scipy.spatial.distance import cdist
 
 from visbrain.utils.mesh import (convert_meshdata, vispy_array, volume_to_mesh,
-                                 mesh_edges, smoothing_matrix,
+                                 mesh_edges, smoothing_matrix, SmoothingCache,
                                  laplacian_smoothing)
+from visbrain.tests._tests_visbrain import benchmark
+
+logger = logging.getLogger('visbrain')
+
+
+def _laplacian_smoothing_loop(vertices, faces, n_neighbors=-1):
+    """Vertex by vertex laplacian smoothing (reference implementation)."""
+    new_vertices = np.zeros_like(vertices)
+    for k in range(vertices.shape[0]):
+        # Find connected vertices :
+        faces_idx = np.where(faces == k)[0]
+        u_faces_idx = np.unique(np.ravel(faces[faces_idx, :])).tolist()
+        u_faces_idx.remove(k)
+        # Select closest connected vertices :
+        if n_neighbors == -1:
+            to_smooth = u_faces_idx
+        else:
+            norms = cdist(vertices[[k], :], vertices[u_faces_idx, :]).ravel()
+            n_norm = min(n_neighbors, len(norms))
+            to_smooth = np.array(u_faces_idx)[np.argsort(norms)[0:n_norm]]
+        # Take the mean of selected vertices :
+        new_vertices[k, :] = vertices[to_smooth, :].mean(0).reshape(1, -1)
+    return new_vertices
+
+
+def _sphere_mesh(n_vertices, seed=0):
+    """Get the vertices and faces of a random sphere."""
+    v = np.random.RandomState(seed).normal(size=(n_vertices, 3))
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    return v, ConvexHull(v).simplices
 
 
 class TestMesh(object):
@@ -67,8 +102,77 @@ class TestMesh(object):
         vertices = np.array([1, 3])
         smoothing_matrix(vertices, mesh_edges(self.faces))
 
+    def test_smoothing_cache(self, tmpdir):
+        """Test class SmoothingCache."""
+        self._creation()
+        cache = SmoothingCache(max_entries=2)
+        assert cache.edges(self.faces) is cache.edges(self.faces)
+        sm = cache.get(self.faces, np.array([1, 3]), 1)
+        ref = smoothing_matrix(np.array([1, 3]), mesh_edges(self.faces), 1)
+        np.testing.assert_array_equal(sm.toarray(), ref.toarray())
+        assert cache.get(self.faces, np.array([1, 3]), 1) is sm
+        # Least recently used matrices are removed :
+        cache.get(self.faces, np.array([0, 2]), 1)
+        cache.get(self.faces, np.array([1, 3]), 2)
+        assert len(cache) == 2
+        assert cache.get(self.faces, np.array([1, 3]), 1) is not sm
+        # A new mesh clear the cache :
+        cache.get(self.faces.copy(), np.array([1, 3]), 1)
+        assert len(cache) == 1
+        # Saved smoothing matrices :
+        cache = SmoothingCache(folder=str(tmpdir))
+        sm = cache.get(self.faces, np.array([1, 3]), 1)
+        assert len(tmpdir.listdir()) == 1
+        cache.clear()
+        np.testing.assert_array_equal(cache.get(
+            self.faces, np.array([1, 3]), 1).toarray(), sm.toarray())
+
     def test_laplacian_smoothing(self):
         """Test function laplacian_smoothing."""
         self._creation()
         laplacian_smoothing(self.vertices, self.faces)
         laplacian_smoothing(self.vertices, self.faces, n_neighbors=3)
+
+    def test_laplacian_smoothing_equivalence(self):
+        """Compare laplacian_smoothing with the vertex by vertex version."""
+        for n_vertices in [20, 200, 1000]:
+            v, f = _sphere_mesh(n_vertices)
+            for n_neighbors in [-1, 1, 3, 5, 20]:
+                ref = _laplacian_smoothing_loop(v, f, n_neighbors)
+                sm = laplacian_smoothing(v, f, n_neighbors)
+                assert sm.dtype == np.float32
+                np.testing.assert_allclose(sm, ref, rtol=1e-5, atol=1e-6)
+                # Multiple iterations :
+                ref = _laplacian_smoothing_loop(ref, f, n_neighbors)
+                sm = laplacian_smoothing(v, f, n_neighbors, n_iter=2)
+                np.testing.assert_allclose(sm, ref, rtol=1e-5, atol=1e-6)
+        # Inplace smoothing :
+        v32 = v.astype(np.float32)
+        ref = laplacian_smoothing(v32, f)
+        assert laplacian_smoothing(v32, f, inplace=True) is v32
+        np.testing.assert_array_equal(v32, ref)
+        # Vertex with a large number of neighbors :
+        theta = np.linspace(0., 2 * np.pi, 101)[:-1]
+        v = np.c_[np.r_[0., np.cos(theta)], np.r_[0., np.sin(theta)],
+                  np.r_[0., theta / 10.]]
+        f = np.c_[np.zeros((100,), dtype=int), np.arange(1, 101),
+                  np.r_[np.arange(2, 101), 1]]
+        for n_neighbors in [-1, 3]:
+            ref = _laplacian_smoothing_loop(v, f, n_neighbors)
+            sm = laplacian_smoothing(v, f, n_neighbors)
+            np.testing.assert_allclose(sm, ref, rtol=1e-5, atol=1e-6)
+
+    @benchmark
+    def test_laplacian_smoothing_benchmark(self):
+        """Benchmark laplacian_smoothing across mesh sizes."""
+        for n_vertices in [1000, 10000, 100000]:
+            v, f = _sphere_mesh(n_vertices)
+            t_start = perf_counter()
+            laplacian_smoothing(v, f)
+            t_all = perf_counter() - t_start
+            t_start = perf_counter()
+            laplacian_smoothing(v, f, n_neighbors=3, n_iter=3)
+            t_top = perf_counter() - t_start
+            logger.info("laplacian_smoothing (%i vertices) : %.3fs (all "
+                        "neighbors), %.3fs (3 closest neighbors, 3 "
+                        "iterations)" % (n_vertices, t_all, t_top))
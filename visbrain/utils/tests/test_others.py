@@ -1,5 +1,6 @@
 """Test functions in others.py."""
-from visbrain.utils.others import (get_dsf, set_if_not_none)
+from visbrain.utils.others import (get_dsf, set_if_not_none,
+                                   spawn_executor)
 
 
 class TestOthers(object):
@@ -16,3 +17,9 @@ class TestOthers(object):
         assert set_if_not_none(a, None) == 5.
         assert set_if_not_none(a, 10., False) == 5.
         assert set_if_not_none(a, 10.) == 10.
+
+    def test_spawn_executor(self):
+        """Test function spawn_executor."""
+        pool = spawn_executor(n_jobs=1)
+        assert pool.submit(abs, -2).result() == 2
+        pool.shutdown()
@@ -4,5 +4,6 @@ from .cbar import *  # noqa
 from .grid_signal_visual import GridSignal  # noqa
 from .hypno_visual import Hypnogram  # noqa
 from .pic_visual import PicMesh  # noqa
+from .stacked_signal_visual import StackedSignal  # noqa
 from .tf_map_visual import TFmapsMesh  # noqa
 from .topo_visual import TopoMesh  # noqa
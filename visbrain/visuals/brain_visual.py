@@ -337,7 +337,7 @@ class BrainVisual(Visual):
         self.shared_program.vert['u_alphas'] = self._alphas_buffer
 
     def add_overlay(self, data, vertices=None, to_overlay=None, mask_data=None,
-                    **kwargs):
+                    data_lim=None, **kwargs):
         """Add an overlay to the mesh.
 
         Note that the current implementation limit to a number of of four
@@ -354,6 +354,9 @@ class BrainVisual(Visual):
         mask_data : array_like | None
             Array to specify if some vertices have to be considered as masked
             (and use the `mask_color` color)
+        data_lim : tuple | None
+            The (min, max) data limits of the overlay. Data outside are
+            clipped. If None, (data.min(), data.max()) is used.
         kwargs : dict | {}
             Additional color color properties (cmap, clim, vmin, vmax, under,
             over, translucent)
@@ -371,7 +374,8 @@ class BrainVisual(Visual):
 
         data = np.asarray(data)
         to_overlay = self._n_overlay if to_overlay is None else to_overlay
-        data_lim = (data.min(), data.max())
+        if data_lim is None:
+            data_lim = (data.min(), data.max())
         if len(self._data_lim) < to_overlay + 1:
             self._data_lim.append(data_lim)
         else:
@@ -388,7 +392,8 @@ class BrainVisual(Visual):
             self._alphas = np.c_[self._alphas, z_]
             self._text2d_data = np.concatenate((self._text2d_data, z_text))
         # (x, y) coordinates of the overlay for the texture :
-        self._xrange[vertices, to_overlay] = normalize(data)
+        self._xrange[vertices, to_overlay] = self._data_to_xrange(data,
+                                                                  data_lim)
         # Transparency :
         self._alphas[vertices, to_overlay] = 1.  # transparency level
 
@@ -420,6 +425,43 @@ class BrainVisual(Visual):
         self._n_overlay = to_overlay + 1
         self.shared_program.vert['u_n_overlays'] = self._n_overlay
 
+    def set_overlay_data(self, data, vertices=None, to_overlay=None):
+        """Update the data of an overlay without changing its colormap.
+
+        Only texture coordinates are sent to the GPU, which makes this method
+        suited for animations. Data are mapped using the data limits of the
+        overlay.
+
+        Parameters
+        ----------
+        data : array_like
+            Array of data of shape (n_data,).
+        vertices : array_like | None
+            The vertices to color with the data of shape (n_data,). They
+            should be the same as (or a subset of) the ones used when the
+            overlay was added.
+        to_overlay : int | None
+            The overlay to update. If None, the last one is used.
+        """
+        if vertices is None:
+            vertices = np.ones((len(self),), dtype=bool)
+        to_overlay = self._n_overlay - 1 if to_overlay is None else to_overlay
+        assert 0 <= to_overlay < self._n_overlay
+        data_lim = self._data_lim[to_overlay]
+        self._xrange[vertices, to_overlay] = self._data_to_xrange(
+            np.asarray(data), data_lim)
+        self._xrange_buffer.set_data(self._xrange)
+        self.update()
+
+    @staticmethod
+    def _data_to_xrange(data, data_lim):
+        """Get the texture coordinates of data between data limits."""
+        if np.array_equal(data_lim, (data.min(), data.max())):
+            return normalize(data)
+        rg = data_lim[1] - data_lim[0]
+        xrange = (data - data_lim[0]) / (rg if rg != 0. else 1.)
+        return np.clip(xrange, 0., 1.).astype(np.float32)
+
     def update_colormap(self, to_overlay=None, **kwargs):
         """Update colormap properties of an overlay.
 
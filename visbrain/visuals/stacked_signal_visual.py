@@ -0,0 +1,219 @@
+"""Display a montage of signals, stacked vertically, in a single draw call.
+
+All of the channels share the same vertex buffer. Only the values of the
+displayed window are sent to the GPU : the time coordinate of each vertex is
+recomputed in the vertex shader from its index, and the vertical offset and
+scaling of each channel are uniforms. Changing the amplitude of a channel
+then does not require any upload.
+"""
+import numpy as np
+
+from vispy import gloo, visuals
+from vispy.scene.visuals import create_visual_node
+
+from visbrain.utils import color2vb, vispy_array
+
+
+__all__ = ('StackedSignal')
+
+
+vertex_shader = """
+#version 120
+varying float v_row;
+uniform vec2 u_chan[%i];
+void main() {
+    // a_index.x is the row of the signal, a_index.y the time index :
+    vec2 chan = u_chan[int($a_index.x + .5)];
+
+    // Time coordinate (time points can be repeated, e.g. envelopes) :
+    float x = $u_time.x + floor($a_index.y / $u_time.z) * $u_time.y;
+
+    // Each row is centered on (n_rows - row - .5) :
+    float y = $u_n_rows - $a_index.x - .5 + ($a_position - chan.x) * chan.y;
+
+    gl_Position = $transform(vec4(x, y, 0.0, 1.0));
+    v_row = $a_index.x;
+}
+"""
+
+fragment_shader = """
+#version 120
+varying float v_row;
+void main() {
+    gl_FragColor = $u_color;
+
+    // Discard the fragments between the signals (emulate glMultiDrawArrays).
+    if (fract(v_row) > 0.)
+        discard;
+}
+"""
+
+
+class StackedSignalVisual(visuals.Visual):
+    """Visual class for a montage of stacked signals.
+
+    Signals are drawn from top to bottom. Row k is displayed between
+    y=n_rows - k - 1 and y=n_rows - k.
+
+    Parameters
+    ----------
+    n_max : int
+        Maximum number of signals (defines the size of the uniform array of
+        offsets and scalings).
+    color : array_like/string/tuple | 'black'
+        Line color.
+    width : float | 1.
+        Line width.
+    method : {'gl', 'agg'}
+        Plotting method. 'gl' is faster but 'agg' should be antialiased.
+    """
+
+    def __init__(self, n_max, color='black', width=1., method='gl'):
+        """Init."""
+        visuals.Visual.__init__(self, vertex_shader % max(int(n_max), 1),
+                                fragment_shader)
+        self.set_gl_state('translucent', depth_test=False, cull_face=False,
+                          blend=True, blend_func=('src_alpha',
+                                                  'one_minus_src_alpha'))
+        self._draw_mode = 'line_strip'
+        self._n_max = max(int(n_max), 1)
+        self._shape = None
+
+        # =========================== BUFFERS ===========================
+        self._dbuffer = gloo.VertexBuffer(np.zeros((2,), dtype=np.float32))
+        self._ibuffer = gloo.VertexBuffer(np.zeros((2, 2), dtype=np.float32))
+        self.shared_program.vert['a_position'] = self._dbuffer
+        self.shared_program.vert['a_index'] = self._ibuffer
+        self.shared_program.vert['u_time'] = (0., 1., 1.)
+        self.shared_program.vert['u_n_rows'] = 1.
+        self.color = color
+        self.width = width
+        self.method = method
+        self.freeze()
+
+    def __len__(self):
+        """Get the number of displayed signals."""
+        return 0 if self._shape is None else self._shape[0]
+
+    def set_data(self, data, time, ylim=None):
+        """Set data.
+
+        Parameters
+        ----------
+        data : array_like
+            Array of data of shape (n_rows, n_pts).
+        time : array_like
+            Regularly spaced time vector of length n_pts. Consecutive time
+            points can be repeated (e.g min / max envelopes).
+        ylim : array_like | None
+            Y-limits of each row, of shape (n_rows, 2). If None, limits are
+            the min and max of each row.
+        """
+        data = np.atleast_2d(data)
+        n_rows, n_pts = data.shape
+        assert n_rows <= self._n_max, ("The number of signals exceeds the "
+                                       "maximum (%i)" % self._n_max)
+        assert len(time) == n_pts
+        # Index (only updated when the shape changes) :
+        if self._shape != (n_rows, n_pts):
+            idx = np.c_[np.repeat(np.arange(n_rows), n_pts),
+                        np.tile(np.arange(n_pts), n_rows)]
+            self._ibuffer.set_data(vispy_array(idx))
+            self._shape = (n_rows, n_pts)
+            self.shared_program.vert['u_n_rows'] = float(n_rows)
+        # Time :
+        rep = 2 if (n_pts > 1) and (time[1] == time[0]) else 1
+        dt = float(time[rep] - time[0]) if n_pts > rep else 1.
+        self.shared_program.vert['u_time'] = (float(time[0]), dt, float(rep))
+        # Data :
+        self._dbuffer.set_data(vispy_array(data.ravel()))
+        if ylim is None:
+            ylim = np.c_[data.min(1), data.max(1)]
+        self.set_ylim(ylim)
+
+    def set_ylim(self, ylim):
+        """Set the y-limits of each row.
+
+        Parameters
+        ----------
+        ylim : array_like
+            Y-limits of each row, of shape (n_rows, 2).
+        """
+        ylim = np.asarray(ylim, dtype=np.float32).reshape(-1, 2)
+        center = ylim.mean(1)
+        dist = ylim[:, 1] - ylim[:, 0]
+        dist[dist == 0.] = 1.
+        for k, (c, d) in enumerate(zip(center, dist)):
+            self.shared_program['u_chan[%i]' % k] = (c, 1. / d)
+        self.update()
+
+    def clean(self):
+        """Clean buffers."""
+        self._dbuffer.delete()
+        self._ibuffer.delete()
+
+    def _prepare_transforms(self, view):
+        """Call for the first rendering."""
+        tr = view.transforms
+        view_vert = view.view_program.vert
+        view_vert['transform'] = tr.get_transform()
+
+    def _prepare_draw(self, view=None):
+        """Function called everytime there's a camera update."""
+        if self._shape is None:
+            return False
+        try:
+            import OpenGL.GL as GL  # noqa
+            GL.glLineWidth(self._width)
+            if self._smooth_line:
+                GL.glEnable(GL.GL_LINE_SMOOTH)
+            else:
+                GL.glDisable(GL.GL_LINE_SMOOTH)
+        except Exception:  # can be other than ImportError sometimes
+            pass
+
+    # ========================================================================
+    # ========================================================================
+    # PROPERTIES
+    # ========================================================================
+    # ========================================================================
+    # ----------- COLOR -----------
+    @property
+    def color(self):
+        """Get the color value."""
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        """Set color value."""
+        self._color = color2vb(value).ravel()
+        self.shared_program.frag['u_color'] = self._color
+        self.update()
+
+    # ----------- WIDTH -----------
+    @property
+    def width(self):
+        """Get the width value."""
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        """Set width value."""
+        self._width = value
+        self.update()
+
+    # ----------- METHOD -----------
+    @property
+    def method(self):
+        """Get the method value."""
+        return self._method
+
+    @method.setter
+    def method(self, value):
+        """Set method value."""
+        self._method = value
+        self._smooth_line = value == 'agg'
+        self.update()
+
+
+StackedSignal = create_visual_node(StackedSignalVisual)
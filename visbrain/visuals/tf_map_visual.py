@@ -10,7 +10,7 @@ import vispy.visuals.transforms as vist
 from vispy.scene.visuals import Image
 
 from ..visuals import CbarBase
-from ..utils import (morlet, cmap_to_glsl, averaging, normalization)
+from ..utils import (morlet_bank, cmap_to_glsl, averaging, normalization)
 
 
 __all__ = ('TFmapsMesh')
@@ -85,14 +85,11 @@ class TFmapsMesh(CbarBase):
         # assert isinstance(baseline)
 
         # ======================= PRE-ALLOCATION =======================
-        self._n = len(data)
         freqs = np.arange(f_min, f_max, f_step)  # frequency vector
-        time = np.arange(len(self)) / sf
-        tf = np.zeros((len(freqs), len(self)), dtype=data.dtype)
 
         # ======================= COMPUTE TF =======================
-        for i, k in enumerate(freqs):
-            tf[i, :] = np.square(np.abs(morlet(data, sf, k)))
+        tf = morlet_bank(data, sf, freqs, get='power').astype(data.dtype,
+                                                              copy=False)
 
         # ======================= NORMALIZATION =======================
         normalization(tf, norm=norm, baseline=baseline, axis=1)
@@ -102,6 +99,27 @@ class TFmapsMesh(CbarBase):
             tf = averaging(tf, n_window, axis=1, overlap=overlap,
                            window=window)
 
+        self.set_tf(tf, freqs, len(data), sf, contrast=contrast, **kwargs)
+
+    def set_tf(self, tf, freqs, n_pts, sf, contrast=.1, **kwargs):
+        """Set an already computed time-frequency map.
+
+        Parameters
+        ----------
+        tf : array_like
+            The time-frequency map of shape (n_freqs, n_times).
+        freqs : array_like
+            The frequency vector of shape (n_freqs,).
+        n_pts : int
+            Number of time points of the decomposed signal.
+        sf : float
+            The sampling frequency.
+        contrast : float | .1
+            Contrast of the colormap.
+        """
+        self._n = n_pts
+        time = np.arange(len(self)) / sf
+
         # ======================= DOWNSAMPLE =======================
         # Downsample large images :
         if tf.shape[1] > self._n_limits:
@@ -136,7 +154,7 @@ class TFmapsMesh(CbarBase):
         self._image.transform.translate = tr
 
         # ======================= CAMERA =======================
-        self.rect = (time[0], f_min, t_max - t_min, fr_max - fr_min)
+        self.rect = (time[0], fr_min, t_max - t_min, fr_max - fr_min)
         self.freqs = freqs
 
     def update(self):